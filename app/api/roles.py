@@ -2,7 +2,8 @@ from typing import Callable, Tuple
 from functools import wraps
 from enum import Enum
 from fastapi import HTTPException, status
-from app.api.schemas.all import UserDB
+from app.config import settings
+from app.api.utils.security import token_claims
 
 
 # Роли пользователей
@@ -17,9 +18,14 @@ def role_req(roles: Tuple[Role, ...]):
     def decorator(func: Callable):
         @wraps(func)
         async def wrapper(*ar, **kw):
-            user: UserDB = await kw['rep'].user.get_one(kw['user_id'])
-            role: Role = Role(user.role_id)
-            if role not in roles:
+            # роль из подписанного токена, для токенов без роли - из базы (кэша)
+            claims: dict | None = token_claims.get()
+            if settings.JWT_ROLE_CLAIM and claims and "role" in claims:
+                role_id: int | None = claims["role"]
+            else:
+                access = await kw['rep'].user.get_access(kw['user_id'])
+                role_id = access.role_id if access else None
+            if role_id is None or Role(role_id) not in roles:
                 raise HTTPException(
                     status_code=status.HTTP_403_FORBIDDEN,
                     detail=f'Your role, not in role_list')
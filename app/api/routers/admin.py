@@ -3,8 +3,13 @@ from fastapi import (
     Cookie
 )
 
-from app.db.database import get_rep, Repository
+from app.db.database import get_rep, get_uow, Repository
+from app.db.repositories.pagination import Cursor
+from app.api.utils.pagination import get_cursor, set_next_cursor
+from app.api.utils.responses import prevalidated
 from app.api.schemas.all import AuthorDB, UserWithBooksDB, UserWithBooksBookDB, BookWithUsersDB, BookDB, UserDBPublic, GenreDB
+from app.api.schemas.all import ImportKind, ImportFormat, ImportReport, EmailOutboxDB
+from app.api.utils.bulk_import import read_chunks, run_import, spool
 
 from typing import List
 from app.api.utils.security import get_password_hash, create_token, require_user, verify_password
@@ -31,50 +36,100 @@ async def get_user_info(get_id: int,
 # книги пользователя читаемые/прочитанные
 @admin_router.get('/get_user_s__books/', response_model=List[BookDB])
 @role_req((Role.ADMIN, Role.S_ADMIN, ))
-async def get_user_s__books(get_id: int, returned: bool,
+@prevalidated
+async def get_user_s__books(response: Response, get_id: int, returned: bool,
                          item_start: int = 0, item_end: int = 10,
+                         cursor: Cursor | None = Depends(get_cursor),
                          user_id = Depends(require_user), rep: Repository = Depends(get_rep)):
-    res = await rep.user.get_books(get_id, returned, item_start, item_end)
+    res = await rep.user.get_books(get_id, returned, item_start, item_end, cursor)
     if len(res) == 0:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail='Error')
-    return [r.to_schema() for r in res]
+    set_next_cursor(response, res, cursor, item_start, item_end)
+    return res
 
 
 # жанры книг пользователя читаемые/прочитанные
 @admin_router.get('/get_user_s__genres/', response_model=List[GenreDB])
 @role_req((Role.ADMIN, Role.S_ADMIN, ))
-async def get_user_s__genres(get_id: int, returned: bool,
+@prevalidated
+async def get_user_s__genres(response: Response, get_id: int, returned: bool,
                           item_start: int = 0, item_end: int = 10,
+                          cursor: Cursor | None = Depends(get_cursor),
                           user_id = Depends(require_user), rep: Repository = Depends(get_rep)):
-    res = await rep.user.get_genres(get_id, returned, item_start, item_end)
+    res = await rep.user.get_genres(get_id, returned, item_start, item_end, cursor)
     if len(res) == 0:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail='Error')
-    return [r.to_schema() for r in res]
+    set_next_cursor(response, res, cursor, item_start, item_end)
+    return res
 
 
 # авторы книг пользователя читаемые/прочитанные
 @admin_router.get('/get_user_s__authors/', response_model=List[AuthorDB])
 @role_req((Role.ADMIN, Role.S_ADMIN, ))
-async def get_user_s__authors(get_id: int, returned: bool,
+@prevalidated
+async def get_user_s__authors(response: Response, get_id: int, returned: bool,
                            item_start: int = 0, item_end: int = 10,
+                           cursor: Cursor | None = Depends(get_cursor),
                            user_id = Depends(require_user), rep: Repository = Depends(get_rep)):
-    res = await rep.user.get_authors(get_id, returned, item_start, item_end)
+    res = await rep.user.get_authors(get_id, returned, item_start, item_end, cursor)
     if len(res) == 0:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail='Error')
-    return [r.to_schema() for r in res]
+    set_next_cursor(response, res, cursor, item_start, item_end)
+    return res
 
 
 # читатели задержавшие книги сданные/не сданные книги
 @admin_router.get('/get_users_overdue/', response_model=List[UserWithBooksBookDB])
 @role_req((Role.ADMIN, Role.S_ADMIN, ))
-async def get_users_overdue(returned: bool,
+@prevalidated
+async def get_users_overdue(response: Response, returned: bool,
                       item_start: int = 0, item_end: int = 10,
+                      cursor: Cursor | None = Depends(get_cursor),
                       user_id = Depends(require_user), rep: Repository = Depends(get_rep)):
-    res = await rep.user.get_overdue(returned, item_start, item_end)
+    res = await rep.user.get_overdue(returned, item_start, item_end, cursor)
     if len(res) == 0:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail='Error')
-    return [r.to_schema_with_books_book() for r in res]
\ No newline at end of file
+    set_next_cursor(response, res, cursor, item_start, item_end)
+    return [r.to_schema_with_books_book() for r in res]
+
+
+# массовый импорт каталога: тело запроса - поток CSV или NDJSON, загрузка через COPY
+# одной транзакцией, строки с ошибками пропускаются и перечисляются в отчёте.
+# Тело сохраняется до загрузки - таблицы блокируются только на время слияния
+@admin_router.post('/import/', response_model=ImportReport)
+@role_req((Role.ADMIN, Role.S_ADMIN, ))
+async def import_catalog(request: Request, kind: ImportKind, format: ImportFormat = 'ndjson',
+                         user_id = Depends(require_user), rep: Repository = Depends(get_uow)):
+    with await spool(request.stream()) as body:
+        report = await run_import(rep, kind, format, read_chunks(body))
+    logger.debug(f"Import of {kind}: {report.rows} rows, {report.inserted} inserted, "
+                 f"{report.updated} updated, {report.links} links, {report.errors} errors "
+                 f"by user_id={user_id}")
+    return report
+
+
+# письма, не отправленные за все попытки
+@admin_router.get('/email_outbox/dead/', response_model=List[EmailOutboxDB])
+@role_req((Role.ADMIN, Role.S_ADMIN, ))
+@prevalidated
+async def get_dead_emails(response: Response, item_start: int = 0, item_end: int = 10,
+                          user_id = Depends(require_user), rep: Repository = Depends(get_rep)):
+    res = await rep.outbox.get_dead(item_start, item_end)
+    if len(res) == 0:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail='Error')
+    return [r.to_schema() for r in res]
+
+
+# повторная отправка отложенных писем (без ids - всех), возвращает их кол-во
+@admin_router.post('/email_outbox/retry/', response_model=int)
+@role_req((Role.ADMIN, Role.S_ADMIN, ))
+async def retry_dead_emails(ids: List[int] | None = Body(None),
+                            user_id = Depends(require_user), rep: Repository = Depends(get_rep)):
+    res = await rep.outbox.retry_dead(ids)
+    logger.debug(f"{res} dead emails requeued by user_id={user_id}")
+    return res
@@ -7,8 +7,9 @@ from app.api.schemas.all import  UserRegister, UserDBPublic, UserAdd
 
 from typing import Annotated
 from fastapi.security import OAuth2PasswordRequestForm
-from app.api.utils.security import get_password_hash, create_token, verify_password, require_user
-from app.db.database import get_rep, Repository
+from app.api.utils.security import (get_password_hash_async, create_token, verify_password_async, require_user,
+                                    access_claims)
+from app.db.database import get_rep, get_uow, Repository
 
 from app.config import settings
 from datetime import timedelta
@@ -23,7 +24,7 @@ auth_router = APIRouter(
 )
 
 @auth_router.post("/register/", response_model=UserDBPublic)
-async def register(user_register: UserRegister, rep: Repository = Depends(get_rep)):
+async def register(user_register: UserRegister, rep: Repository = Depends(get_uow)):
     if await rep.user.get_by_name(user_register.name):
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT, detail='Account already exist')
@@ -34,7 +35,7 @@ async def register(user_register: UserRegister, rep: Repository = Depends(get_re
 
     user_add = UserAdd(**(
             user_register.__dict__ |
-            {'hashed_password': get_password_hash(user_register.password)}))
+            {'hashed_password': await get_password_hash_async(user_register.password)}))
     res = await rep.user.create(user_add.model_dump())
     user = res.to_schema_public()
 
@@ -54,7 +55,7 @@ async def login(
 ):
     res = await rep.user.get_by_name(form_data.username)
     user = res.to_schema()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    if not user or not await verify_password_async(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail='Invalid credentials')
     # if not user.verified:
@@ -62,7 +63,8 @@ async def login(
     #         status_code=status.HTTP_401_UNAUTHORIZED, detail='Please verify your email address')
 
     access_token: str = create_token(
-        subject={"sub": str(user.id)}, expires_time=timedelta(minutes=settings.ACCESS_MINUTES))
+        subject=access_claims(user.id, user.role_id, res.token_version),
+        expires_time=timedelta(minutes=settings.ACCESS_MINUTES))
     refresh_token: str = create_token(
         subject={"sub": str(user.id)}, expires_time=timedelta(days=settings.REFRESH_DAYS))
     tokens = Tokens(access_token=access_token, refresh_token=refresh_token)
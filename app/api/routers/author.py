@@ -1,13 +1,19 @@
 
 from fastapi import (
     APIRouter, Depends, HTTPException, Response, status, Request, Body, Path,
-    Cookie
+    Cookie, Query
 )
 
-from app.api.schemas.all import AuthorCreate, AuthorDB, GenreDB, UserDB, BookDB, UserDBPublic
+from app.api.schemas.all import AuthorCreate, AuthorDB, GenreDB, UserDB, BookDB, UserDBPublic, AuthorWithRelationsDB
 
 from typing import List
-from app.db.database import get_rep, Repository
+from app.db.database import get_rep, get_read_rep, get_uow, Repository
+from app.db.repositories.pagination import Cursor
+from app.api.utils.pagination import get_cursor, set_next_cursor
+from app.api.utils.responses import prevalidated
+from app.api.utils.response_cache import cached
+from app.api.utils.include import include_param
+from app.db.repositories.repository import AuthorRepository
 from app.api.utils.security import get_password_hash, create_token, require_user, verify_password
 from app.api.roles import Role, role_req
 from app.log.logger import logger
@@ -20,8 +26,10 @@ author_router = APIRouter(
 
 
 @author_router.get('/get_one/', response_model=AuthorDB)
+@cached('authors')
+@prevalidated
 async def get_one(author_id: int,
-                  rep: Repository = Depends(get_rep)):
+                  rep: Repository = Depends(get_read_rep)):
     res = await rep.author.get_one(author_id)
     if res is None:
         raise HTTPException(
@@ -30,30 +38,69 @@ async def get_one(author_id: int,
 
 
 @author_router.get('/get/', response_model=List[AuthorDB])
-async def get(item_start: int = 0, item_end: int = 10,
-              rep: Repository = Depends(get_rep)):
-    res = await rep.author.get(item_start, item_end)
+@cached('authors')
+@prevalidated
+async def get(response: Response, item_start: int = 0, item_end: int = 10,
+              cursor: Cursor | None = Depends(get_cursor),
+              rep: Repository = Depends(get_read_rep)):
+    res = await rep.author.get(item_start, item_end, cursor)
     if len(res) == 0:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail='Error')
-    return [r.to_schema() for r in res]
+    set_next_cursor(response, res, cursor, item_start, item_end)
+    return res
 
 
 @author_router.get('/get_like/', response_model=List[AuthorDB])
-async def get_like(phrase: str,
+@cached('authors')
+@prevalidated
+async def get_like(response: Response, phrase: str,
                    item_start: int = 0, item_end: int = 10,
-                   rep: Repository = Depends(get_rep)):
-    res = await rep.author.get_names_like(phrase, item_start, item_end)
+                   cursor: Cursor | None = Depends(get_cursor),
+                   rep: Repository = Depends(get_read_rep)):
+    res = await rep.author.get_names_like(phrase, item_start, item_end, cursor)
     if len(res) == 0:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail='Error')
-    return [r.to_schema() for r in res]
+    set_next_cursor(response, res, cursor, item_start, item_end)
+    return res
+
+
+# нечёткий поиск по названию с сортировкой по похожести
+@author_router.get('/get_similar/', response_model=List[AuthorDB])
+@cached('authors')
+@prevalidated
+async def get_similar(phrase: str,
+                      item_start: int = 0, item_end: int = 10,
+                      rep: Repository = Depends(get_read_rep)):
+    res = await rep.author.get_names_similar(phrase, item_start, item_end)
+    if len(res) == 0:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail='Error')
+    return res
+
+
+# страница авторов вместе с книгами (include=books) за фиксированное число запросов
+@author_router.get('/get_with/', response_model=List[AuthorWithRelationsDB])
+@cached('authors', 'author_book', 'books')
+@prevalidated
+async def get_with(response: Response, item_start: int = 0, item_end: int = 10,
+                   ids: List[int] = Query(default=[]),
+                   include: set[str] = Depends(include_param(AuthorRepository.Relations)),
+                   cursor: Cursor | None = Depends(get_cursor),
+                   rep: Repository = Depends(get_read_rep)):
+    res = await rep.author.get_with(include, item_start, item_end, cursor, ids)
+    if len(res) == 0:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail='Error')
+    set_next_cursor(response, res, cursor, item_start, item_end)
+    return [r.to_schema_with(include) for r in res]
 
 
 @author_router.post('/create/', response_model=AuthorDB)
 @role_req((Role.ADMIN, Role.S_ADMIN, ))
 async def create(author: AuthorCreate,
-                 user_id=Depends(require_user), rep: Repository = Depends(get_rep)):
+                 user_id=Depends(require_user), rep: Repository = Depends(get_uow)):
     res = await rep.author.create(author.model_dump())
     if res is None:
         raise HTTPException(
@@ -66,7 +113,7 @@ async def create(author: AuthorCreate,
 @author_router.post('/delete/')
 @role_req((Role.ADMIN, Role.S_ADMIN, ))
 async def delete(author_id: int,
-                 user_id=Depends(require_user), rep: Repository = Depends(get_rep)):
+                 user_id=Depends(require_user), rep: Repository = Depends(get_uow)):
     linked_books = await rep.author_book.count_links_left(author_id)
     if linked_books:
         raise HTTPException(
@@ -84,7 +131,7 @@ async def delete(author_id: int,
 @author_router.post('/create_link_book/')
 @role_req((Role.ADMIN, Role.S_ADMIN, ))
 async def create_link_book(author_id: int, book_id: int,
-                           user_id=Depends(require_user), rep: Repository = Depends(get_rep)):
+                           user_id=Depends(require_user), rep: Repository = Depends(get_uow)):
     res = await rep.author_book.create_link(author_id, book_id)
     if res is None:
         raise HTTPException(
@@ -97,7 +144,7 @@ async def create_link_book(author_id: int, book_id: int,
 @author_router.post('/delete_link_book/')
 @role_req((Role.ADMIN, Role.S_ADMIN, ))
 async def delete_link_book(author_id: int, book_id: int,
-                             user_id=Depends(require_user), rep: Repository = Depends(get_rep)):
+                             user_id=Depends(require_user), rep: Repository = Depends(get_uow)):
     res = await rep.author_book.delete_one_link(author_id, book_id)
     if res == 0:
         raise HTTPException(
@@ -110,7 +157,7 @@ async def delete_link_book(author_id: int, book_id: int,
 @author_router.post('/delete_all_links_book/')
 @role_req((Role.ADMIN, Role.S_ADMIN, ))
 async def delete_all_links_author(author_id: int,
-                             user_id=Depends(require_user), rep: Repository = Depends(get_rep)):
+                             user_id=Depends(require_user), rep: Repository = Depends(get_uow)):
     res = await rep.author_book.delete_all_left_links(author_id)
     if res == 0:
         raise HTTPException(
@@ -122,34 +169,45 @@ async def delete_all_links_author(author_id: int,
 
 # книги автора
 @author_router.get('/get_books/', response_model=List[BookDB])
-async def get_books(author_id: int,
+@cached('authors', 'author_book', 'books')
+@prevalidated
+async def get_books(response: Response, author_id: int,
                     item_start: int = 0, item_end: int = 10,
-                    rep: Repository = Depends(get_rep)):
-    res = await rep.author.get_books(author_id, item_start, item_end)
+                    cursor: Cursor | None = Depends(get_cursor),
+                    rep: Repository = Depends(get_read_rep)):
+    res = await rep.author.get_books(author_id, item_start, item_end, cursor)
     if len(res) == 0:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail='Error')
-    return [r.to_schema() for r in res]
+    set_next_cursor(response, res, cursor, item_start, item_end)
+    return res
 
 # жанры автора
 @author_router.get('/get_genres/', response_model=List[GenreDB])
-async def get_genres(author_id: int,
+@cached('authors', 'author_book', 'books', 'genre_book', 'genres')
+@prevalidated
+async def get_genres(response: Response, author_id: int,
                      item_start: int = 0, item_end: int = 10,
-                     rep: Repository = Depends(get_rep)):
-    res = await rep.author.get_genres(author_id, item_start, item_end)
+                     cursor: Cursor | None = Depends(get_cursor),
+                     rep: Repository = Depends(get_read_rep)):
+    res = await rep.author.get_genres(author_id, item_start, item_end, cursor)
     if len(res) == 0:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail='Error')
-    return [r.to_schema() for r in res]
+    set_next_cursor(response, res, cursor, item_start, item_end)
+    return res
 
 # пользователи читающие/читавшие автора
 @author_router.get('/get_users/', response_model=List[UserDBPublic])
 @role_req((Role.ADMIN, Role.S_ADMIN, ))
-async def get_users(author_id: int, returned: bool,
+@prevalidated
+async def get_users(response: Response, author_id: int, returned: bool,
                     item_start: int = 0, item_end: int = 10,
+                    cursor: Cursor | None = Depends(get_cursor),
                     user_id=Depends(require_user), rep: Repository = Depends(get_rep)):
-    res = await rep.author.get_users(author_id, returned, item_start, item_end)
+    res = await rep.author.get_users(author_id, returned, item_start, item_end, cursor)
     if len(res) == 0:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail='Error')
-    return [r.to_schema_public() for r in res]
\ No newline at end of file
+    set_next_cursor(response, res, cursor, item_start, item_end)
+    return res
\ No newline at end of file
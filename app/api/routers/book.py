@@ -1,10 +1,16 @@
 from fastapi import (
     APIRouter, Depends, HTTPException, Response, status, Request, Body, Path,
-    Cookie
+    Cookie, Query
 )
-from app.api.schemas.all import BookCreate, BookDB, UserWithBooksDB, GenreDB, AuthorDB
+from app.api.schemas.all import BookCreate, BookDB, UserWithBooksDB, GenreDB, AuthorDB, BookWithRelationsDB
 from typing import List
-from app.db.database import get_rep, Repository
+from app.db.database import get_rep, get_read_rep, get_uow, Repository
+from app.db.repositories.pagination import Cursor
+from app.api.utils.pagination import get_cursor, set_next_cursor
+from app.api.utils.responses import prevalidated
+from app.api.utils.response_cache import cached
+from app.api.utils.include import include_param
+from app.db.repositories.repository import BookRepository
 from app.api.utils.security import require_user
 from app.api.roles import Role, role_req
 from app.log.logger import logger
@@ -16,8 +22,10 @@ book_router = APIRouter(
 )
 
 @book_router.get('/get_one/', response_model=BookDB)
+@cached('books')
+@prevalidated
 async def get_one(book_id: int,
-                  rep: Repository = Depends(get_rep)):
+                  rep: Repository = Depends(get_read_rep)):
     res = await rep.book.get_one(book_id)
     if res is None:
         raise HTTPException(
@@ -26,30 +34,69 @@ async def get_one(book_id: int,
 
 
 @book_router.get('/get/', response_model=List[BookDB])
-async def get(item_start: int = 0, item_end: int = 10,
-              rep: Repository = Depends(get_rep)):
-    res = await rep.book.get(item_start, item_end)
+@cached('books')
+@prevalidated
+async def get(response: Response, item_start: int = 0, item_end: int = 10,
+              cursor: Cursor | None = Depends(get_cursor),
+              rep: Repository = Depends(get_read_rep)):
+    res = await rep.book.get(item_start, item_end, cursor)
     if len(res) == 0:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail='Error')
-    return [r.to_schema() for r in res]
+    set_next_cursor(response, res, cursor, item_start, item_end)
+    return res
 
 
 @book_router.get('/get_like/', response_model=List[BookDB])
-async def get_like(phrase: str,
+@cached('books')
+@prevalidated
+async def get_like(response: Response, phrase: str,
                    item_start: int = 0, item_end: int = 10,
-                   rep: Repository = Depends(get_rep)):
-    res = await rep.book.get_names_like(phrase, item_start, item_end)
+                   cursor: Cursor | None = Depends(get_cursor),
+                   rep: Repository = Depends(get_read_rep)):
+    res = await rep.book.get_names_like(phrase, item_start, item_end, cursor)
     if len(res) == 0:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail='Error')
-    return [r.to_schema() for r in res]
+    set_next_cursor(response, res, cursor, item_start, item_end)
+    return res
+
+
+# нечёткий поиск по названию с сортировкой по похожести
+@book_router.get('/get_similar/', response_model=List[BookDB])
+@cached('books')
+@prevalidated
+async def get_similar(phrase: str,
+                      item_start: int = 0, item_end: int = 10,
+                      rep: Repository = Depends(get_read_rep)):
+    res = await rep.book.get_names_similar(phrase, item_start, item_end)
+    if len(res) == 0:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail='Error')
+    return res
+
+
+# страница книг вместе с авторами и жанрами (include=authors,genres) за фиксированное число запросов
+@book_router.get('/get_with/', response_model=List[BookWithRelationsDB])
+@cached('books', 'author_book', 'authors', 'genre_book', 'genres')
+@prevalidated
+async def get_with(response: Response, item_start: int = 0, item_end: int = 10,
+                   ids: List[int] = Query(default=[]),
+                   include: set[str] = Depends(include_param(BookRepository.Relations)),
+                   cursor: Cursor | None = Depends(get_cursor),
+                   rep: Repository = Depends(get_read_rep)):
+    res = await rep.book.get_with(include, item_start, item_end, cursor, ids)
+    if len(res) == 0:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail='Error')
+    set_next_cursor(response, res, cursor, item_start, item_end)
+    return [r.to_schema_with(include) for r in res]
 
 
 @book_router.post('/create/', response_model=BookDB)
 @role_req((Role.ADMIN, Role.S_ADMIN, ))
 async def create(book: BookCreate,
-                 user_id=Depends(require_user), rep: Repository = Depends(get_rep)):
+                 user_id=Depends(require_user), rep: Repository = Depends(get_uow)):
     res = await rep.book.create(book.model_dump())
     if res is None:
         raise HTTPException(
@@ -62,7 +109,7 @@ async def create(book: BookCreate,
 @book_router.post('/delete/')
 @role_req((Role.ADMIN, Role.S_ADMIN, ))
 async def delete(book_id: int,
-                 user_id=Depends(require_user), rep: Repository = Depends(get_rep)):
+                 user_id=Depends(require_user), rep: Repository = Depends(get_uow)):
     linked_authors = await rep.author_book.count_links_right(book_id)
     if linked_authors:
         raise HTTPException(
@@ -100,7 +147,7 @@ async def delete(book_id: int,
 @book_router.post('/create_link_author/')
 @role_req((Role.ADMIN, Role.S_ADMIN, ))
 async def create_link_author(author_id: int, book_id: int,
-                             user_id=Depends(require_user), rep: Repository = Depends(get_rep)):
+                             user_id=Depends(require_user), rep: Repository = Depends(get_uow)):
     res = await rep.author_book.create_link(author_id, book_id)
     if res is None:
         raise HTTPException(
@@ -113,7 +160,7 @@ async def create_link_author(author_id: int, book_id: int,
 @book_router.post('/delete_link_author/')
 @role_req((Role.ADMIN, Role.S_ADMIN, ))
 async def delete_link_author(author_id: int, book_id: int,
-                             user_id=Depends(require_user), rep: Repository = Depends(get_rep)):
+                             user_id=Depends(require_user), rep: Repository = Depends(get_uow)):
     res = await rep.author_book.delete_one_link(author_id, book_id)
     if res == 0:
         raise HTTPException(
@@ -126,7 +173,7 @@ async def delete_link_author(author_id: int, book_id: int,
 @book_router.post('/delete_all_links_author/')
 @role_req((Role.ADMIN, Role.S_ADMIN, ))
 async def delete_all_links_author(book_id: int,
-                             user_id=Depends(require_user), rep: Repository = Depends(get_rep)):
+                             user_id=Depends(require_user), rep: Repository = Depends(get_uow)):
     res = await rep.author_book.delete_all_right_links(book_id)
     if res == 0:
         raise HTTPException(
@@ -139,7 +186,7 @@ async def delete_all_links_author(book_id: int,
 @book_router.post('/create_link_genre/')
 @role_req((Role.ADMIN, Role.S_ADMIN, ))
 async def create_link_genre(genre_id: int, book_id: int,
-                            user_id=Depends(require_user), rep: Repository = Depends(get_rep)):
+                            user_id=Depends(require_user), rep: Repository = Depends(get_uow)):
     res = await rep.genre_book.create_link(genre_id, book_id)
     if res is None:
         raise HTTPException(
@@ -152,7 +199,7 @@ async def create_link_genre(genre_id: int, book_id: int,
 @book_router.post('/delete_link_genre/')
 @role_req((Role.ADMIN, Role.S_ADMIN, ))
 async def delete_link_genre(genre_id: int, book_id: int,
-                            user_id=Depends(require_user), rep: Repository = Depends(get_rep)):
+                            user_id=Depends(require_user), rep: Repository = Depends(get_uow)):
     res = await rep.genre_book.delete_one_link(genre_id, book_id)
     if res == 0:
         raise HTTPException(
@@ -165,7 +212,7 @@ async def delete_link_genre(genre_id: int, book_id: int,
 @book_router.post('/delete_all_links_genre/')
 @role_req((Role.ADMIN, Role.S_ADMIN, ))
 async def delete_all_links_genre(book_id: int,
-                            user_id=Depends(require_user), rep: Repository = Depends(get_rep)):
+                            user_id=Depends(require_user), rep: Repository = Depends(get_uow)):
     res = await rep.genre_book.delete_all_right_links(book_id)
     if res == 0:
         raise HTTPException(
@@ -178,7 +225,7 @@ async def delete_all_links_genre(book_id: int,
 @book_router.post('/delete_all_links_returned_books/')
 @role_req((Role.ADMIN, Role.S_ADMIN, ))
 async def delete_all_links_returned_books(book_id: int,
-                            user_id=Depends(require_user), rep: Repository = Depends(get_rep)):
+                            user_id=Depends(require_user), rep: Repository = Depends(get_uow)):
     res = await rep.user_book.delete_all_right_links_returned(book_id, True)
     if res == 0:
         raise HTTPException(
@@ -190,37 +237,48 @@ async def delete_all_links_returned_books(book_id: int,
 
 # авторы книги
 @book_router.get('/get_authors/', response_model=List[AuthorDB])
-async def get_authors(book_id: int,
+@cached('books', 'author_book', 'authors')
+@prevalidated
+async def get_authors(response: Response, book_id: int,
                       item_start: int = 0, item_end: int = 10,
-                      rep: Repository = Depends(get_rep)):
-    res = await rep.book.get_authors(book_id, item_start, item_end)
+                      cursor: Cursor | None = Depends(get_cursor),
+                      rep: Repository = Depends(get_read_rep)):
+    res = await rep.book.get_authors(book_id, item_start, item_end, cursor)
     if len(res) == 0:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail='Error')
-    return [r.to_schema() for r in res]
+    set_next_cursor(response, res, cursor, item_start, item_end)
+    return res
 
 
 # жанры книги
 @book_router.get('/get_genres/', response_model=List[GenreDB])
-async def get_genres(book_id: int,
+@cached('books', 'genre_book', 'genres')
+@prevalidated
+async def get_genres(response: Response, book_id: int,
                      item_start: int = 0, item_end: int = 10,
-                     rep: Repository = Depends(get_rep)):
-    res = await rep.book.get_genres(book_id, item_start, item_end)
+                     cursor: Cursor | None = Depends(get_cursor),
+                     rep: Repository = Depends(get_read_rep)):
+    res = await rep.book.get_genres(book_id, item_start, item_end, cursor)
     if len(res) == 0:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail='Error')
-    return [r.to_schema() for r in res]
+    set_next_cursor(response, res, cursor, item_start, item_end)
+    return res
 
 
 # пользователи читающие/читавшие книгу
 @book_router.get('/get_users/', response_model=List[UserWithBooksDB])
 @role_req((Role.ADMIN, Role.S_ADMIN, ))
-async def get_users(book_id: int, returned: bool,
+@prevalidated
+async def get_users(response: Response, book_id: int, returned: bool,
                     item_start: int = 0, item_end: int = 10,
+                    cursor: Cursor | None = Depends(get_cursor),
                     user_id = Depends(require_user), rep: Repository = Depends(get_rep)):
-    res = await rep.book.get_users(book_id, returned, item_start, item_end)
+    res = await rep.book.get_users(book_id, returned, item_start, item_end, cursor)
     if len(res) == 0:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail='Error')
+    set_next_cursor(response, res, cursor, item_start, item_end)
     return [r.to_schema_with_books() for r in res]
 
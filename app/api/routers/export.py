@@ -0,0 +1,32 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.api.schemas.all import ImportFormat
+from app.api.utils.export import export_response
+from app.api.utils.security import require_user
+from app.api.roles import Role, role_req
+from app.db.database import get_rep, get_read_session_maker, Repository
+
+
+export_router = APIRouter(
+    prefix="/export",
+    tags=["Export"]
+)
+
+
+# весь каталог книг с авторами и жанрами (формат совместим с импортом)
+@export_router.get('/books/')
+@role_req((Role.ADMIN, Role.S_ADMIN, ))
+async def export_books(format: ImportFormat = 'ndjson',
+                       maker: async_sessionmaker = Depends(get_read_session_maker),
+                       user_id = Depends(require_user), rep: Repository = Depends(get_rep)):
+    return export_response(maker, lambda r, batch: r.book.stream_with_names(batch), format, 'books')
+
+
+# вся история выдачи книг
+@export_router.get('/loans/')
+@role_req((Role.ADMIN, Role.S_ADMIN, ))
+async def export_loans(format: ImportFormat = 'ndjson',
+                       maker: async_sessionmaker = Depends(get_read_session_maker),
+                       user_id = Depends(require_user), rep: Repository = Depends(get_rep)):
+    return export_response(maker, lambda r, batch: r.user_book.stream_all(batch), format, 'loans')
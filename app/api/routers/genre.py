@@ -1,11 +1,17 @@
 from fastapi import (
     APIRouter, Depends, HTTPException, Response, status, Request, Body, Path,
-    Cookie
+    Cookie, Query
 )
 
-from app.api.schemas.all import GenreCreate, GenreDB, AuthorDB, UserWithBooksBookDB
+from app.api.schemas.all import GenreCreate, GenreDB, AuthorDB, UserWithBooksBookDB, GenreWithRelationsDB
 from typing import List
-from app.db.database import get_rep, Repository
+from app.db.database import get_rep, get_read_rep, get_uow, Repository
+from app.db.repositories.pagination import Cursor
+from app.api.utils.pagination import get_cursor, set_next_cursor
+from app.api.utils.responses import prevalidated
+from app.api.utils.response_cache import cached
+from app.api.utils.include import include_param
+from app.db.repositories.repository import GenreRepository
 from app.api.utils.security import get_password_hash, create_token, require_user, verify_password
 from app.api.roles import Role, role_req
 from app.log.logger import logger
@@ -18,8 +24,10 @@ genre_router = APIRouter(
 
 
 @genre_router.get('/get_one/', response_model=GenreDB)
+@cached('genres')
+@prevalidated
 async def get_one(genre_id: int,
-                  rep: Repository = Depends(get_rep)):
+                  rep: Repository = Depends(get_read_rep)):
     res = await rep.genre.get_one(genre_id)
     if res is None:
         raise HTTPException(
@@ -28,30 +36,69 @@ async def get_one(genre_id: int,
 
 
 @genre_router.get('/get/', response_model=List[GenreDB])
-async def get(item_start: int = 0, item_end: int = 10,
-              rep: Repository = Depends(get_rep)):
-    res = await rep.genre.get(item_start, item_end)
+@cached('genres')
+@prevalidated
+async def get(response: Response, item_start: int = 0, item_end: int = 10,
+              cursor: Cursor | None = Depends(get_cursor),
+              rep: Repository = Depends(get_read_rep)):
+    res = await rep.genre.get(item_start, item_end, cursor)
     if len(res) == 0:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail='Error')
-    return [r.to_schema() for r in res]
+    set_next_cursor(response, res, cursor, item_start, item_end)
+    return res
 
 
 @genre_router.get('/get_like/', response_model=List[GenreDB])
-async def get_like(phrase: str,
+@cached('genres')
+@prevalidated
+async def get_like(response: Response, phrase: str,
                    item_start: int = 0, item_end: int = 10,
-                   rep: Repository = Depends(get_rep)):
-    res = await rep.genre.get_names_like(phrase, item_start, item_end)
+                   cursor: Cursor | None = Depends(get_cursor),
+                   rep: Repository = Depends(get_read_rep)):
+    res = await rep.genre.get_names_like(phrase, item_start, item_end, cursor)
     if len(res) == 0:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail='Error')
-    return [r.to_schema() for r in res]
+    set_next_cursor(response, res, cursor, item_start, item_end)
+    return res
+
+
+# нечёткий поиск по названию с сортировкой по похожести
+@genre_router.get('/get_similar/', response_model=List[GenreDB])
+@cached('genres')
+@prevalidated
+async def get_similar(phrase: str,
+                      item_start: int = 0, item_end: int = 10,
+                      rep: Repository = Depends(get_read_rep)):
+    res = await rep.genre.get_names_similar(phrase, item_start, item_end)
+    if len(res) == 0:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail='Error')
+    return res
+
+
+# страница жанров вместе с книгами (include=books) за фиксированное число запросов
+@genre_router.get('/get_with/', response_model=List[GenreWithRelationsDB])
+@cached('genres', 'genre_book', 'books')
+@prevalidated
+async def get_with(response: Response, item_start: int = 0, item_end: int = 10,
+                   ids: List[int] = Query(default=[]),
+                   include: set[str] = Depends(include_param(GenreRepository.Relations)),
+                   cursor: Cursor | None = Depends(get_cursor),
+                   rep: Repository = Depends(get_read_rep)):
+    res = await rep.genre.get_with(include, item_start, item_end, cursor, ids)
+    if len(res) == 0:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail='Error')
+    set_next_cursor(response, res, cursor, item_start, item_end)
+    return [r.to_schema_with(include) for r in res]
 
 
 @genre_router.post('/create/', response_model=GenreDB)
 @role_req((Role.ADMIN, Role.S_ADMIN, ))
 async def create(genre: GenreCreate,
-                 user_id=Depends(require_user), rep: Repository = Depends(get_rep)):
+                 user_id=Depends(require_user), rep: Repository = Depends(get_uow)):
     res = await rep.genre.create(genre.model_dump())
     if res is None:
         raise HTTPException(
@@ -64,7 +111,7 @@ async def create(genre: GenreCreate,
 @genre_router.post('/delete/')
 @role_req((Role.ADMIN, Role.S_ADMIN, ))
 async def delete(genre_id: int,
-                 user_id=Depends(require_user), rep: Repository = Depends(get_rep)):
+                 user_id=Depends(require_user), rep: Repository = Depends(get_uow)):
     linked_books = await rep.genre_book.count_links_left(genre_id)
     if linked_books:
         raise HTTPException(
@@ -82,7 +129,7 @@ async def delete(genre_id: int,
 @genre_router.post('/create_link_book/')
 @role_req((Role.ADMIN, Role.S_ADMIN, ))
 async def create_link_book(genre_id: int, book_id: int,
-                           user_id=Depends(require_user), rep: Repository = Depends(get_rep)):
+                           user_id=Depends(require_user), rep: Repository = Depends(get_uow)):
     res = await rep.genre_book.create_link(genre_id, book_id)
     if res is None:
         raise HTTPException(
@@ -95,7 +142,7 @@ async def create_link_book(genre_id: int, book_id: int,
 @genre_router.post('/delete_link_book/')
 @role_req((Role.ADMIN, Role.S_ADMIN, ))
 async def delete_link_book(genre_id: int, book_id: int,
-                            user_id=Depends(require_user), rep: Repository = Depends(get_rep)):
+                            user_id=Depends(require_user), rep: Repository = Depends(get_uow)):
     res = await rep.genre_book.delete_one_link(genre_id, book_id)
     if res == 0:
         raise HTTPException(
@@ -108,7 +155,7 @@ async def delete_link_book(genre_id: int, book_id: int,
 @genre_router.post('/delete_all_links_book/')
 @role_req((Role.ADMIN, Role.S_ADMIN, ))
 async def delete_all_links_genre(genre_id: int,
-                            user_id=Depends(require_user), rep: Repository = Depends(get_rep)):
+                            user_id=Depends(require_user), rep: Repository = Depends(get_uow)):
     res = await rep.genre_book.delete_all_left_links(genre_id)
     if res == 0:
         raise HTTPException(
@@ -120,36 +167,46 @@ async def delete_all_links_genre(genre_id: int,
 
 # книги жанра
 @genre_router.get('/get_books/', response_model=List[GenreDB])
-async def get_books(genre_id: int,
+@cached('genres', 'genre_book', 'books')
+async def get_books(response: Response, genre_id: int,
                     item_start: int = 0, item_end: int = 10,
-                    rep: Repository = Depends(get_rep)):
-    res = await rep.genre.get_books(genre_id, item_start, item_end)
+                    cursor: Cursor | None = Depends(get_cursor),
+                    rep: Repository = Depends(get_read_rep)):
+    res = await rep.genre.get_books(genre_id, item_start, item_end, cursor)
     if len(res) == 0:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail='Error')
-    return [r.to_schema() for r in res]
+    set_next_cursor(response, res, cursor, item_start, item_end)
+    return res
 
 
 # авторы жанра
 @genre_router.get('/get_authors/', response_model=List[AuthorDB])
-async def get_authors(genre_id: int,
+@cached('genres', 'genre_book', 'books', 'author_book', 'authors')
+@prevalidated
+async def get_authors(response: Response, genre_id: int,
                       item_start: int = 0, item_end: int = 10,
-                      rep: Repository = Depends(get_rep)):
-    res = await rep.genre.get_authors(genre_id, item_start, item_end)
+                      cursor: Cursor | None = Depends(get_cursor),
+                      rep: Repository = Depends(get_read_rep)):
+    res = await rep.genre.get_authors(genre_id, item_start, item_end, cursor)
     if len(res) == 0:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail='Error')
-    return [r.to_schema() for r in res]
+    set_next_cursor(response, res, cursor, item_start, item_end)
+    return res
 
 
 # пользователи читающие/читавшие жанр
 @genre_router.get('/get_users/', response_model=List[UserWithBooksBookDB])
 @role_req((Role.ADMIN, Role.S_ADMIN, ))
-async def get_users(genre_id: int, returned: bool,
+@prevalidated
+async def get_users(response: Response, genre_id: int, returned: bool,
                     item_start: int = 0, item_end: int = 10,
+                    cursor: Cursor | None = Depends(get_cursor),
                     user_id=Depends(require_user), rep: Repository = Depends(get_rep)):
-    res = await rep.genre.get_users(genre_id, returned, item_start, item_end)
+    res = await rep.genre.get_users(genre_id, returned, item_start, item_end, cursor)
     if len(res) == 0:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail='Error')
+    set_next_cursor(response, res, cursor, item_start, item_end)
     return [r.to_schema_with_books_book() for r in res]
@@ -0,0 +1,25 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.api.schemas.all import PoolStats
+from app.db.database import engine
+from app.db.pool import pool_stats
+from app.log.metrics import expose
+
+
+metrics_router = APIRouter(
+    prefix="/metrics",
+    tags=["Metrics"]
+)
+
+
+# все метрики процесса в текстовом формате Prometheus
+@metrics_router.get('/', response_class=PlainTextResponse)
+async def get_metrics():
+    return PlainTextResponse(expose(), media_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+# состояние пула соединений процесса
+@metrics_router.get('/pool/', response_model=PoolStats)
+async def get_pool():
+    return pool_stats(engine.pool)
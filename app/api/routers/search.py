@@ -0,0 +1,27 @@
+from fastapi import (
+    APIRouter, Depends, HTTPException, status
+)
+
+from app.api.schemas.all import SearchHit
+from typing import List
+from app.db.database import get_read_rep, Repository
+from app.api.utils.response_cache import cached
+
+
+search_router = APIRouter(
+    prefix="/search",
+    tags=["Search"]
+)
+
+
+# полнотекстовый поиск по названиям, описаниям книг и жанров, биографиям авторов
+@search_router.get('/', response_model=List[SearchHit])
+@cached('authors', 'books', 'genres')
+async def search(phrase: str,
+                 item_start: int = 0, item_end: int = 10,
+                 rep: Repository = Depends(get_read_rep)):
+    res = await rep.search.search(phrase, item_start, item_end)
+    if len(res) == 0:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail='Error')
+    return [SearchHit(**r._mapping) for r in res]
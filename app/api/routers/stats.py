@@ -0,0 +1,78 @@
+from datetime import date
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, status
+
+from app.api.schemas.all import LoanStat
+from app.api.utils.security import require_user
+from app.api.roles import Role, role_req
+from app.db.database import get_rep, Repository
+from app.log.logger import logger
+
+
+stats_router = APIRouter(
+    prefix="/stats",
+    tags=["Stats"]
+)
+
+
+# самые читаемые книги месяца (по умолчанию - текущего)
+@stats_router.get('/top_books/', response_model=List[LoanStat])
+@role_req((Role.ADMIN, Role.S_ADMIN, ))
+async def top_books(month: date | None = None, limit: int = 10,
+                    user_id = Depends(require_user), rep: Repository = Depends(get_rep)):
+    res = await rep.stats.top_books(month or date.today(), limit)
+    if len(res) == 0:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail='Error')
+    return [LoanStat(**r._mapping) for r in res]
+
+
+# самые читаемые жанры месяца (по умолчанию - текущего)
+@stats_router.get('/top_genres/', response_model=List[LoanStat])
+@role_req((Role.ADMIN, Role.S_ADMIN, ))
+async def top_genres(month: date | None = None, limit: int = 10,
+                     user_id = Depends(require_user), rep: Repository = Depends(get_rep)):
+    res = await rep.stats.top_genres(month or date.today(), limit)
+    if len(res) == 0:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail='Error')
+    return [LoanStat(**r._mapping) for r in res]
+
+
+# жанры книг читателя читаемые/прочитанные с кол-вом выдач
+@stats_router.get('/user_genres/', response_model=List[LoanStat])
+@role_req((Role.ADMIN, Role.S_ADMIN, ))
+async def user_genres(get_id: int, returned: bool,
+                      item_start: int = 0, item_end: int = 10,
+                      user_id = Depends(require_user), rep: Repository = Depends(get_rep)):
+    res = await rep.stats.user_genres(get_id, returned, item_start, item_end)
+    if len(res) == 0:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail='Error')
+    return [LoanStat(**r._mapping) for r in res]
+
+
+# авторы книг читателя читаемые/прочитанные с кол-вом выдач
+@stats_router.get('/user_authors/', response_model=List[LoanStat])
+@role_req((Role.ADMIN, Role.S_ADMIN, ))
+async def user_authors(get_id: int, returned: bool,
+                       item_start: int = 0, item_end: int = 10,
+                       user_id = Depends(require_user), rep: Repository = Depends(get_rep)):
+    res = await rep.stats.user_authors(get_id, returned, item_start, item_end)
+    if len(res) == 0:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail='Error')
+    return [LoanStat(**r._mapping) for r in res]
+
+
+# пересчёт статистики сейчас, не дожидаясь расписания
+@stats_router.post('/refresh/')
+@role_req((Role.ADMIN, Role.S_ADMIN, ))
+async def refresh(user_id = Depends(require_user), rep: Repository = Depends(get_rep)):
+    if not await rep.stats.refresh():
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail='Refresh is already running')
+    message = "Reading statistics refreshed"
+    logger.debug(f"{message} by user_id={user_id}")
+    return {"detail": message}
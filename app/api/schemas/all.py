@@ -1,7 +1,7 @@
 from pydantic import BaseModel, Field
 from pydantic import constr, EmailStr, conint
-from typing import Optional, List
-from datetime import date
+from typing import Optional, List, Literal
+from datetime import date, datetime
 
 
 class UserPassword(BaseModel):
@@ -95,3 +95,80 @@ class UserWithBooksDB(UserDBPublic):
 
 class UserWithBooksBookDB(UserDBPublic):
     books: List[UserBookWithBookDB]
+
+# книга со связями, запрошенными параметром include (незапрошенные - None)
+class BookWithRelationsDB(BookDB):
+    authors: List[AuthorDB] | None = None
+    genres: List[GenreDB] | None = None
+
+class AuthorWithRelationsDB(AuthorDB):
+    books: List[BookDB] | None = None
+
+class GenreWithRelationsDB(GenreDB):
+    books: List[BookDB] | None = None
+
+# строка импорта книг: данные книги и имена авторов/жанров для связей
+class BookImport(BookCreate):
+    authors: List[str] = []
+    genres: List[str] = []
+
+# строка импорта связей существующей книги (книга - по названию и году издания)
+class BookLinksImport(BaseModel):
+    name: str
+    publish_year: int
+    authors: List[str] = []
+    genres: List[str] = []
+
+# статистика выдачи книги/жанра/автора: кол-во выдач и разных читателей
+class LoanStat(BaseModel):
+    id: int
+    name: str
+    loans: int
+    readers: int | None = None
+
+# письмо из очереди исходящих, не отправленное за все попытки
+class EmailOutboxDB(BaseModel):
+    id: int
+    recipients: List[str]
+    subject: str
+    attempts: int
+    created_at: datetime
+    last_error: str | None = None
+
+ImportKind = Literal['authors', 'genres', 'books', 'links']
+ImportFormat = Literal['ndjson', 'csv']
+
+class ImportRowError(BaseModel):
+    row: int
+    error: str
+
+# результат импорта: кол-во строк, вставлено/обновлено записей, добавлено связей, ошибки по строкам
+class ImportReport(BaseModel):
+    rows: int = 0
+    inserted: int = 0
+    updated: int = 0
+    links: int = 0
+    errors: int = 0
+    error_rows: List[ImportRowError] = []
+
+# результат полнотекстового поиска по книгам, авторам и жанрам
+class SearchHit(BaseModel):
+    kind: Literal['book', 'author', 'genre']
+    id: int
+    name: str
+    rank: float
+
+# гистограмма: накопительное кол-во наблюдений по верхним границам корзин
+class HistogramDB(BaseModel):
+    buckets: dict[str, int]
+    count: int
+    sum: float
+
+# состояние пула соединений БД
+class PoolStats(BaseModel):
+    size: int
+    checked_in: int
+    checked_out: int
+    overflow: int
+    max_overflow: int
+    wait_seconds: HistogramDB
@@ -0,0 +1,150 @@
+import codecs
+import csv
+import json
+from tempfile import SpooledTemporaryFile
+from typing import IO, AsyncIterator
+
+from pydantic import BaseModel, ValidationError
+
+from app.api.schemas.all import (AuthorCreate, GenreCreate, BookImport, BookLinksImport,
+                                 ImportKind, ImportFormat, ImportReport, ImportRowError)
+from app.config import settings
+from app.db.repositories.bulk_import import STAGING
+from app.db.repositories.repository import Repository
+
+
+SCHEMAS: dict[str, type[BaseModel]] = {
+    'authors': AuthorCreate,
+    'genres': GenreCreate,
+    'books': BookImport,
+    'links': BookLinksImport,
+}
+
+# тело запроса импорта держится в памяти до этого размера, дальше - во временном файле
+SPOOL_MEMORY = 1 << 20
+CHUNK_SIZE = 1 << 16
+
+# в CSV списки имён авторов/жанров - одно поле с разделителем
+LIST_FIELDS = ('authors', 'genres')
+LIST_SEPARATOR = '|'
+
+
+# Поток сохраняется целиком до начала загрузки: блокировки таблиц импорта (LOCK TABLE)
+# не держатся, пока медленный клиент передаёт тело запроса
+async def spool(chunks: AsyncIterator[bytes]) -> IO[bytes]:
+    file = SpooledTemporaryFile(max_size=SPOOL_MEMORY)
+    async for chunk in chunks:
+        file.write(chunk)
+    file.seek(0)
+    return file
+
+
+async def read_chunks(file: IO[bytes]) -> AsyncIterator[bytes]:
+    while chunk := file.read(CHUNK_SIZE):
+        yield chunk
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    tail = ''
+    async for chunk in chunks:
+        tail += decoder.decode(chunk)
+        *lines, tail = tail.split('\n')
+        for line in lines:
+            yield line + '\n'
+    tail += decoder.decode(b'', final=True)
+    if tail:
+        yield tail
+
+
+# Записи потока: (номер строки данных, словарь полей или None, ошибка разбора или None)
+async def iter_records(lines: AsyncIterator[str], fmt: ImportFormat
+                       ) -> AsyncIterator[tuple[int, dict | None, str | None]]:
+    row_no = 0
+    if fmt == 'ndjson':
+        async for line in lines:
+            if not line.strip():
+                continue
+            row_no += 1
+            try:
+                data = json.loads(line)
+            except ValueError as e:
+                yield row_no, None, f'Invalid JSON: {e}'
+                continue
+            if not isinstance(data, dict):
+                yield row_no, None, 'Row is not an object'
+                continue
+            yield row_no, data, None
+        return
+
+    # запись CSV может занимать несколько строк (перевод строки внутри кавычек):
+    # запись закончена, когда кол-во кавычек чётное
+    header, pending = None, []
+    async for line in lines:
+        pending.append(line)
+        if ''.join(pending).count('"') % 2:
+            continue
+        values = next(csv.reader(pending), [])
+        pending = []
+        if not any(values):
+            continue
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        row_no += 1
+        if len(values) != len(header):
+            yield row_no, None, f'Expected {len(header)} fields, got {len(values)}'
+            continue
+        data = dict(zip(header, values))
+        for name in LIST_FIELDS:
+            if name in data:
+                data[name] = [v.strip() for v in data[name].split(LIST_SEPARATOR) if v.strip()]
+        yield row_no, data, None
+    if pending:
+        yield row_no + 1, None, 'Unterminated quoted field'
+
+
+def _validation_message(e: ValidationError) -> str:
+    return '; '.join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+
+
+# Импорт потока CSV/NDJSON: проверка строк схемами pydantic, загрузка пакетами
+# по IMPORT_BATCH_SIZE строк. Строки с ошибками пропускаются и попадают в отчёт
+async def run_import(rep: Repository, kind: ImportKind, fmt: ImportFormat,
+                     chunks: AsyncIterator[bytes]) -> ImportReport:
+    schema = SCHEMAS[kind]
+    columns = [name for name, _ in STAGING[kind].columns]
+    report = ImportReport()
+    batch: list[tuple] = []
+
+    def add_error(row_no: int, error: str) -> None:
+        report.errors += 1
+        if len(report.error_rows) < settings.IMPORT_MAX_ERRORS:
+            report.error_rows.append(ImportRowError(row=row_no, error=error))
+
+    async def load() -> None:
+        res = await rep.bulk_import.load(kind, batch)
+        report.inserted += res.inserted
+        report.updated += res.updated
+        report.links += res.links
+        for row_no, error in res.errors:
+            add_error(row_no, error)
+        batch.clear()
+
+    async for row_no, data, error in iter_records(iter_lines(chunks), fmt):
+        report.rows += 1
+        if error is None:
+            try:
+                item = schema.model_validate(data)
+            except ValidationError as e:
+                error = _validation_message(e)
+        if error is not None:
+            add_error(row_no, error)
+            continue
+        batch.append((row_no, *(getattr(item, name) for name in columns)))
+        if len(batch) >= settings.IMPORT_BATCH_SIZE:
+            await load()
+    if batch:
+        await load()
+    report.error_rows.sort(key=lambda e: e.row)
+    return report
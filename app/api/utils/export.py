@@ -0,0 +1,59 @@
+import csv
+import io
+import json
+from datetime import date
+from typing import AsyncIterator, Callable, Sequence
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy import RowMapping
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.api.schemas.all import ImportFormat
+from app.api.utils.bulk_import import LIST_SEPARATOR
+from app.config import settings
+from app.db.repositories.repository import Repository
+
+
+MEDIA_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+
+def _json_default(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def encode_ndjson(rows: Sequence[RowMapping]) -> str:
+    return ''.join(json.dumps(dict(row), ensure_ascii=False, default=_json_default) + '\n'
+                   for row in rows)
+
+
+# CSV в формате импорта: списки имён через LIST_SEPARATOR
+def encode_csv(rows: Sequence[RowMapping], header: bool) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    if header and rows:
+        writer.writerow(rows[0].keys())
+    for row in rows:
+        writer.writerow([LIST_SEPARATOR.join(v) if isinstance(v, list) else
+                         '' if v is None else v for v in row.values()])
+    return buffer.getvalue()
+
+
+# Выгрузка пачками строк из серверного курсора: сессия живёт, пока отдаётся тело ответа
+def export_response(maker: async_sessionmaker,
+                    fetch: Callable[[Repository, int], AsyncIterator[Sequence[RowMapping]]],
+                    fmt: ImportFormat, filename: str) -> StreamingResponse:
+    async def body() -> AsyncIterator[str]:
+        async with maker() as session:
+            first = True
+            async for rows in fetch(Repository(session), settings.EXPORT_BATCH_SIZE):
+                yield encode_ndjson(rows) if fmt == 'ndjson' else encode_csv(rows, header=first)
+                first = False
+
+    return StreamingResponse(
+        body(), media_type=MEDIA_TYPES[fmt],
+        headers={'Content-Disposition': f'attachment; filename="{filename}.{fmt}"'})
@@ -0,0 +1,41 @@
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from os import cpu_count
+from typing import Any, Callable
+
+from fastapi import HTTPException, status
+
+
+# Пул для CPU-ёмких операций (bcrypt), чтобы не блокировать цикл событий.
+# Одновременно принимается не более workers + queue задач, сверх этого - 429
+class HashPool:
+    def __init__(self, workers: int = 0, queue: int = 0, kind: str = 'process'):
+        self.workers = workers or cpu_count() or 1
+        self.limit = self.workers + queue
+        self.kind = kind
+        self.pending = 0
+        self._executor: Executor | None = None
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == 'thread':
+                self._executor = ThreadPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    async def run(self, func: Callable, *args) -> Any:
+        if self.pending >= self.limit:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail='Server is busy, try later')
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            self.pending -= 1
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
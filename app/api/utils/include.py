@@ -0,0 +1,13 @@
+from typing import Callable, Collection
+from fastapi import HTTPException, status
+
+
+# Параметр include: имена связей через запятую, загружаемых вместе с записями
+def include_param(allowed: Collection[str]) -> Callable[[str], set[str]]:
+    def get_include(include: str = '') -> set[str]:
+        res = {name.strip() for name in include.split(',') if name.strip()}
+        if not res <= set(allowed):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail='Unknown include')
+        return res
+    return get_include
@@ -0,0 +1,183 @@
+import asyncio
+from email.message import EmailMessage
+from typing import Callable, NamedTuple, Sequence
+
+import aiosmtplib
+from jinja2 import Environment, PackageLoader, Template, select_autoescape
+
+from app.config import settings
+from app.log.logger import logger
+from app.log.metrics import counter
+
+
+mail_sent = counter('email_sent_total', 'Outgoing emails by delivery result', ('result',))
+
+# шаблоны не меняются во время работы: без проверки файлов при каждом обращении
+env = Environment(
+    loader=PackageLoader('app', 'templates'),
+    autoescape=select_autoescape(['html', 'xml']),
+    auto_reload=False,
+)
+
+
+# Скомпилированные шаблоны писем по имени, загружаются при первом обращении
+class Templates:
+    def __init__(self, env: Environment):
+        self.env = env
+        self._cache: dict[str, Template] = {}
+
+    def get(self, name: str) -> Template:
+        template = self._cache.get(name)
+        if template is None:
+            template = self._cache[name] = self.env.get_template(f'{name}.html')
+        return template
+
+    def render(self, name: str, **context) -> str:
+        return self.get(name).render(**context)
+
+
+templates = Templates(env)
+
+
+class Mail(NamedTuple):
+    recipients: Sequence[str]
+    subject: str
+    html: str
+
+
+def smtp_client() -> aiosmtplib.SMTP:
+    return aiosmtplib.SMTP(
+        hostname=settings.EMAIL_HOST,
+        port=settings.EMAIL_PORT,
+        username=settings.EMAIL_USERNAME if settings.EMAIL_USE_CREDENTIALS else None,
+        password=settings.EMAIL_PASSWORD.get_secret_value() if settings.EMAIL_USE_CREDENTIALS else None,
+        use_tls=settings.EMAIL_SSL_TLS,
+        start_tls=settings.EMAIL_STARTTLS,
+        validate_certs=settings.EMAIL_VALIDATE_CERTS,
+        timeout=settings.EMAIL_TIMEOUT,
+    )
+
+
+# Временная ошибка (обрыв соединения, таймаут, ответ 4xx) - письмо отправляется повторно
+def is_transient(error: Exception) -> bool:
+    if isinstance(error, aiosmtplib.SMTPResponseException):
+        return 400 <= error.code < 500
+    return isinstance(error, (ConnectionError, TimeoutError, OSError))
+
+
+# Очередь исходящих писем: workers обработчиков, у каждого своё долгоживущее
+# SMTP-соединение (TLS и вход выполняются один раз на соединение).
+# Простаивающее idle_seconds соединение закрывается, временные ошибки повторяются
+# до retries раз с паузой retry_seconds * 2^n
+class MailQueue:
+    def __init__(self, client: Callable[[], aiosmtplib.SMTP], workers: int = 4, retries: int = 3,
+                 retry_seconds: float = 5, idle_seconds: float = 60):
+        self.client = client
+        self.workers = workers
+        self.retries = retries
+        self.retry_seconds = retry_seconds
+        self.idle_seconds = idle_seconds
+        self._queue: asyncio.Queue | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    # Обработчики запускаются в текущем цикле событий; при смене цикла
+    # (тестовый клиент) запускаются заново
+    def start(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    # Ожидание отправки уже поставленных писем (не дольше timeout) и остановка
+    async def stop(self, timeout: float = 10) -> None:
+        if self._loop is not asyncio.get_running_loop():
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"{self._queue.qsize()} emails left unsent on shutdown")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks, self._queue, self._loop = [], None, None
+
+    def submit(self, mail: Mail) -> asyncio.Future:
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((mail, future))
+        return future
+
+    async def send(self, mail: Mail) -> None:
+        await self.submit(mail)
+
+    async def _worker(self) -> None:
+        smtp = None
+        try:
+            while True:
+                try:
+                    mail, future = await asyncio.wait_for(self._queue.get(), self.idle_seconds)
+                except asyncio.TimeoutError:
+                    smtp = await self._close(smtp)
+                    continue
+                try:
+                    smtp = await self._deliver(smtp, mail, future)
+                finally:
+                    self._queue.task_done()
+        finally:
+            await self._close(smtp)
+
+    async def _deliver(self, smtp: aiosmtplib.SMTP | None, mail: Mail,
+                       future: asyncio.Future) -> aiosmtplib.SMTP | None:
+        message = self._message(mail)
+        attempt = 0
+        while True:
+            try:
+                if smtp is None or not smtp.is_connected:
+                    smtp = self.client()
+                    await smtp.connect()
+                await smtp.send_message(message)
+                mail_sent.labels('sent').inc()
+                if not future.done():
+                    future.set_result(None)
+                return smtp
+            except Exception as error:
+                # после ошибки состояние сессии неизвестно - соединение открывается заново
+                smtp = await self._close(smtp)
+                if attempt >= self.retries or not is_transient(error):
+                    mail_sent.labels('failed').inc()
+                    if not future.done():
+                        future.set_exception(error)
+                    return smtp
+                mail_sent.labels('retried').inc()
+                await asyncio.sleep(self.retry_seconds * 2 ** attempt)
+                attempt += 1
+
+    @staticmethod
+    def _message(mail: Mail) -> EmailMessage:
+        message = EmailMessage()
+        message['From'] = settings.EMAIL_FROM
+        message['To'] = ', '.join(mail.recipients)
+        message['Subject'] = mail.subject
+        message.set_content(mail.html, subtype='html')
+        return message
+
+    @staticmethod
+    async def _close(smtp: aiosmtplib.SMTP | None) -> None:
+        if smtp is not None and smtp.is_connected:
+            try:
+                await smtp.quit()
+            except Exception:
+                smtp.close()
+        return None
+
+
+mail_queue = MailQueue(
+    smtp_client,
+    workers=settings.EMAIL_WORKERS,
+    retries=settings.EMAIL_RETRIES,
+    retry_seconds=settings.EMAIL_RETRY_SECONDS,
+    idle_seconds=settings.EMAIL_IDLE_SECONDS,
+)
@@ -0,0 +1,40 @@
+from time import perf_counter
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.log.metrics import histogram, counter
+
+
+request_duration = histogram('http_request_duration_seconds', 'HTTP request latency by route',
+                             ('method', 'route'))
+requests_total = counter('http_requests_total', 'HTTP requests by route and status',
+                         ('method', 'route', 'status'))
+
+
+# ASGI middleware: время обработки и коды ответов по шаблону пути ендпоинта
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = perf_counter()
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # маршрут известен после сопоставления, неизвестные пути - одной меткой
+            route = scope.get("route")
+            path = route.path if route is not None else "unmatched"
+            request_duration.labels(scope["method"], path).observe(perf_counter() - start)
+            requests_total.labels(scope["method"], path, str(status_code)).inc()
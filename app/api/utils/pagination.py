@@ -0,0 +1,27 @@
+from typing import Sequence
+from fastapi import HTTPException, Response, status
+
+from app.db.repositories.pagination import Cursor, decode_cursor, next_cursor
+
+
+# Курсорный режим включается параметром cursor (пустая строка - первая страница),
+# курсор следующей страницы возвращается в заголовке X-Next-Cursor
+NEXT_CURSOR_HEADER = 'X-Next-Cursor'
+
+
+def get_cursor(cursor: str | None = None) -> Cursor | None:
+    if cursor is None:
+        return None
+    try:
+        return decode_cursor(cursor)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail='Invalid cursor')
+
+
+def set_next_cursor(response: Response, rows: Sequence, cursor: Cursor | None,
+                    item_start: int, item_end: int) -> None:
+    if cursor is None:
+        return
+    if (value := next_cursor(rows, item_end - item_start)) is not None:
+        response.headers[NEXT_CURSOR_HEADER] = value
@@ -0,0 +1,33 @@
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+from app.db.query_metrics import QueryLog, query_log
+
+
+# ASGI middleware: учёт запросов SQL на HTTP-запрос (DB_QUERY_GUARD), пороги проверяются
+# в query_metrics. Число и время запросов до начала ответа - в заголовках X-DB-Statements
+# и X-DB-Time (мс); у потоковых ответов запросы тела в заголовки не попадают
+class QueryGuardMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or settings.DB_QUERY_GUARD == 'off':
+            await self.app(scope, receive, send)
+            return
+
+        log = QueryLog()
+
+        async def send_with_stats(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("X-DB-Statements", str(log.count))
+                headers.append("X-DB-Time", f"{log.seconds * 1000:.1f}")
+            await send(message)
+
+        token = query_log.set(log)
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            query_log.reset(token)
@@ -0,0 +1,137 @@
+import json
+from hashlib import sha1
+from typing import Callable
+from urllib.parse import parse_qsl, urlencode
+
+from fastapi.routing import APIRoute
+from starlette.requests import cookie_parser
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.db.cache import response_cache
+from app.db.database import READ_PRIMARY_COOKIE, READ_PRIMARY_SCOPE
+from app.log.metrics import counter
+
+
+cache_requests = counter('http_response_cache_total', 'Response cache lookups by result', ('result',))
+
+# заголовки ответа, которые не сохраняются в кэше
+SKIP_HEADERS = {b'content-length', b'etag', b'cache-control'}
+
+
+# Ендпоинт кэшируется целиком (тело и заголовки ответа) до изменения любой из таблиц
+def cached(*tables: str):
+    def wrapper(func: Callable) -> Callable:
+        func.cache_tables = tables
+        return func
+    return wrapper
+
+
+def _cache_key(scope: Scope, versions: list[int]) -> str:
+    query = sorted(parse_qsl(scope['query_string'].decode('latin-1'), keep_blank_values=True))
+    version = '.'.join(map(str, versions))
+    return f"{scope['path']}?{urlencode(query)}#{version}"
+
+
+def _if_none_match(scope: Scope) -> set[str]:
+    for name, value in scope['headers']:
+        if name == b'if-none-match':
+            return {tag.strip() for tag in value.decode('latin-1').split(',')}
+    return set()
+
+
+def _read_primary(scope: Scope) -> bool:
+    for name, value in scope['headers']:
+        if name == b'cookie' and READ_PRIMARY_COOKIE in cookie_parser(value.decode('latin-1')):
+            return True
+    return False
+
+
+def _etag(body: bytes) -> str:
+    return '"' + sha1(body).hexdigest() + '"'
+
+
+# Запись кэша: строка JSON со статусом, заголовками и ETag, затем тело ответа
+def _pack(status: int, headers: list, etag: str, body: bytes) -> bytes:
+    head = json.dumps({'status': status, 'etag': etag,
+                       'headers': [[k.decode('latin-1'), v.decode('latin-1')] for k, v in headers]})
+    return head.encode() + b'\n' + body
+
+
+def _unpack(value: bytes) -> tuple[int, list, str, bytes]:
+    head, body = value.split(b'\n', 1)
+    data = json.loads(head)
+    headers = [(k.encode('latin-1'), v.encode('latin-1')) for k, v in data['headers']]
+    return data['status'], headers, data['etag'], body
+
+
+# ASGI middleware: ответы GET ендпоинтов, отмеченных @cached, берутся из кэша без
+# обращения к БД; ETag - хеш тела, при совпадении с If-None-Match ответ 304.
+# Промах заполняется чтением с основной БД: отстающая реплика сохранила бы под новой
+# версией таблиц данные до изменения. Клиент, недавно изменявший данные (кука
+# READ_PRIMARY_COOKIE), кэш не читает и не заполняет
+class ResponseCacheMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.routes: dict[str, APIRoute] | None = None
+
+    def _route(self, scope: Scope) -> APIRoute | None:
+        if self.routes is None:
+            self.routes = {route.path: route for route in scope['app'].routes
+                           if isinstance(route, APIRoute) and 'GET' in route.methods
+                           and getattr(route.endpoint, 'cache_tables', None)}
+        return self.routes.get(scope['path'])
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http' or scope['method'] != 'GET':
+            await self.app(scope, receive, send)
+            return
+        route = self._route(scope)
+        if route is None or _read_primary(scope):
+            await self.app(scope, receive, send)
+            return
+
+        versions = await response_cache.versions(route.endpoint.cache_tables)
+        key = _cache_key(scope, versions)
+        value = await response_cache.get(key)
+        if value is not None:
+            cache_requests.labels('hit').inc()
+            scope['route'] = route
+            await self._send(scope, send, *_unpack(value))
+            return
+
+        cache_requests.labels('miss').inc()
+        scope[READ_PRIMARY_SCOPE] = True
+        start: Message | None = None
+        chunks = []
+
+        async def send_buffered(message: Message) -> None:
+            nonlocal start
+            if message['type'] == 'http.response.start':
+                start = message
+            elif message['type'] == 'http.response.body':
+                chunks.append(message.get('body', b''))
+
+        await self.app(scope, receive, send_buffered)
+        body = b''.join(chunks)
+        headers = [(k, v) for k, v in start.get('headers', []) if k.lower() not in SKIP_HEADERS]
+        status = start['status']
+        # кэшируются только успешные ответы без установки cookie
+        if status == 200 and not any(k.lower() == b'set-cookie' for k, _ in headers):
+            etag = _etag(body)
+            await response_cache.set(key, _pack(status, headers, etag, body))
+            await self._send(scope, send, status, headers, etag, body)
+        else:
+            await send(start)
+            await send({'type': 'http.response.body', 'body': body})
+
+    @staticmethod
+    async def _send(scope: Scope, send: Send, status: int, headers: list, etag: str, body: bytes) -> None:
+        tags = _if_none_match(scope)
+        validators = [(b'etag', etag.encode()), (b'cache-control', b'no-cache')]
+        if etag in tags or '*' in tags:
+            await send({'type': 'http.response.start', 'status': 304, 'headers': validators})
+            await send({'type': 'http.response.body', 'body': b''})
+            return
+        headers = headers + validators + [(b'content-length', str(len(body)).encode())]
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': body})
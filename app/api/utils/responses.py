@@ -0,0 +1,44 @@
+from functools import cache, wraps
+from typing import Any, Callable, List
+
+from fastapi import Response
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, TypeAdapter
+
+
+# Ответ приложения по умолчанию (main.py): JSON кодируется orjson
+DefaultResponse = ORJSONResponse
+
+
+@cache
+def schema_adapter(tp: Any) -> TypeAdapter:
+    return TypeAdapter(tp)
+
+
+# JSON схемы (или списка схем одного типа) сериализатором pydantic-core сразу в байты
+def dump_schemas(content: BaseModel | List[BaseModel]) -> bytes:
+    if isinstance(content, list):
+        tp = List[type(content[0])] if content else List[Any]
+    else:
+        tp = type(content)
+    return schema_adapter(tp).dump_json(content)
+
+
+# Ендпоинт возвращает уже проверенные схемы того же типа, что и response_model:
+# ответ сериализуется сразу, без повторной проверки и jsonable_encoder FastAPI.
+# response_model остаётся для документации. Заголовки (cookie) и код параметра response
+# переносятся в ответ. Нельзя использовать, если response_model должен отсечь поля (UserDB -> UserDBPublic)
+def prevalidated(func: Callable) -> Callable:
+    @wraps(func)
+    async def wrapper(*ar, **kw):
+        res = await func(*ar, **kw)
+        if isinstance(res, Response):
+            return res
+        out = Response(content=dump_schemas(res), media_type='application/json')
+        sub_response = kw.get('response')
+        if isinstance(sub_response, Response):
+            out.headers.raw.extend(sub_response.headers.raw)
+            if sub_response.status_code:
+                out.status_code = sub_response.status_code
+        return out
+    return wrapper
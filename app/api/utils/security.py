@@ -1,3 +1,4 @@
+from contextvars import ContextVar
 from passlib.context import CryptContext
 from fastapi.security import OAuth2PasswordBearer, OAuth2AuthorizationCodeBearer
 from jose import jwt, JWTError
@@ -7,6 +8,7 @@ from datetime import datetime, timedelta
 from fastapi import Depends, HTTPException, status, Response, Request
 from app.api.schemas.auth import Tokens
 from app.api.exceptions.auth import AuthenticationError
+from app.api.utils.hash_pool import HashPool
 from app.log.logger import logger
 from app.db.database import get_rep, Repository
 
@@ -19,8 +21,12 @@ def hash_password(password: str):
     return pwd_context.hash(password)
 
 
+def check_password(password, hashed_password) -> bool:
+    return pwd_context.verify(password + settings.SALT, hashed_password)
+
+
 def verify_password(password, hashed_password) -> bool:
-    if not pwd_context.verify(password + settings.SALT, hashed_password):
+    if not check_password(password, hashed_password):
         raise AuthenticationError
     return True
 
@@ -29,6 +35,20 @@ def get_password_hash(password) -> Any:
     return pwd_context.hash(password + settings.SALT)
 
 
+# bcrypt в пуле процессов/потоков, для асинхронных ендпоинтов
+hash_pool = HashPool(settings.HASH_WORKERS, settings.HASH_QUEUE, settings.HASH_POOL)
+
+
+async def verify_password_async(password, hashed_password) -> bool:
+    if not await hash_pool.run(check_password, password, hashed_password):
+        raise AuthenticationError
+    return True
+
+
+async def get_password_hash_async(password) -> Any:
+    return await hash_pool.run(get_password_hash, password)
+
+
 def create_token(subject: dict, expires_time: timedelta) -> str:
     to_encode = subject.copy()
     expire = datetime.now() + expires_time
@@ -38,22 +58,33 @@ def create_token(subject: dict, expires_time: timedelta) -> str:
         algorithm=settings.JWT_ALGORITHM)
     return encoded_jwt
 
+
+# Утверждения токена доступа текущего запроса, читаются декоратором role_req
+token_claims: ContextVar[dict | None] = ContextVar('token_claims', default=None)
+
+
+# Утверждения токена доступа: id пользователя, роль и версия его токенов
+def access_claims(user_id: int, role_id: int, token_version: int) -> dict:
+    return {"sub": str(user_id), "role": role_id, "ver": token_version}
+
+
+def decode_token(token: str) -> dict:
+    return jwt.decode(
+        token,
+        settings.JWT_SECRET_KEY.get_secret_value(),
+        algorithms=[settings.JWT_ALGORITHM])
+
+
 async def require_user(
         request: Request,
         response: Response,
         rep: Repository = Depends(get_rep),) -> int:
     access_token = request.cookies.get("access_token")
     try:
-        payload = jwt.decode(
-            access_token,
-            settings.JWT_SECRET_KEY.get_secret_value(),
-            algorithms=[settings.JWT_ALGORITHM])
-    except AttributeError or JWTError: #AccessTokenExpired:
-        tokens = await refresh(request, response)
-        payload = jwt.decode(
-            tokens.access_token,
-            settings.JWT_SECRET_KEY.get_secret_value(),
-            algorithms=[settings.JWT_ALGORITHM])
+        payload = decode_token(access_token)
+    except (AttributeError, JWTError): #AccessTokenExpired:
+        tokens = await refresh(request, response, rep)
+        payload = decode_token(tokens.access_token)
 
     try:
         user_id = int(payload.get("sub"))
@@ -61,31 +92,44 @@ async def require_user(
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail='Fake token')
 
-    user = await rep.user.get_one(user_id)
-    if not user:
+    access = await rep.user.get_access(user_id)
+    if access is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail='Fake token')
 
+    # роль сменилась после выдачи токена - перевыпускаем токены с текущей ролью.
+    # Кэш прав сбрасывается версией прав пользователя (user_version_key)
+    if (settings.JWT_VERSION_CHECK and "ver" in payload
+            and payload["ver"] != access.token_version):
+        tokens = await refresh(request, response, rep)
+        payload = decode_token(tokens.access_token)
+
     # if not user.verified:
     #     raise HTTPException(
     #         status_code=status.HTTP_403_FORBIDDEN, detail='Please verify your account')
-    return int(payload.get("sub"))
+    token_claims.set(payload)
+    return user_id
 
 
-async def refresh(request: Request, response: Response) -> Tokens:
+async def refresh(request: Request, response: Response, rep: Repository) -> Tokens:
     try:
         refresh_token = request.cookies.get("refresh_token")
-        payload = jwt.decode(refresh_token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
-    except AttributeError or JWTError:
+        payload = decode_token(refresh_token)
+        user_id = int(payload.get("sub"))
+    except (AttributeError, JWTError, TypeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail='Invalid token')
+    # новые токены - с ролью и версией из БД, а не из кэша
+    access = await rep.user.get_access(user_id, cached=False)
+    if access is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail='Invalid token')
     access_token: str = create_token(
-        subject={"sub": payload.get("sub")}, expires_time=timedelta(minutes=settings.ACCESS_MINUTES))
+        subject=access_claims(user_id, *access), expires_time=timedelta(minutes=settings.ACCESS_MINUTES))
     refresh_token: str = create_token(
-        subject={"sub": payload.get("sub")}, expires_time=timedelta(days=settings.REFRESH_DAYS))
+        subject={"sub": str(user_id)}, expires_time=timedelta(days=settings.REFRESH_DAYS))
     tokens = Tokens(access_token=access_token, refresh_token=refresh_token)
     response.set_cookie("access_token", tokens.access_token, httponly=True)
     response.set_cookie("refresh_token", tokens.refresh_token, httponly=True)
-    logger.debug(f"Tokens refreshed for user {payload.get('sub')}")
+    logger.debug(f"Tokens refreshed for user {user_id}")
     return tokens
-
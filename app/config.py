@@ -1,5 +1,6 @@
 from os import getenv
 from pathlib import Path
+from typing import Literal
 
 from pydantic import BaseModel, SecretStr, PostgresDsn, EmailStr, HttpUrl
 from yaml import load
@@ -21,17 +22,58 @@ class Settings(BaseModel):
     DB_ECHO: bool
     DB_ALCHEMY: SecretStr
     DB_ALCHEMY_TEST: SecretStr
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_TIMEOUT_MS: int = 0
+    DB_ALCHEMY_REPLICA: SecretStr | None = None
+    DB_READ_PRIMARY_SECONDS: int = 5
+    DB_QUERY_GUARD: Literal['off', 'log', 'raise'] = 'off'
+    DB_QUERY_BUDGET: int = 0
+    DB_SLOW_QUERY_MS: float = 0
     EMAIL_HOST: str
     EMAIL_PORT: int
     EMAIL_USERNAME: EmailStr
     EMAIL_PASSWORD: SecretStr
     EMAIL_FROM: EmailStr
+    EMAIL_SSL_TLS: bool = True
+    EMAIL_STARTTLS: bool = False
+    EMAIL_USE_CREDENTIALS: bool = True
+    EMAIL_VALIDATE_CERTS: bool = True
+    EMAIL_TIMEOUT: float = 30
+    EMAIL_WORKERS: int = 4
+    EMAIL_RETRIES: int = 3
+    EMAIL_RETRY_SECONDS: float = 5
+    EMAIL_IDLE_SECONDS: float = 60
+    EMAIL_OUTBOX_SECONDS: float = 5
+    EMAIL_OUTBOX_BATCH: int = 100
+    EMAIL_OUTBOX_ATTEMPTS: int = 8
+    EMAIL_OUTBOX_RETRY_SECONDS: float = 60
+    EMAIL_OUTBOX_LEASE_SECONDS: int = 600
     DEFAULT_USERNAME: str
     DEFAULT_PASSWORD: SecretStr
     DEFAULT_EMAIL: EmailStr
     SALT: str
     MAX_AMOUNT: int
-
+    USER_CACHE_SECONDS: int = 60
+    USER_CACHE_SIZE: int = 10000
+    RESPONSE_CACHE_SECONDS: int = 30
+    RESPONSE_CACHE_SIZE: int = 1000
+    RESPONSE_CACHE_URL: str | None = None
+    IMPORT_BATCH_SIZE: int = 5000
+    IMPORT_MAX_ERRORS: int = 1000
+    EXPORT_BATCH_SIZE: int = 1000
+    STATS_REFRESH_SECONDS: int = 300
+    OVERDUE_SCAN_SECONDS: int = 3600
+    OVERDUE_SCAN_BATCH: int = 1000
+    OVERDUE_EMAILS: bool = False
+    JWT_ROLE_CLAIM: bool = True
+    JWT_VERSION_CHECK: bool = True
+    HASH_POOL: Literal['process', 'thread'] = 'process'
+    HASH_WORKERS: int = 0
+    HASH_QUEUE: int = 64
 
 
 def parse_settings() -> Settings:
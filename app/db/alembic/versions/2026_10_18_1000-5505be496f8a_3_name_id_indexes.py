@@ -0,0 +1,33 @@
+"""3_name_id_indexes
+
+Revision ID: 5505be496f8a
+Revises: 0d0ffa955960
+Create Date: 2026-10-18 10:00:12.418263
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5505be496f8a'
+down_revision: Union[str, None] = '0d0ffa955960'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # индексы для курсорной пагинации по (name, id)
+    op.create_index('ix_authors_name_id', 'authors', ['name', 'id'], unique=False)
+    op.create_index('ix_books_name_id', 'books', ['name', 'id'], unique=False)
+    op.create_index('ix_genres_name_id', 'genres', ['name', 'id'], unique=False)
+    op.create_index('ix_users_name_id', 'users', ['name', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_users_name_id', table_name='users')
+    op.drop_index('ix_genres_name_id', table_name='genres')
+    op.drop_index('ix_books_name_id', table_name='books')
+    op.drop_index('ix_authors_name_id', table_name='authors')
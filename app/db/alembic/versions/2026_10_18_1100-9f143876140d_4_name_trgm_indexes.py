@@ -0,0 +1,35 @@
+"""4_name_trgm_indexes
+
+Revision ID: 9f143876140d
+Revises: 5505be496f8a
+Create Date: 2026-10-18 11:00:41.902114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9f143876140d'
+down_revision: Union[str, None] = '5505be496f8a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # триграммные индексы обслуживают LIKE/ILIKE '%phrase%' и оператор похожести %
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index('ix_authors_name_trgm', 'authors', ['name'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+    op.create_index('ix_books_name_trgm', 'books', ['name'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+    op.create_index('ix_genres_name_trgm', 'genres', ['name'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+
+
+def downgrade() -> None:
+    op.drop_index('ix_genres_name_trgm', table_name='genres')
+    op.drop_index('ix_books_name_trgm', table_name='books')
+    op.drop_index('ix_authors_name_trgm', table_name='authors')
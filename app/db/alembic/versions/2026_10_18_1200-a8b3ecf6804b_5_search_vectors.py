@@ -0,0 +1,43 @@
+"""5_search_vectors
+
+Revision ID: a8b3ecf6804b
+Revises: 9f143876140d
+Create Date: 2026-10-18 12:00:07.551380
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8b3ecf6804b'
+down_revision: Union[str, None] = '9f143876140d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# таблица и текстовое поле для search_vector (название - вес A, текст - вес B)
+tables = [
+    ('authors', 'biography'),
+    ('books', 'description'),
+    ('genres', 'description'),
+]
+
+
+def upgrade() -> None:
+    for table, text in tables:
+        op.add_column(table, sa.Column(
+            'search_vector', postgresql.TSVECTOR(),
+            sa.Computed(f"setweight(to_tsvector('russian', name), 'A') || "
+                        f"setweight(to_tsvector('russian', {text}), 'B')", persisted=True),
+            nullable=True))
+        op.create_index(f'ix_{table}_search_vector', table, ['search_vector'], unique=False,
+                        postgresql_using='gin')
+
+
+def downgrade() -> None:
+    for table, _ in reversed(tables):
+        op.drop_index(f'ix_{table}_search_vector', table_name=table)
+        op.drop_column(table, 'search_vector')
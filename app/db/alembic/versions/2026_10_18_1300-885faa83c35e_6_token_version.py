@@ -0,0 +1,27 @@
+"""6_token_version
+
+Revision ID: 885faa83c35e
+Revises: a8b3ecf6804b
+Create Date: 2026-10-18 13:00:52.130447
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '885faa83c35e'
+down_revision: Union[str, None] = 'a8b3ecf6804b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # версия токенов пользователя, увеличивается при смене роли
+    op.add_column('users', sa.Column('token_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'token_version')
@@ -0,0 +1,28 @@
+"""7_user_book_active_unique
+
+Revision ID: d23aaf347a76
+Revises: 885faa83c35e
+Create Date: 2026-10-18 14:00:26.704913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd23aaf347a76'
+down_revision: Union[str, None] = '885faa83c35e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # читатель не может одновременно держать два экземпляра одной книги
+    op.create_index('uq_user_book_active', 'user_book', ['left_id', 'right_id'], unique=True,
+                    postgresql_where=sa.text('returned = false'))
+
+
+def downgrade() -> None:
+    op.drop_index('uq_user_book_active', table_name='user_book')
@@ -0,0 +1,43 @@
+"""8_link_indexes
+
+Revision ID: 6cd3e354839c
+Revises: d23aaf347a76
+Create Date: 2026-10-18 15:00:33.281950
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6cd3e354839c'
+down_revision: Union[str, None] = 'd23aaf347a76'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # первичные ключи (left_id, right_id) не обслуживают поиск по right_id
+    op.create_index('ix_author_book_right_id', 'author_book', ['right_id', 'left_id'], unique=False)
+    op.create_index('ix_genre_book_right_id', 'genre_book', ['right_id', 'left_id'], unique=False)
+    # книги читателя / читатели книги с фильтром по флагу сдачи
+    op.create_index('ix_user_book_left_id_returned', 'user_book', ['left_id', 'returned'], unique=False)
+    op.create_index('ix_user_book_right_id_returned', 'user_book', ['right_id', 'returned'], unique=False)
+    # просроченные несданные: только активные выдачи
+    op.create_index('ix_user_book_active_must_return_at', 'user_book', ['must_return_at'], unique=False,
+                    postgresql_include=['left_id', 'right_id'],
+                    postgresql_where=sa.text('returned = false'))
+    # сданные с опозданием
+    op.create_index('ix_user_book_returned_late', 'user_book', ['left_id'], unique=False,
+                    postgresql_where=sa.text('returned = true AND returned_at > must_return_at'))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_user_book_returned_late', table_name='user_book')
+    op.drop_index('ix_user_book_active_must_return_at', table_name='user_book')
+    op.drop_index('ix_user_book_right_id_returned', table_name='user_book')
+    op.drop_index('ix_user_book_left_id_returned', table_name='user_book')
+    op.drop_index('ix_genre_book_right_id', table_name='genre_book')
+    op.drop_index('ix_author_book_right_id', table_name='author_book')
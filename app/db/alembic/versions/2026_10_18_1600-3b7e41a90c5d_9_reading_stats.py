@@ -0,0 +1,56 @@
+"""9_reading_stats
+
+Revision ID: 3b7e41a90c5d
+Revises: 6cd3e354839c
+Create Date: 2026-10-18 16:00:12.604318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b7e41a90c5d'
+down_revision: Union[str, None] = '6cd3e354839c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# материализованное представление, его запрос и уникальный ключ (нужен для REFRESH CONCURRENTLY)
+views = [
+    ('stats_book_month', """
+        SELECT ub.right_id AS book_id, date_trunc('month', ub.get_at)::date AS month,
+               count(*) AS loans, count(DISTINCT ub.left_id) AS readers
+        FROM user_book ub
+        GROUP BY 1, 2""", ['book_id', 'month']),
+    ('stats_genre_month', """
+        SELECT gb.left_id AS genre_id, date_trunc('month', ub.get_at)::date AS month,
+               count(*) AS loans, count(DISTINCT ub.left_id) AS readers
+        FROM user_book ub JOIN genre_book gb ON gb.right_id = ub.right_id
+        GROUP BY 1, 2""", ['genre_id', 'month']),
+    ('stats_user_genre', """
+        SELECT ub.left_id AS user_id, gb.left_id AS genre_id, ub.returned, count(*) AS loans
+        FROM user_book ub JOIN genre_book gb ON gb.right_id = ub.right_id
+        GROUP BY 1, 2, 3""", ['user_id', 'returned', 'genre_id']),
+    ('stats_user_author', """
+        SELECT ub.left_id AS user_id, ab.left_id AS author_id, ub.returned, count(*) AS loans
+        FROM user_book ub JOIN author_book ab ON ab.right_id = ub.right_id
+        GROUP BY 1, 2, 3""", ['user_id', 'returned', 'author_id']),
+]
+
+
+def upgrade() -> None:
+    for name, query, key in views:
+        op.execute(f"CREATE MATERIALIZED VIEW {name} AS {query}")
+        op.create_index(f'uq_{name}', name, key, unique=True)
+    # рейтинги за месяц
+    op.create_index('ix_stats_book_month_month', 'stats_book_month',
+                    ['month', sa.text('loans DESC')], unique=False)
+    op.create_index('ix_stats_genre_month_month', 'stats_genre_month',
+                    ['month', sa.text('loans DESC')], unique=False)
+
+
+def downgrade() -> None:
+    for name, _, _ in reversed(views):
+        op.execute(f"DROP MATERIALIZED VIEW {name}")
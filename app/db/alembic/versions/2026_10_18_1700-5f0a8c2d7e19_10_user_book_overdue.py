@@ -0,0 +1,38 @@
+"""10_user_book_overdue
+
+Revision ID: 5f0a8c2d7e19
+Revises: 3b7e41a90c5d
+Create Date: 2026-10-18 17:00:41.918204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5f0a8c2d7e19'
+down_revision: Union[str, None] = '3b7e41a90c5d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # флаг просрочки: несданные отмечает фоновая задача, сданные - возврат книги
+    op.add_column('user_book', sa.Column('overdue', sa.Boolean(), server_default=sa.false(), nullable=False))
+    op.execute("""
+        UPDATE user_book SET overdue = CASE WHEN returned THEN returned_at > must_return_at
+                                            ELSE current_date > must_return_at END""")
+    # несданные и ещё не отмеченные - то, что просматривает задача
+    op.create_index('ix_user_book_due', 'user_book', ['must_return_at'], unique=False,
+                    postgresql_where=sa.text('returned = false AND overdue = false'))
+    # читатели с просрочкой
+    op.create_index('ix_user_book_overdue', 'user_book', ['left_id', 'returned'], unique=False,
+                    postgresql_where=sa.text('overdue = true'))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_user_book_overdue', table_name='user_book')
+    op.drop_index('ix_user_book_due', table_name='user_book')
+    op.drop_column('user_book', 'overdue')
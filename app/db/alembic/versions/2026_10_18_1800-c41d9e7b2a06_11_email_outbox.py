@@ -0,0 +1,45 @@
+"""11_email_outbox
+
+Revision ID: c41d9e7b2a06
+Revises: 5f0a8c2d7e19
+Create Date: 2026-10-18 18:00:12.530871
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41d9e7b2a06'
+down_revision: Union[str, None] = '5f0a8c2d7e19'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('email_outbox',
+    sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+    sa.Column('recipients', postgresql.ARRAY(sa.String()), nullable=False),
+    sa.Column('subject', sa.String(), nullable=False),
+    sa.Column('body', sa.String(), nullable=False),
+    sa.Column('attempts', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('next_attempt_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('last_error', sa.String(), nullable=True),
+    sa.Column('dead', sa.Boolean(), server_default=sa.false(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    # письма к отправке - то, что выбирает фоновая задача
+    op.create_index('ix_email_outbox_due', 'email_outbox', ['next_attempt_at'], unique=False,
+                    postgresql_where=sa.text('dead = false'))
+    op.create_index('ix_email_outbox_dead', 'email_outbox', ['id'], unique=False,
+                    postgresql_where=sa.text('dead = true'))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_email_outbox_dead', table_name='email_outbox')
+    op.drop_index('ix_email_outbox_due', table_name='email_outbox')
+    op.drop_table('email_outbox')
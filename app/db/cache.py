@@ -0,0 +1,151 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from time import monotonic
+from typing import Any, Hashable, Iterable, Sequence
+
+from app.config import settings
+
+
+# Кэш в памяти процесса: ограничен по количеству записей (вытесняется самая давно
+# использованная) и по времени жизни записи
+class TTLCache:
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        item = self._data.get(key)
+        if item is None:
+            return default
+        expires, value = item
+        if expires < monotonic():
+            del self._data[key]
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+        self._data[key] = (monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# user_id -> (версия прав, UserAccess(role_id, token_version)), общий для require_user и role_req.
+# Запись действительна, пока версия прав пользователя в хранилище кэша ответов не изменилась
+user_cache = TTLCache(maxsize=settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_SECONDS)
+
+
+# Версия прав пользователя - счётчик хранилища кэша ответов (как версии таблиц):
+# увеличивается после фиксации смены роли или удаления. С общим хранилищем
+# (RESPONSE_CACHE_URL) видна всем воркерам, с локальным - только своему процессу,
+# остальные видят изменение не позже USER_CACHE_SECONDS
+def user_version_key(user_id: int) -> str:
+    return f'user:{user_id}'
+
+
+# Хранилище кэша ответов: локальное в процессе или общее для всех воркеров.
+# Счётчики - версии таблиц, по ним строятся ключи и сбрасывается кэш
+class CacheBackend(ABC):
+    @abstractmethod
+    async def get(self, key: str) -> bytes | None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def counters(self, keys: Sequence[str]) -> list[int]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def incr(self, key: str) -> int:
+        raise NotImplementedError
+
+
+class LocalCacheBackend(CacheBackend):
+    def __init__(self, maxsize: int, ttl: float):
+        self.values = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._counters: dict[str, int] = {}
+
+    async def get(self, key: str) -> bytes | None:
+        return self.values.get(key)
+
+    async def set(self, key: str, value: bytes) -> None:
+        self.values.set(key, value)
+
+    async def counters(self, keys: Sequence[str]) -> list[int]:
+        return [self._counters.get(key, 0) for key in keys]
+
+    async def incr(self, key: str) -> int:
+        self._counters[key] = self._counters.get(key, 0) + 1
+        return self._counters[key]
+
+
+# Общий кэш в Redis (необязательная зависимость redis)
+class RedisCacheBackend(CacheBackend):
+    def __init__(self, url: str, ttl: float, prefix: str = 'library:'):
+        try:
+            from redis.asyncio import Redis
+        except ImportError as e:
+            raise RuntimeError('RESPONSE_CACHE_URL requires the "redis" package') from e
+        self.redis = Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    async def get(self, key: str) -> bytes | None:
+        return await self.redis.get(self.prefix + key)
+
+    async def set(self, key: str, value: bytes) -> None:
+        await self.redis.set(self.prefix + key, value, px=int(self.ttl * 1000))
+
+    async def counters(self, keys: Sequence[str]) -> list[int]:
+        if not keys:
+            return []
+        values = await self.redis.mget([self.prefix + key for key in keys])
+        return [int(v) if v is not None else 0 for v in values]
+
+    async def incr(self, key: str) -> int:
+        return await self.redis.incr(self.prefix + key)
+
+
+# Кэш ответов публичных ендпоинтов каталога. В ключ входят версии таблиц,
+# из которых собран ответ: изменение таблицы делает старые записи недостижимыми
+class ResponseCache:
+    def __init__(self, backend: CacheBackend):
+        self.backend = backend
+
+    async def versions(self, tables: Sequence[str]) -> list[int]:
+        return await self.backend.counters([f'version:{t}' for t in tables])
+
+    async def invalidate(self, tables: Iterable[str]) -> None:
+        for table in sorted(set(tables)):
+            await self.backend.incr(f'version:{table}')
+
+    async def get(self, key: str) -> bytes | None:
+        return await self.backend.get(f'response:{key}')
+
+    async def set(self, key: str, value: bytes) -> None:
+        await self.backend.set(f'response:{key}', value)
+
+
+def make_cache_backend() -> CacheBackend:
+    if settings.RESPONSE_CACHE_URL:
+        return RedisCacheBackend(settings.RESPONSE_CACHE_URL, ttl=settings.RESPONSE_CACHE_SECONDS)
+    return LocalCacheBackend(maxsize=settings.RESPONSE_CACHE_SIZE, ttl=settings.RESPONSE_CACHE_SECONDS)
+
+
+response_cache = ResponseCache(make_cache_backend())
@@ -1,23 +1,106 @@
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, async_sessionmaker
 from app.config import settings
+from app.db.pool import MeteredPool, MeteredSession, register_pool_metrics, observe_session
+from app.db.query_metrics import instrument_engine
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.repositories.repository import Repository
 
-from fastapi import Depends
+from fastapi import Depends, Request, Response
+
+connect_args = {}
+if settings.DB_STATEMENT_TIMEOUT_MS:
+    connect_args["options"] = f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"
+
+
+def make_engine(url: str) -> AsyncEngine:
+    res = create_async_engine(
+        url=url,
+        echo=settings.DB_ECHO,
+        poolclass=MeteredPool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args=connect_args,
+    )
+    instrument_engine(res.sync_engine)
+    return res
 
-engine = create_async_engine(
-    url=settings.DB_ALCHEMY.get_secret_value(),
-    echo=settings.DB_ECHO
-)
 
-async_session_maker = async_sessionmaker(engine, expire_on_commit=False)
+engine = make_engine(settings.DB_ALCHEMY.get_secret_value())
+register_pool_metrics(engine.pool)
+
+async_session_maker = async_sessionmaker(engine, expire_on_commit=False, sync_session_class=MeteredSession)
+
+# Реплика только для чтения; если не задана - чтение идёт с основной БД
+if settings.DB_ALCHEMY_REPLICA is not None:
+    replica_engine = make_engine(settings.DB_ALCHEMY_REPLICA.get_secret_value())
+    register_pool_metrics(replica_engine.pool, prefix='db_replica_pool')
+    replica_session_maker = async_sessionmaker(replica_engine, expire_on_commit=False,
+                                               sync_session_class=MeteredSession)
+else:
+    replica_engine = engine
+    replica_session_maker = async_session_maker
+
+# Кука клиента, недавно изменявшего данные: пока она жива, его чтение идёт
+# с основной БД, чтобы он видел свои изменения несмотря на отставание реплики
+READ_PRIMARY_COOKIE = "read_primary"
+# Ключ scope запроса: чтение с основной БД (ответ заполняет кэш ответов, ResponseCacheMiddleware)
+READ_PRIMARY_SCOPE = "read_primary"
+
+# Сессия запроса: соединение из пула берётся при первом запросе к БД, а не при создании,
+# поэтому отказ в авторизации или ответ из кэша пул не занимают. Учитывается в метриках
+@asynccontextmanager
+async def request_session(maker: async_sessionmaker, engine_name: str) -> AsyncIterator[AsyncSession]:
+    session = maker()
+    try:
+        yield session
+    finally:
+        await session.close()
+        observe_session(session, engine_name)
 
 async def get_db() -> AsyncSession:
-    async with async_session_maker() as session:
+    async with request_session(async_session_maker, 'primary') as session:
         yield session
 
 async def get_rep(session: AsyncSession = Depends(get_db)) -> Repository:
     res = Repository(session)
-    return res
\ No newline at end of file
+    return res
+
+# Фабрика сессий для чтения. Потоковые ответы открывают сессию сами в генераторе
+# ответа, т.к. зависимости с yield закрываются до отправки тела
+async def get_read_session_maker(request: Request) -> async_sessionmaker:
+    if request.cookies.get(READ_PRIMARY_COOKIE) or request.scope.get(READ_PRIMARY_SCOPE):
+        return async_session_maker
+    return replica_session_maker
+
+# Сессия для ендпоинтов только на чтение. Без реплики (или после изменения данных
+# клиентом) это та же сессия запроса, что и у get_rep: одна на авторизацию и чтение
+async def get_read_db(maker: async_sessionmaker = Depends(get_read_session_maker),
+                      session: AsyncSession = Depends(get_db)) -> AsyncSession:
+    if maker is async_session_maker:
+        yield session
+        return
+    async with request_session(maker, 'replica') as replica_session:
+        yield replica_session
+
+async def get_read_rep(session: AsyncSession = Depends(get_read_db),
+                       rep: Repository = Depends(get_rep)) -> Repository:
+    if rep.session is session:
+        return rep
+    res = Repository(session)
+    return res
+
+# Репозиторий с одной транзакцией на запрос: фиксация после ендпоинта, откат при ошибке
+async def get_uow(response: Response, rep: Repository = Depends(get_rep)) -> Repository:
+    if replica_engine is not engine and settings.DB_READ_PRIMARY_SECONDS > 0:
+        response.set_cookie(key=READ_PRIMARY_COOKIE, value="1",
+                            max_age=settings.DB_READ_PRIMARY_SECONDS, httponly=True)
+    async with rep.transaction():
+        yield rep
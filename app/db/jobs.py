@@ -0,0 +1,94 @@
+import asyncio
+from datetime import date, timedelta
+from typing import Awaitable, Callable
+
+from app.api.utils.email import overdue_reminders
+from app.api.utils.mailer import Mail, is_transient, mail_queue
+from app.config import settings
+from app.db.database import async_session_maker
+from app.db.repositories.repository import Repository
+from app.log.logger import logger
+
+
+# Периодическая задача в цикле событий процесса (первый запуск - при старте):
+# ошибка запуска логируется, цикл продолжается
+async def run_periodically(interval: float, job: Callable[[], Awaitable]) -> None:
+    while True:
+        try:
+            await job()
+        except Exception:
+            logger.exception(f"Job {job.__name__} failed")
+        await asyncio.sleep(interval)
+
+
+async def refresh_stats() -> None:
+    async with async_session_maker() as session:
+        if await Repository(session).stats.refresh():
+            logger.debug("Reading statistics refreshed")
+
+
+# Отметка просроченных выдач пакетами; напоминания читателям ставятся
+# в очередь исходящих в той же транзакции
+async def scan_overdue() -> None:
+    today = date.today()
+    while True:
+        async with async_session_maker() as session:
+            rep = Repository(session)
+            async with rep.transaction():
+                loans = await rep.user.mark_overdue(today, settings.OVERDUE_SCAN_BATCH)
+                if settings.OVERDUE_EMAILS:
+                    await rep.outbox.add(overdue_reminders(loans))
+        if loans:
+            logger.info(f"{len(loans)} loans marked overdue")
+        if len(loans) < settings.OVERDUE_SCAN_BATCH:
+            break
+
+
+# Отправка писем из очереди исходящих пакетами через mail_queue (не больше
+# EMAIL_WORKERS одновременно). Временная ошибка - повтор через
+# EMAIL_OUTBOX_RETRY_SECONDS * 2^(попытка-1), постоянная или последняя попытка - письмо
+# откладывается (dead) до повтора администратором
+async def deliver_outbox() -> None:
+    lease = timedelta(seconds=settings.EMAIL_OUTBOX_LEASE_SECONDS)
+    while True:
+        async with async_session_maker() as session:
+            mails = await Repository(session).outbox.claim(settings.EMAIL_OUTBOX_BATCH, lease)
+        if not mails:
+            break
+        results = await asyncio.gather(
+            *[mail_queue.submit(Mail(mail.recipients, mail.subject, mail.body)) for mail in mails],
+            return_exceptions=True)
+
+        async with async_session_maker() as session:
+            rep = Repository(session)
+            async with rep.transaction():
+                await rep.outbox.delivered([mail.id for mail, error in zip(mails, results) if error is None])
+                for mail, error in zip(mails, results):
+                    if error is None:
+                        continue
+                    if mail.attempts >= settings.EMAIL_OUTBOX_ATTEMPTS or not is_transient(error):
+                        logger.warning(f"Email id={mail.id} to {mail.recipients} dead-lettered: {error}")
+                        await rep.outbox.failed(mail.id, str(error), None)
+                    else:
+                        retry_in = timedelta(seconds=settings.EMAIL_OUTBOX_RETRY_SECONDS * 2 ** (mail.attempts - 1))
+                        await rep.outbox.failed(mail.id, str(error), retry_in)
+        if len(mails) < settings.EMAIL_OUTBOX_BATCH:
+            break
+
+
+# Запуск фоновых задач при старте приложения (lifespan)
+def start_jobs() -> list[asyncio.Task]:
+    tasks = []
+    if settings.EMAIL_OUTBOX_SECONDS > 0:
+        tasks.append(asyncio.create_task(run_periodically(settings.EMAIL_OUTBOX_SECONDS, deliver_outbox)))
+    if settings.OVERDUE_SCAN_SECONDS > 0:
+        tasks.append(asyncio.create_task(run_periodically(settings.OVERDUE_SCAN_SECONDS, scan_overdue)))
+    if settings.STATS_REFRESH_SECONDS > 0:
+        tasks.append(asyncio.create_task(run_periodically(settings.STATS_REFRESH_SECONDS, refresh_stats)))
+    return tasks
+
+
+async def stop_jobs(tasks: list[asyncio.Task]) -> None:
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
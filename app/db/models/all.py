@@ -1,16 +1,29 @@
-from sqlalchemy import String, Integer, Date, Boolean, ForeignKey, func
+from sqlalchemy import (String, Integer, BigInteger, Date, DateTime, Boolean, ForeignKey, Index, Computed,
+                        func, text)
+from sqlalchemy.dialects.postgresql import ARRAY, TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from datetime import date, timedelta
+from datetime import date, datetime, timedelta
 from app.db.models.base import Base
 from typing import List
 from app.api.schemas.all import (BookDB, BookWithUsersDB, UserBookDB, UserBookWithBookDB,
-                                 AuthorDB, GenreDB, UserDB, UserDBPublic, UserWithBooksDB, UserWithBooksBookDB)
+                                 AuthorDB, GenreDB, UserDB, UserDBPublic, UserWithBooksDB, UserWithBooksBookDB,
+                                 BookWithRelationsDB, AuthorWithRelationsDB, GenreWithRelationsDB, EmailOutboxDB)
+
+
+# Полнотекстовый вектор: название с весом A, текст с весом B
+def computed_search_vector(text: str) -> Computed:
+    return Computed(f"setweight(to_tsvector('russian', name), 'A') || "
+                    f"setweight(to_tsvector('russian', {text}), 'B')", persisted=True)
+
 
 # TODO: id: Mapped[UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid4)
 
 
 class AuthorBook(Base):
     __tablename__ = 'author_book'
+    __table_args__ = (
+        Index('ix_author_book_right_id', 'right_id', 'left_id'),
+    )
 
     left_id: Mapped[int] = mapped_column(ForeignKey("authors.id"), primary_key=True)
     right_id: Mapped[int] = mapped_column(ForeignKey("books.id"), primary_key=True)
@@ -21,6 +34,9 @@ class AuthorBook(Base):
 
 class GenreBook(Base):
     __tablename__ = 'genre_book'
+    __table_args__ = (
+        Index('ix_genre_book_right_id', 'right_id', 'left_id'),
+    )
 
     left_id: Mapped[int] = mapped_column(ForeignKey("genres.id"), primary_key=True)
     right_id: Mapped[int] = mapped_column(ForeignKey("books.id"), primary_key=True)
@@ -31,6 +47,21 @@ class GenreBook(Base):
 
 class UserBook(Base):
     __tablename__ = 'user_book'
+    __table_args__ = (
+        Index('uq_user_book_active', 'left_id', 'right_id', unique=True,
+              postgresql_where=text('returned = false')),
+        Index('ix_user_book_left_id_returned', 'left_id', 'returned'),
+        Index('ix_user_book_right_id_returned', 'right_id', 'returned'),
+        Index('ix_user_book_active_must_return_at', 'must_return_at',
+              postgresql_include=['left_id', 'right_id'],
+              postgresql_where=text('returned = false')),
+        Index('ix_user_book_returned_late', 'left_id',
+              postgresql_where=text('returned = true AND returned_at > must_return_at')),
+        Index('ix_user_book_due', 'must_return_at',
+              postgresql_where=text('returned = false AND overdue = false')),
+        Index('ix_user_book_overdue', 'left_id', 'returned',
+              postgresql_where=text('overdue = true')),
+    )
 
     id: Mapped[int] = mapped_column(Integer, autoincrement=True, primary_key=True)
 
@@ -43,6 +74,8 @@ class UserBook(Base):
                                                server_default=func.now() + timedelta(days=14))
     returned_at: Mapped[date] = mapped_column(Date, nullable=True)
     returned: Mapped[bool] = mapped_column(Boolean, default=False)
+    # просрочена (для несданных обновляется фоновой задачей)
+    overdue: Mapped[bool] = mapped_column(Boolean, nullable=False, server_default='false')
 
     user: Mapped["User"] = relationship(back_populates="books")
     book: Mapped["Book"] = relationship(back_populates="users")
@@ -73,12 +106,23 @@ class UserBook(Base):
 
 class Author(Base):
     __tablename__ = 'authors'
+    __table_args__ = (
+        Index('ix_authors_name_id', 'name', 'id'),
+        Index('ix_authors_name_trgm', 'name',
+              postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}),
+        Index('ix_authors_search_vector', 'search_vector', postgresql_using='gin'),
+    )
 
     id: Mapped[int] = mapped_column(Integer, autoincrement=True, primary_key=True)
     books: Mapped[List["AuthorBook"]] = relationship(back_populates='author')
+    # книги напрямую через author_book, только для чтения (пакетная загрузка связей)
+    book_list: Mapped[List["Book"]] = relationship(secondary='author_book', viewonly=True,
+                                                   order_by='Book.name')
     name: Mapped[str] = mapped_column(String, nullable=False)
     biography: Mapped[str] = mapped_column(String, nullable=False)
     born: Mapped[date] = mapped_column(Date, nullable=False)
+    search_vector: Mapped[str] = mapped_column(TSVECTOR, computed_search_vector('biography'),
+                                               nullable=True, deferred=True)
 
     def to_schema(self) -> AuthorDB:
         return AuthorDB(
@@ -88,14 +132,33 @@ class Author(Base):
             born=self.born,
         )
 
+    def to_schema_with(self, include: set[str]) -> AuthorWithRelationsDB:
+        return AuthorWithRelationsDB(
+            id=self.id,
+            name=self.name,
+            biography=self.biography,
+            born=self.born,
+            books=[Book.to_schema(b) for b in self.book_list] if 'books' in include else None,
+        )
+
 
 class Genre(Base):
     __tablename__ = 'genres'
+    __table_args__ = (
+        Index('ix_genres_name_id', 'name', 'id'),
+        Index('ix_genres_name_trgm', 'name',
+              postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}),
+        Index('ix_genres_search_vector', 'search_vector', postgresql_using='gin'),
+    )
 
     id: Mapped[int] = mapped_column(Integer, autoincrement=True, primary_key=True)
     books: Mapped[List["GenreBook"]] = relationship(back_populates='genre')
+    book_list: Mapped[List["Book"]] = relationship(secondary='genre_book', viewonly=True,
+                                                   order_by='Book.name')
     name: Mapped[str] = mapped_column(String, nullable=False)
     description: Mapped[str] = mapped_column(String, nullable=False)
+    search_vector: Mapped[str] = mapped_column(TSVECTOR, computed_search_vector('description'),
+                                               nullable=True, deferred=True)
 
     def to_schema(self) -> GenreDB:
         return GenreDB(
@@ -104,15 +167,27 @@ class Genre(Base):
             description=self.description,
         )
 
+    def to_schema_with(self, include: set[str]) -> GenreWithRelationsDB:
+        return GenreWithRelationsDB(
+            id=self.id,
+            name=self.name,
+            description=self.description,
+            books=[Book.to_schema(b) for b in self.book_list] if 'books' in include else None,
+        )
+
 
 class User(Base):
     __tablename__ = 'users'
+    __table_args__ = (
+        Index('ix_users_name_id', 'name', 'id'),
+    )
 
     id: Mapped[int] = mapped_column(Integer, autoincrement=True, primary_key=True)
     name: Mapped[str] = mapped_column(String, nullable=False)
     hashed_password: Mapped[str] = mapped_column(String, nullable=False)
     email: Mapped[str] = mapped_column(String, nullable=False)
     role_id: Mapped[int] = mapped_column(Integer, default=0)
+    token_version: Mapped[int] = mapped_column(Integer, nullable=False, server_default='0')
     born: Mapped[date] = mapped_column(Date, nullable=False)
     verified: Mapped[bool] = mapped_column(Boolean, default=False)
     refresh_token: Mapped[str] = mapped_column(String, nullable=True)
@@ -169,6 +244,12 @@ class User(Base):
 
 class Book(Base):
     __tablename__ = 'books'
+    __table_args__ = (
+        Index('ix_books_name_id', 'name', 'id'),
+        Index('ix_books_name_trgm', 'name',
+              postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}),
+        Index('ix_books_search_vector', 'search_vector', postgresql_using='gin'),
+    )
 
     id: Mapped[int] = mapped_column(Integer, autoincrement=True, primary_key=True)
     name: Mapped[str] = mapped_column(String, nullable=False)
@@ -177,7 +258,14 @@ class Book(Base):
     authors: Mapped[List["AuthorBook"]] = relationship(back_populates='book')
     genres: Mapped[List["GenreBook"]] = relationship(back_populates='book')
     users: Mapped[List["UserBook"]] = relationship(back_populates='book')
+    # авторы и жанры напрямую через таблицы связей, только для чтения
+    author_list: Mapped[List["Author"]] = relationship(secondary='author_book', viewonly=True,
+                                                       order_by='Author.name')
+    genre_list: Mapped[List["Genre"]] = relationship(secondary='genre_book', viewonly=True,
+                                                     order_by='Genre.name')
     amount: Mapped[int] = mapped_column(Integer, nullable=True)
+    search_vector: Mapped[str] = mapped_column(TSVECTOR, computed_search_vector('description'),
+                                               nullable=True, deferred=True)
 
     def to_schema(self) -> BookDB:
         return BookDB(
@@ -194,4 +282,49 @@ class Book(Base):
             description=self.description,
             publish_year=self.publish_year,
             users=[UserBook.to_schema(u) for u in self.users],
-            amount=self.amount,)
\ No newline at end of file
+            amount=self.amount,)
+
+    def to_schema_with(self, include: set[str]) -> BookWithRelationsDB:
+        return BookWithRelationsDB(
+            id=self.id,
+            name=self.name,
+            description=self.description,
+            publish_year=self.publish_year,
+            amount=self.amount,
+            authors=[Author.to_schema(a) for a in self.author_list] if 'authors' in include else None,
+            genres=[Genre.to_schema(g) for g in self.genre_list] if 'genres' in include else None,
+        )
+
+
+# Исходящие письма: записываются в транзакции изменения данных, отправляются фоновой задачей.
+# Отправленные удаляются, не отправленные за EMAIL_OUTBOX_ATTEMPTS попыток остаются с dead = true
+class EmailOutbox(Base):
+    __tablename__ = 'email_outbox'
+    __table_args__ = (
+        Index('ix_email_outbox_due', 'next_attempt_at',
+              postgresql_where=text('dead = false')),
+        Index('ix_email_outbox_dead', 'id',
+              postgresql_where=text('dead = true')),
+    )
+
+    id: Mapped[int] = mapped_column(BigInteger, autoincrement=True, primary_key=True)
+    recipients: Mapped[List[str]] = mapped_column(ARRAY(String), nullable=False)
+    subject: Mapped[str] = mapped_column(String, nullable=False)
+    body: Mapped[str] = mapped_column(String, nullable=False)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, server_default='0')
+    next_attempt_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False,
+                                                      server_default=func.now())
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False,
+                                                 server_default=func.now())
+    last_error: Mapped[str] = mapped_column(String, nullable=True)
+    dead: Mapped[bool] = mapped_column(Boolean, nullable=False, server_default='false')
+
+    def to_schema(self) -> EmailOutboxDB:
+        return EmailOutboxDB(
+            id=self.id,
+            recipients=self.recipients,
+            subject=self.subject,
+            attempts=self.attempts,
+            created_at=self.created_at,
+            last_error=self.last_error,
+        )
@@ -0,0 +1,73 @@
+from time import perf_counter
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.log.metrics import histogram, counter, gauge
+
+
+# Время ожидания свободного соединения пула, секунды
+pool_wait = histogram('db_pool_wait_seconds', 'Time spent waiting for a pooled connection').labels()
+request_sessions = counter('db_request_sessions_total',
+                           'Request sessions by engine and whether they checked out a connection',
+                           ('engine', 'connection'))
+session_connected = histogram('db_request_session_connected_seconds',
+                              'Time from the first query of a request session to its close', ('engine',))
+
+# Ключ session.info: момент первого получения соединения сессией
+CONNECTED_AT = 'connected_at'
+
+
+# Пул соединений, замеряющий ожидание соединения
+class MeteredPool(AsyncAdaptedQueuePool):
+    def _do_get(self):
+        start = perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_wait.observe(perf_counter() - start)
+
+
+# Сессия, запоминающая момент первого получения соединения: сессия SQLAlchemy
+# берёт соединение из пула только при первом запросе
+class MeteredSession(Session):
+    pass
+
+
+@event.listens_for(MeteredSession, 'after_begin')
+def _after_begin(session, transaction, connection):
+    session.info.setdefault(CONNECTED_AT, perf_counter())
+
+
+# Учёт закрытой сессии запроса: было ли получено соединение и как долго сессия им владела
+def observe_session(session: Session, engine: str) -> None:
+    connected_at = session.info.get(CONNECTED_AT)
+    if connected_at is None:
+        request_sessions.labels(engine, 'unused').inc()
+    else:
+        request_sessions.labels(engine, 'used').inc()
+        session_connected.labels(engine).observe(perf_counter() - connected_at)
+
+
+def pool_stats(pool: AsyncAdaptedQueuePool) -> dict:
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "max_overflow": pool._max_overflow,
+        "wait_seconds": {
+            "buckets": pool_wait.cumulative(),
+            "count": pool_wait.count,
+            "sum": pool_wait.sum,
+        },
+    }
+
+
+# Состояние пула в общем реестре метрик (/metrics/)
+def register_pool_metrics(pool: AsyncAdaptedQueuePool, prefix: str = 'db_pool') -> None:
+    gauge(f'{prefix}_size', 'Configured pool size', pool.size)
+    gauge(f'{prefix}_checked_in', 'Idle connections in the pool', pool.checkedin)
+    gauge(f'{prefix}_checked_out', 'Connections in use', pool.checkedout)
+    gauge(f'{prefix}_overflow', 'Connections opened beyond pool size', pool.overflow)
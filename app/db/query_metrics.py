@@ -0,0 +1,89 @@
+from contextvars import ContextVar
+from functools import wraps
+from inspect import iscoroutinefunction
+from time import perf_counter
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.config import settings
+from app.log.logger import logger
+from app.log.metrics import histogram, counter
+
+
+# Метод репозитория, выполняющий запрос (например, BookRepository.get_authors)
+query_source: ContextVar[str] = ContextVar('query_source', default='other')
+
+query_duration = histogram('db_query_duration_seconds', 'SQL statement latency by repository method',
+                           ('source',))
+query_rows = counter('db_query_rows_total', 'Rows returned or affected by repository method',
+                     ('source',))
+
+
+# Превышен бюджет запросов SQL на HTTP-запрос или порог медленного запроса (DB_QUERY_GUARD: raise)
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+# Запросы SQL текущего HTTP-запроса: число и суммарное время, секунды
+class QueryLog:
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+
+# Учёт ведётся, пока задан (QueryGuardMiddleware при DB_QUERY_GUARD != off)
+query_log: ContextVar[QueryLog | None] = ContextVar('query_log', default=None)
+
+
+def _guard_failed(message: str) -> None:
+    if settings.DB_QUERY_GUARD == 'raise':
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
+
+
+# Публичные асинхронные методы класса выполняются с query_source = "Класс.метод"
+def instrument_repository(cls) -> None:
+    for name, func in list(vars(cls).items()):
+        if name.startswith('_') or not iscoroutinefunction(func):
+            continue
+        setattr(cls, name, _with_source(name, func))
+
+
+def _with_source(name: str, func):
+    @wraps(func)
+    async def wrapper(self, *ar, **kw):
+        token = query_source.set(f'{type(self).__name__}.{name}')
+        try:
+            return await func(self, *ar, **kw)
+        finally:
+            query_source.reset(token)
+    return wrapper
+
+
+def instrument_engine(engine: Engine) -> None:
+    @event.listens_for(engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_start', []).append(perf_counter())
+        log = query_log.get()
+        if log is None:
+            return
+        log.count += 1
+        # сообщаем один раз - на первом запросе сверх бюджета
+        if settings.DB_QUERY_BUDGET and log.count == settings.DB_QUERY_BUDGET + 1:
+            _guard_failed(f'Query budget {settings.DB_QUERY_BUDGET} exceeded in {query_source.get()}: '
+                          f'{statement[:200]}')
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = perf_counter() - conn.info['query_start'].pop()
+        source = query_source.get()
+        query_duration.labels(source).observe(elapsed)
+        if cursor.rowcount > 0:
+            query_rows.labels(source).inc(cursor.rowcount)
+        log = query_log.get()
+        if log is None:
+            return
+        log.seconds += elapsed
+        if settings.DB_SLOW_QUERY_MS and elapsed * 1000 > settings.DB_SLOW_QUERY_MS:
+            _guard_failed(f'Slow query {elapsed * 1000:.1f} ms in {source}: {statement[:200]}')
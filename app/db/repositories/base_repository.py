@@ -1,10 +1,77 @@
 from abc import ABC, abstractmethod
 
-from sqlalchemy import select, insert, update, delete, and_, func, Sequence, Row
+from functools import cache
+
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy import select, insert, update, delete, and_, or_, func, Sequence, Row, Select
 from sqlalchemy.orm import selectinload
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.dialects.postgresql import insert
-from typing import List
+from typing import Collection, List
+
+from app.db.repositories.pagination import Cursor, paginate
+from app.db.query_metrics import instrument_repository
+from app.db.cache import response_cache, user_version_key
+
+
+# Ключ session.info: внутри Repository.transaction() фиксация откладывается до конца блока
+DEFERRED_COMMIT = 'deferred_commit'
+# Ключ session.info: таблицы, изменённые в текущей транзакции
+CHANGED_TABLES = 'changed_tables'
+# Ключ session.info: id пользователей, чьи права (роль, версия токенов) изменены в транзакции
+CHANGED_USERS = 'changed_users'
+
+
+def mark_changed(session: AsyncSession, *tables: str) -> None:
+    session.info.setdefault(CHANGED_TABLES, set()).update(tables)
+
+
+def mark_user_changed(session: AsyncSession, user_id: int) -> None:
+    session.info.setdefault(CHANGED_USERS, set()).add(user_id)
+
+
+# Сброс кэша ответов по таблицам и версий прав пользователей, изменённых в зафиксированной
+# транзакции: до фиксации параллельный запрос закэшировал бы прежние права
+async def invalidate_changed(session: AsyncSession) -> None:
+    tables = session.info.pop(CHANGED_TABLES, set())
+    users = session.info.pop(CHANGED_USERS, set())
+    if tables or users:
+        await response_cache.invalidate([*tables, *map(user_version_key, users)])
+
+
+# Фиксация изменений: сразу, либо (в единице работы) только flush для получения id
+async def commit_or_flush(session: AsyncSession) -> None:
+    if session.info.get(DEFERRED_COMMIT):
+        await session.flush()
+    else:
+        await session.commit()
+        await invalidate_changed(session)
+
+
+# Быстрый путь чтения: выбираются только столбцы схемы ответа, строки (Row) проверяются
+# одним вызовом TypeAdapter(List[схема]) - без ORM-объектов, identity map и to_schema
+def select_schema(model, schema: type[BaseModel]) -> Select:
+    return select(*[getattr(model, name) for name in schema.model_fields])
+
+
+@cache
+def rows_adapter(schema: type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(List[schema])
+
+
+def to_schemas(schema: type[BaseModel], rows: Sequence[Row]) -> list:
+    return rows_adapter(schema).validate_python(rows, from_attributes=True)
+
+
+def escape_like(phrase: str) -> str:
+    return phrase.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+# Запросы методов репозиториев-наследников учитываются в метриках по имени метода
+class InstrumentedRepository:
+    def __init_subclass__(cls, **kw):
+        super().__init_subclass__(**kw)
+        instrument_repository(cls)
 
 
 class AbstractRepositoryData(ABC):
@@ -23,11 +90,22 @@ class AbstractRepositoryData(ABC):
         raise NotImplementedError
 
     @abstractmethod
-    async def get(self, item_start: int, item_end: int) -> List[Model]:
+    async def get(self, item_start: int, item_end: int,
+                  cursor: Cursor | None = None) -> List[Model]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_names_like(self, phrase: str, item_start: int, item_end: int,
+                             cursor: Cursor | None = None) -> List[Model]:
         raise NotImplementedError
 
     @abstractmethod
-    async def get_names_like(self, phrase: str, item_start: int, item_end: int) -> List[Model]:
+    async def get_names_similar(self, phrase: str, item_start: int, item_end: int) -> List[Model]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_with(self, include: Collection[str], item_start: int, item_end: int,
+                       cursor: Cursor | None = None, ids: List[int] | None = None) -> List[Model]:
         raise NotImplementedError
 
     @abstractmethod
@@ -39,16 +117,27 @@ class AbstractRepositoryData(ABC):
         raise NotImplementedError
 
 
-class RepositoryData(AbstractRepositoryData):
+class RepositoryData(AbstractRepositoryData, InstrumentedRepository):
     Model = None
+    # схема строки списков (get, get_names_like, get_names_similar)
+    Schema: type[BaseModel] = None
+    # имя связи в параметре include -> relationship модели
+    Relations: dict = {}
 
     def __init__(self, session: AsyncSession):
         self.session = session
 
+    async def commit(self) -> None:
+        await commit_or_flush(self.session)
+
+    def changed(self) -> None:
+        mark_changed(self.session, self.Model.__tablename__)
+
     async def create(self, data: dict) -> Model:
         stmt = insert(self.Model).values(**data).returning(self.Model)
         res = await self.session.execute(stmt)
-        await self.session.commit()
+        self.changed()
+        await self.commit()
         return res.scalars().first()
 
     async def get_by_name(self, name: str) -> Model:
@@ -61,31 +150,60 @@ class RepositoryData(AbstractRepositoryData):
         res = await self.session.execute(stmt)
         return res.scalars().first()
 
-    async def get(self, item_start: int, item_end: int) -> Sequence[Row]:
-        stmt = (select(self.Model).
-                order_by(self.Model.name).
-                slice(item_start, item_end))
+    async def get(self, item_start: int, item_end: int,
+                  cursor: Cursor | None = None) -> List[Schema]:
+        stmt = (select_schema(self.Model, self.Schema).
+                order_by(self.Model.name))
+        stmt = paginate(stmt, self.Model, item_start, item_end, cursor)
         res = await self.session.execute(stmt)
-        return res.scalars().all()
+        return to_schemas(self.Schema, res.all())
 
-    async def get_names_like(self, phrase: str, item_start: int, item_end: int) -> Sequence[Row]:
-        stmt = (select(self.Model).
+    async def get_names_like(self, phrase: str, item_start: int, item_end: int,
+                             cursor: Cursor | None = None) -> List[Schema]:
+        stmt = (select_schema(self.Model, self.Schema).
                 where(self.Model.name.contains(phrase)).
-                order_by(self.Model.name).
+                order_by(self.Model.name))
+        stmt = paginate(stmt, self.Model, item_start, item_end, cursor)
+        res = await self.session.execute(stmt)
+        return to_schemas(self.Schema, res.all())
+
+    # Нечёткий поиск без учёта регистра: подстрока (ILIKE) или похожесть по триграммам,
+    # сортировка по убыванию похожести. Оба условия обслуживаются GIN индексом gin_trgm_ops
+    async def get_names_similar(self, phrase: str, item_start: int, item_end: int) -> List[Schema]:
+        similarity = func.similarity(self.Model.name, phrase)
+        stmt = (select_schema(self.Model, self.Schema).
+                where(or_(self.Model.name.ilike(f'%{escape_like(phrase)}%', escape='\\'),
+                          self.Model.name.op('%')(phrase))).
+                order_by(similarity.desc(), self.Model.name, self.Model.id).
                 slice(item_start, item_end))
         res = await self.session.execute(stmt)
+        return to_schemas(self.Schema, res.all())
+
+    # Страница записей вместе со связями include: один запрос на записи и по одному
+    # на каждую связь (selectinload по id всей страницы), независимо от размера страницы
+    async def get_with(self, include: Collection[str], item_start: int, item_end: int,
+                       cursor: Cursor | None = None, ids: List[int] | None = None) -> Sequence[Row]:
+        stmt = (select(self.Model).
+                options(*[selectinload(self.Relations[name]) for name in include]).
+                order_by(self.Model.name))
+        if ids:
+            stmt = stmt.where(self.Model.id.in_(ids))
+        stmt = paginate(stmt, self.Model, item_start, item_end, cursor)
+        res = await self.session.execute(stmt)
         return res.scalars().all()
 
     async def update(self, update_id: int, **kw) -> Model:
         stmt = update(self.Model).where(and_(self.Model.id == update_id)).values(kw).returning(self.Model)
         res = await self.session.execute(stmt)
-        await self.session.commit()
+        self.changed()
+        await self.commit()
         return res.scalars().first()
 
     async def delete_data(self, delete_id: int) -> Model:
         stmt = delete(self.Model).where(and_(self.Model.id == delete_id)).returning(self.Model)
         res = await self.session.execute(stmt)
-        await self.session.commit()
+        self.changed()
+        await self.commit()
         return res.scalars().first()
 
 
@@ -122,12 +240,18 @@ class AbstractRepositoryLink(ABC):
         raise NotImplementedError
 
 
-class RepositoryLink(AbstractRepositoryLink):
+class RepositoryLink(AbstractRepositoryLink, InstrumentedRepository):
     Model = None
 
     def __init__(self, session: AsyncSession):
         self.session = session
 
+    async def commit(self) -> None:
+        await commit_or_flush(self.session)
+
+    def changed(self) -> None:
+        mark_changed(self.session, self.Model.__tablename__)
+
     async def get_link(self, left_id, right_id, aux: bool = None) -> Model:
         stmt = select(self.Model).where(
             and_(self.Model.left_id == left_id,
@@ -142,7 +266,8 @@ class RepositoryLink(AbstractRepositoryLink):
                 on_conflict_do_nothing().
                 returning(self.Model))
         res = await self.session.execute(stmt)
-        await self.session.commit()
+        self.changed()
+        await self.commit()
         return res.scalars().first()
 
     async def delete_one_link(self, left_id, right_id) -> int():
@@ -150,19 +275,22 @@ class RepositoryLink(AbstractRepositoryLink):
             and_(self.Model.left_id == left_id,
                  self.Model.right_id == right_id, ))
         res = await self.session.execute(stmt)
-        await self.session.commit()
+        self.changed()
+        await self.commit()
         return res.rowcount
 
     async def delete_all_left_links(self, left_id) -> int():
         stmt = delete(self.Model).where(and_(self.Model.left_id == left_id))
         res = await self.session.execute(stmt)
-        await self.session.commit()
+        self.changed()
+        await self.commit()
         return res.rowcount
 
     async def delete_all_right_links(self, right_id) -> int():
         stmt = delete(self.Model).where(and_(self.Model.right_id == right_id))
         res = await self.session.execute(stmt)
-        await self.session.commit()
+        self.changed()
+        await self.commit()
         return res.rowcount
 
     async def count_links_left(self, left_id) -> int():
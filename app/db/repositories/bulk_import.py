@@ -0,0 +1,147 @@
+from typing import NamedTuple, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.repositories.base_repository import InstrumentedRepository, mark_changed
+
+
+# Промежуточная таблица пакета: имя, столбцы (имя, тип postgres), целевые таблицы
+class Staging(NamedTuple):
+    table: str
+    columns: tuple[tuple[str, str], ...]
+    changes: tuple[str, ...]
+
+
+STAGING = {
+    'authors': Staging('import_authors', (
+        ('name', 'text'), ('biography', 'text'), ('born', 'date'),
+    ), ('authors',)),
+    'genres': Staging('import_genres', (
+        ('name', 'text'), ('description', 'text'),
+    ), ('genres',)),
+    'books': Staging('import_books', (
+        ('name', 'text'), ('description', 'text'), ('publish_year', 'int4'), ('amount', 'int4'),
+        ('authors', 'text[]'), ('genres', 'text[]'),
+    ), ('books', 'author_book', 'genre_book')),
+    'links': Staging('import_links', (
+        ('name', 'text'), ('publish_year', 'int4'), ('authors', 'text[]'), ('genres', 'text[]'),
+    ), ('author_book', 'genre_book')),
+}
+
+# Слияние пакета с таблицей по естественному ключу (книга - название и год, автор -
+# имя и дата рождения, жанр - название): совпавшие записи обновляются, новые вставляются.
+# Повтор строки внутри пакета - берётся последняя
+MERGE = {
+    'authors': """
+        WITH src AS (SELECT DISTINCT ON (name, born) * FROM import_authors
+                     ORDER BY name, born, row_no DESC),
+        upd AS (UPDATE authors t SET biography = s.biography FROM src s
+                WHERE t.name = s.name AND t.born = s.born RETURNING t.id),
+        ins AS (INSERT INTO authors (name, biography, born)
+                SELECT name, biography, born FROM src s
+                WHERE NOT EXISTS (SELECT 1 FROM authors t WHERE t.name = s.name AND t.born = s.born)
+                RETURNING id)
+        SELECT (SELECT count(*) FROM ins), (SELECT count(*) FROM upd)""",
+    'genres': """
+        WITH src AS (SELECT DISTINCT ON (name) * FROM import_genres
+                     ORDER BY name, row_no DESC),
+        upd AS (UPDATE genres t SET description = s.description FROM src s
+                WHERE t.name = s.name RETURNING t.id),
+        ins AS (INSERT INTO genres (name, description)
+                SELECT name, description FROM src s
+                WHERE NOT EXISTS (SELECT 1 FROM genres t WHERE t.name = s.name)
+                RETURNING id)
+        SELECT (SELECT count(*) FROM ins), (SELECT count(*) FROM upd)""",
+    'books': """
+        WITH src AS (SELECT DISTINCT ON (name, publish_year) * FROM import_books
+                     ORDER BY name, publish_year, row_no DESC),
+        upd AS (UPDATE books t SET description = s.description, amount = s.amount FROM src s
+                WHERE t.name = s.name AND t.publish_year = s.publish_year RETURNING t.id),
+        ins AS (INSERT INTO books (name, description, publish_year, amount)
+                SELECT name, description, publish_year, amount FROM src s
+                WHERE NOT EXISTS (SELECT 1 FROM books t
+                                  WHERE t.name = s.name AND t.publish_year = s.publish_year)
+                RETURNING id)
+        SELECT (SELECT count(*) FROM ins), (SELECT count(*) FROM upd)""",
+}
+
+# Связи книг пакета с авторами/жанрами по имени, существующие связи пропускаются
+LINK = """
+    INSERT INTO {link} (left_id, right_id)
+    SELECT DISTINCT r.id, b.id FROM {staging} s
+    CROSS JOIN LATERAL unnest(s.{names}) AS n(name)
+    JOIN {table} r ON r.name = n.name
+    JOIN books b ON b.name = s.name AND b.publish_year = s.publish_year
+    ON CONFLICT DO NOTHING"""
+
+# Строки пакета, ссылающиеся на несуществующие книги/авторов/жанры
+MISSING_BOOKS = """
+    SELECT s.row_no, s.name FROM {staging} s
+    WHERE NOT EXISTS (SELECT 1 FROM books b
+                      WHERE b.name = s.name AND b.publish_year = s.publish_year)
+    ORDER BY s.row_no"""
+MISSING_NAMES = """
+    SELECT s.row_no, n.name FROM {staging} s
+    CROSS JOIN LATERAL unnest(s.{names}) AS n(name)
+    WHERE NOT EXISTS (SELECT 1 FROM {table} r WHERE r.name = n.name)
+    ORDER BY s.row_no"""
+
+LINKS = (('author_book', 'authors', 'Author'), ('genre_book', 'genres', 'Genre'))
+
+
+class LoadResult(NamedTuple):
+    inserted: int
+    updated: int
+    links: int
+    errors: list[tuple[int, str]]
+
+
+# Массовая загрузка каталога: COPY пакета строк во временную таблицу и слияние
+# с основными таблицами несколькими запросами на весь пакет.
+# Вызывается внутри Repository.transaction(): временные таблицы живут до фиксации
+class ImportRepository(InstrumentedRepository):
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def load(self, kind: str, rows: Sequence[tuple]) -> LoadResult:
+        staging = STAGING[kind]
+        await self._copy(staging, rows)
+        # параллельный импорт той же таблицы ждёт, чтобы ключи не задвоились
+        inserted = updated = 0
+        if kind in MERGE:
+            await self.session.execute(text(f"LOCK TABLE {kind} IN SHARE ROW EXCLUSIVE MODE"))
+            res = await self.session.execute(text(MERGE[kind]))
+            inserted, updated = res.one()
+
+        links, errors = 0, []
+        if kind in ('books', 'links'):
+            if kind == 'links':
+                res = await self.session.execute(text(MISSING_BOOKS.format(staging=staging.table)))
+                errors += [(row_no, f'Book not found: {name}') for row_no, name in res]
+            for link, names, title in LINKS:
+                res = await self.session.execute(text(LINK.format(
+                    link=link, staging=staging.table, names=names, table=names)))
+                links += res.rowcount
+                res = await self.session.execute(text(MISSING_NAMES.format(
+                    staging=staging.table, names=names, table=names)))
+                errors += [(row_no, f'{title} not found: {name}') for row_no, name in res]
+
+        mark_changed(self.session, *staging.changes)
+        return LoadResult(inserted, updated, links, sorted(errors))
+
+    async def _copy(self, staging: Staging, rows: Sequence[tuple]) -> None:
+        columns = ', '.join(f'{name} {type_}' for name, type_ in staging.columns)
+        await self.session.execute(text(
+            f"CREATE TEMP TABLE IF NOT EXISTS {staging.table} "
+            f"(row_no int4, {columns}) ON COMMIT DROP"))
+        await self.session.execute(text(f"TRUNCATE {staging.table}"))
+
+        conn = await self.session.connection()
+        raw = await conn.get_raw_connection()
+        names = ', '.join(['row_no', *(name for name, _ in staging.columns)])
+        async with raw.driver_connection.cursor() as cur:
+            async with cur.copy(f"COPY {staging.table} ({names}) FROM STDIN") as copy:
+                copy.set_types(['int4', *(type_ for _, type_ in staging.columns)])
+                for row in rows:
+                    await copy.write_row(row)
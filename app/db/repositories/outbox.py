@@ -0,0 +1,92 @@
+from datetime import timedelta
+from typing import List, NamedTuple, Sequence
+
+from sqlalchemy import select, insert, update, delete, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models.all import EmailOutbox
+from app.db.repositories.base_repository import InstrumentedRepository, commit_or_flush
+
+
+# Письмо, выбранное для отправки; attempts - с учётом текущей попытки
+class OutboxMail(NamedTuple):
+    id: int
+    recipients: List[str]
+    subject: str
+    body: str
+    attempts: int
+
+
+# Очередь исходящих писем в БД (миграция 11_email_outbox)
+class OutboxRepository(InstrumentedRepository):
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def commit(self) -> None:
+        await commit_or_flush(self.session)
+
+    # Постановка писем (получатели, тема, html) в очередь. Внутри Repository.transaction()
+    # письма фиксируются вместе с изменением данных, при откате не отправляются
+    async def add(self, mails: Sequence[tuple[Sequence[str], str, str]]) -> None:
+        if not mails:
+            return
+        await self.session.execute(insert(EmailOutbox.__table__), [
+            {'recipients': list(recipients), 'subject': subject, 'body': body}
+            for recipients, subject, body in mails])
+        await self.commit()
+
+    # Выбор не больше batch писем к отправке с арендой на lease: до её истечения
+    # письма не выбираются другими обработчиками, после (обработчик упал) - выбираются снова
+    async def claim(self, batch: int, lease: timedelta) -> List[OutboxMail]:
+        due = (select(EmailOutbox.id).
+               where(EmailOutbox.dead == False,
+                     EmailOutbox.next_attempt_at <= func.now()).
+               order_by(EmailOutbox.next_attempt_at).
+               limit(batch).
+               with_for_update(skip_locked=True).
+               scalar_subquery())
+        stmt = (update(EmailOutbox.__table__).
+                where(EmailOutbox.id.in_(due)).
+                values(attempts=EmailOutbox.attempts + 1,
+                       next_attempt_at=func.now() + lease).
+                returning(EmailOutbox.id, EmailOutbox.recipients, EmailOutbox.subject,
+                          EmailOutbox.body, EmailOutbox.attempts))
+        res = await self.session.execute(stmt)
+        mails = sorted((OutboxMail(*row) for row in res), key=lambda mail: mail.id)
+        await self.commit()
+        return mails
+
+    # Отправленные письма удаляются
+    async def delivered(self, ids: Sequence[int]) -> None:
+        if ids:
+            await self.session.execute(delete(EmailOutbox).where(EmailOutbox.id.in_(ids)))
+        await self.commit()
+
+    # Неудачная попытка: повтор через retry_in, без него (None) - письмо отложено навсегда
+    async def failed(self, mail_id: int, error: str, retry_in: timedelta | None) -> None:
+        values = {'last_error': error}
+        if retry_in is None:
+            values['dead'] = True
+        else:
+            values['next_attempt_at'] = func.now() + retry_in
+        await self.session.execute(update(EmailOutbox).where(EmailOutbox.id == mail_id).values(**values))
+        await self.commit()
+
+    async def get_dead(self, item_start: int, item_end: int) -> List[EmailOutbox]:
+        stmt = (select(EmailOutbox).
+                where(EmailOutbox.dead == True).
+                order_by(EmailOutbox.id).
+                slice(item_start, item_end))
+        res = await self.session.execute(stmt)
+        return list(res.scalars().all())
+
+    # Повторная отправка отложенных писем (ids=None - всех), возвращает их кол-во
+    async def retry_dead(self, ids: Sequence[int] | None = None) -> int:
+        stmt = (update(EmailOutbox).
+                where(EmailOutbox.dead == True).
+                values(dead=False, attempts=0, next_attempt_at=func.now()))
+        if ids is not None:
+            stmt = stmt.where(EmailOutbox.id.in_(ids))
+        res = await self.session.execute(stmt)
+        await self.commit()
+        return res.rowcount
@@ -0,0 +1,50 @@
+from base64 import urlsafe_b64encode, urlsafe_b64decode
+from dataclasses import dataclass
+from json import dumps, loads
+from typing import Sequence
+
+from sqlalchemy import Select, tuple_
+
+
+# Позиция курсора: (name, id) последней записи предыдущей страницы.
+# Cursor() без значений - начало выборки
+@dataclass(frozen=True)
+class Cursor:
+    name: str | None = None
+    id: int | None = None
+
+
+def encode_cursor(name: str, row_id: int) -> str:
+    return urlsafe_b64encode(dumps([name, row_id]).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Cursor:
+    if cursor == '':
+        return Cursor()
+    try:
+        name, row_id = loads(urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise ValueError(f'Invalid cursor {cursor!r}')
+    if not isinstance(name, str) or not isinstance(row_id, int):
+        raise ValueError(f'Invalid cursor {cursor!r}')
+    return Cursor(name, row_id)
+
+
+# Постраничная выборка: смещение (OFFSET/LIMIT) либо курсор по индексу (name, id)
+def paginate(stmt: Select, model, item_start: int, item_end: int,
+             cursor: Cursor | None = None) -> Select:
+    if cursor is None:
+        return stmt.slice(item_start, item_end)
+    if cursor.id is not None:
+        stmt = stmt.where(tuple_(model.name, model.id) > tuple_(cursor.name, cursor.id))
+    return (stmt.
+            order_by(None).
+            order_by(model.name, model.id).
+            limit(max(item_end - item_start, 0)))
+
+
+# Курсор следующей страницы, None если страница последняя
+def next_cursor(rows: Sequence, limit: int) -> str | None:
+    if not rows or len(rows) < limit:
+        return None
+    return encode_cursor(rows[-1].name, rows[-1].id)
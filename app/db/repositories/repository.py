@@ -1,100 +1,138 @@
 from app.db.models.all import AuthorBook, GenreBook, UserBook, Author, Genre, Book, User
-from app.api.schemas.all import BookDB, UserBookDB
-from app.db.repositories.base_repository import RepositoryData, RepositoryLink
-from sqlalchemy import select, and_, delete
+from app.api.schemas.all import AuthorDB, BookDB, GenreDB, UserBookDB, UserDBPublic
+from app.db.repositories.base_repository import (
+    RepositoryData, RepositoryLink, InstrumentedRepository, DEFERRED_COMMIT, CHANGED_TABLES, CHANGED_USERS,
+    mark_changed, mark_user_changed, invalidate_changed, select_schema, to_schemas
+)
+from app.db.repositories.pagination import Cursor, paginate
+from app.db.repositories.bulk_import import ImportRepository
+from app.db.repositories.stats import StatsRepository
+from app.db.repositories.outbox import OutboxRepository
+from app.db.cache import response_cache, user_cache, user_version_key
+from sqlalchemy import select, insert, update, and_, delete, func, literal, true, union_all, Row, RowMapping
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import selectinload
-from typing import List
+from typing import List, NamedTuple, AsyncIterator, Sequence
+from contextlib import asynccontextmanager
+from functools import cached_property
 from datetime import date
 from sqlalchemy.ext.asyncio import AsyncSession
 
 
 class AuthorRepository(RepositoryData):
     Model = Author
+    Schema = AuthorDB
+    Relations = {'books': Author.book_list}
 
     # Книги автора
     async def get_books(self, author_id: int,
-                        item_start: int, item_end: int
-                        ) -> List[Book]:
-        stmt = (select(Book).
-                join(Book.authors).join(AuthorBook.author).
-                where(Author.id == author_id).
-                slice(item_start, item_end))
+                        item_start: int, item_end: int,
+                        cursor: Cursor | None = None
+                        ) -> List[BookDB]:
+        linked = (select(AuthorBook.right_id).
+                  where(and_(AuthorBook.left_id == author_id,
+                             AuthorBook.right_id == Book.id)).
+                  exists())
+        stmt = (select_schema(Book, BookDB).
+                where(linked).
+                order_by(Book.name, Book.id))
+        stmt = paginate(stmt, Book, item_start, item_end, cursor)
         res = await self.session.execute(stmt)
-        books = res.scalars().unique().all()
-        return list(books)
+        return to_schemas(BookDB, res.all())
 
     # Жанры автора
     async def get_genres(self, author_id: int,
-                         item_start: int, item_end: int
-                         ) -> List[Genre]:
-        stmt = (select(Genre).
-                join(Genre.books).join(GenreBook.book).
-                join(Book.authors).join(AuthorBook.author).
-                where(Author.id == author_id).distinct().
-                order_by(Genre.name).
-                slice(item_start, item_end))
+                         item_start: int, item_end: int,
+                         cursor: Cursor | None = None
+                         ) -> List[GenreDB]:
+        linked = (select(GenreBook.left_id).
+                  join(AuthorBook, AuthorBook.right_id == GenreBook.right_id).
+                  where(and_(AuthorBook.left_id == author_id,
+                             GenreBook.left_id == Genre.id)).
+                  exists())
+        stmt = (select_schema(Genre, GenreDB).
+                where(linked).
+                order_by(Genre.name, Genre.id))
+        stmt = paginate(stmt, Genre, item_start, item_end, cursor)
         res = await self.session.execute(stmt)
-        genres = res.scalars().unique().all()
-        return list(genres)
+        return to_schemas(GenreDB, res.all())
 
     # Читатели, читающие/прочитавшие книги автора
     async def get_users(self, author_id: int, returned: bool,
-                        item_start: int, item_end: int
-                        ) -> List[User]:
-        stmt = (select(User).
-                join(User.books).join(UserBook.book).where(UserBook.returned == returned).
-                join(Book.authors).join(AuthorBook.author).
-                where(Author.id == author_id).distinct().
-                order_by(User.name).
-                slice(item_start, item_end))
+                        item_start: int, item_end: int,
+                        cursor: Cursor | None = None
+                        ) -> List[UserDBPublic]:
+        read = (select(UserBook.id).
+                join(AuthorBook, AuthorBook.right_id == UserBook.right_id).
+                where(and_(AuthorBook.left_id == author_id,
+                           UserBook.left_id == User.id,
+                           UserBook.returned == returned)).
+                exists())
+        stmt = (select_schema(User, UserDBPublic).
+                where(read).
+                order_by(User.name, User.id))
+        stmt = paginate(stmt, User, item_start, item_end, cursor)
         res = await self.session.execute(stmt)
-        users = res.scalars().unique().all()
-        return list(users)
+        return to_schemas(UserDBPublic, res.all())
 
 
 class GenreRepository(RepositoryData):
     Model = Genre
+    Schema = GenreDB
+    Relations = {'books': Genre.book_list}
 
     # Книги жанра
     async def get_books(self, genre_id: int,
-                        item_start: int, item_end: int
-                        ) -> List[Book]:
-        stmt = (select(Book).
-                join(Book.genres).join(GenreBook.genre).
-                where(Genre.id == genre_id).
-                slice(item_start, item_end))
+                        item_start: int, item_end: int,
+                        cursor: Cursor | None = None
+                        ) -> List[BookDB]:
+        linked = (select(GenreBook.right_id).
+                  where(and_(GenreBook.left_id == genre_id,
+                             GenreBook.right_id == Book.id)).
+                  exists())
+        stmt = (select_schema(Book, BookDB).
+                where(linked).
+                order_by(Book.name, Book.id))
+        stmt = paginate(stmt, Book, item_start, item_end, cursor)
         res = await self.session.execute(stmt)
-        books = res.scalars().unique().all()
-        return list(books)
+        return to_schemas(BookDB, res.all())
 
     # Авторы написавшие книги жанра
     async def get_authors(self, genre_id: int,
-                          item_start: int, item_end: int
-                          ) -> List[Author]:
-        stmt = (select(Author).
-                join(Author.books).join(AuthorBook.book).
-                join(Book.genres).join(GenreBook.genre).
-                where(Genre.id == genre_id).
-                distinct().
-                order_by(Author.name).
-                slice(item_start, item_end))
+                          item_start: int, item_end: int,
+                          cursor: Cursor | None = None
+                          ) -> List[AuthorDB]:
+        linked = (select(AuthorBook.left_id).
+                  join(GenreBook, GenreBook.right_id == AuthorBook.right_id).
+                  where(and_(GenreBook.left_id == genre_id,
+                             AuthorBook.left_id == Author.id)).
+                  exists())
+        stmt = (select_schema(Author, AuthorDB).
+                where(linked).
+                order_by(Author.name, Author.id))
+        stmt = paginate(stmt, Author, item_start, item_end, cursor)
         res = await self.session.execute(stmt)
-        authors = res.scalars().unique().all()
-        return list(authors)
+        return to_schemas(AuthorDB, res.all())
 
     # Читатели, читающие/прочитавшие книги жанра
     async def get_users(self, genre_id: int, returned: bool,
-                        item_start: int, item_end: int
+                        item_start: int, item_end: int,
+                        cursor: Cursor | None = None
                         ) -> List[User]:
+        read = (select(UserBook.id).
+                join(GenreBook, GenreBook.right_id == UserBook.right_id).
+                where(and_(GenreBook.left_id == genre_id,
+                           UserBook.left_id == User.id,
+                           UserBook.returned == returned)).
+                exists())
         stmt = (select(User).
-                join(User.books).join(UserBook.book).where(UserBook.returned == returned).
-                join(Book.genres).join(GenreBook.genre).
-                where(Genre.id == genre_id).distinct().
-                options(selectinload(User.books.and_(UserBook.returned == returned)).subqueryload(UserBook.book)).
-                order_by(User.name).
-                slice(item_start, item_end))
+                where(read).
+                options(selectinload(User.books.and_(UserBook.returned == returned)).
+                        selectinload(UserBook.book)).
+                order_by(User.name, User.id))
+        stmt = paginate(stmt, User, item_start, item_end, cursor)
         res = await self.session.execute(stmt)
-        users = res.scalars().unique().all()
+        users = res.scalars().all()
         return list(users)
 
     # не используется
@@ -110,8 +148,66 @@ class GenreRepository(RepositoryData):
     #     return n
 
 
+class UserAccess(NamedTuple):
+    role_id: int
+    token_version: int
+
+
+# Просроченная выдача для напоминания читателю
+class OverdueLoan(NamedTuple):
+    user_id: int
+    user_name: str
+    email: str
+    book_name: str
+    must_return_at: date
+
+
+# Результат выдачи книги: состояние до операции и созданная связь (None - книга не выдана)
+class TakeBookResult(NamedTuple):
+    taken: int
+    same: bool
+    overdue: bool
+    found: bool
+    book: BookDB | None
+    link: UserBookDB | None
+
+
+BOOK_COLUMNS = (Book.id, Book.name, Book.description, Book.publish_year, Book.amount)
+USER_BOOK_COLUMNS = (UserBook.id, UserBook.left_id, UserBook.right_id, UserBook.get_at,
+                     UserBook.must_return_at, UserBook.returned_at, UserBook.returned)
+
+
 class UserRepository(RepositoryData):
     Model = User
+    Schema = UserDBPublic
+
+    # Роль и версия токенов пользователя (None - пользователя нет), кэшируется в user_cache
+    # до изменения версии прав пользователя. Версия читается до запроса к БД: изменение,
+    # зафиксированное во время чтения, сделает запись устаревшей.
+    # cached=False - чтение из БД (перевыпуск токенов)
+    async def get_access(self, user_id: int, cached: bool = True) -> UserAccess | None:
+        version, = await response_cache.versions([user_version_key(user_id)])
+        if cached and (entry := user_cache.get(user_id)) is not None and entry[0] == version:
+            return entry[1]
+        stmt = select(User.role_id, User.token_version).where(and_(User.id == user_id))
+        res = await self.session.execute(stmt)
+        row = res.first()
+        if row is None:
+            return None
+        access = UserAccess(*row)
+        user_cache.set(user_id, (version, access))
+        return access
+
+    # Смена роли увеличивает версию токенов - ранее выданные токены с прежней ролью отзываются
+    async def update(self, update_id: int, **kw) -> User:
+        if 'role_id' in kw:
+            kw['token_version'] = User.token_version + 1
+        mark_user_changed(self.session, update_id)
+        return await super().update(update_id, **kw)
+
+    async def delete_data(self, delete_id: int) -> User:
+        mark_user_changed(self.session, delete_id)
+        return await super().delete_data(delete_id)
 
     # Книга читателя несданная
     async def get_book(self, user_id: int, book_id: int,
@@ -131,143 +227,267 @@ class UserRepository(RepositoryData):
 
     # Книги читателя читаемые/прочитанные
     async def get_books(self, user_id: int, returned: bool,
-                        item_start: int, item_end: int
-                        ) -> List[Book]:
-        stmt = (select(Book).
-                join(Book.users).
-                join(UserBook.user).
-                where(and_(UserBook.returned == returned,
-                            User.id == user_id)).
-                options(selectinload(Book.users.and_(UserBook.returned == returned))).
-                order_by(Book.name).
-                slice(item_start, item_end))
+                        item_start: int, item_end: int,
+                        cursor: Cursor | None = None
+                        ) -> List[BookDB]:
+        read = (select(UserBook.id).
+                where(and_(UserBook.left_id == user_id,
+                           UserBook.right_id == Book.id,
+                           UserBook.returned == returned)).
+                exists())
+        stmt = (select_schema(Book, BookDB).
+                where(read).
+                order_by(Book.name, Book.id))
+        stmt = paginate(stmt, Book, item_start, item_end, cursor)
         res = await self.session.execute(stmt)
-        books = res.scalars().unique().all()
-        return list(books)
+        return to_schemas(BookDB, res.all())
 
     # Жанры книг читаемых / прочитанных (сданных) читателем
     async def get_genres(self, user_id: int, returned: bool,
-                         item_start: int, item_end: int
-                         ) -> List[Genre]:
-        stmt = (select(Genre).
-                join(Genre.books).join(GenreBook.book).
-                join(Book.users).join(UserBook.user).
-                where(and_(
-                        UserBook.returned == returned,
-                        User.id == user_id
-                    )
-                ).distinct().
-                order_by(Genre.name).
-                slice(item_start, item_end))
+                         item_start: int, item_end: int,
+                         cursor: Cursor | None = None
+                         ) -> List[GenreDB]:
+        read = (select(GenreBook.left_id).
+                join(UserBook, UserBook.right_id == GenreBook.right_id).
+                where(and_(UserBook.left_id == user_id,
+                           UserBook.returned == returned,
+                           GenreBook.left_id == Genre.id)).
+                exists())
+        stmt = (select_schema(Genre, GenreDB).
+                where(read).
+                order_by(Genre.name, Genre.id))
+        stmt = paginate(stmt, Genre, item_start, item_end, cursor)
         res = await self.session.execute(stmt)
-        genres = res.scalars().unique().all()
-        return list(genres)
+        return to_schemas(GenreDB, res.all())
 
     # Авторы книг читаемых / прочитанных (сданных) читателем
     async def get_authors(self, user_id: int, returned: bool,
-                          item_start: int, item_end: int
-                          ) -> List[Author]:
-        stmt = (select(Author).
-                join(Author.books).join(AuthorBook.book).
-                join(Book.users).join(UserBook.user).
-                where(and_(
-                        UserBook.returned == returned,
-                        User.id == user_id)).
-                distinct().
-                order_by(Author.name).
-                slice(item_start, item_end))
+                          item_start: int, item_end: int,
+                          cursor: Cursor | None = None
+                          ) -> List[AuthorDB]:
+        read = (select(AuthorBook.left_id).
+                join(UserBook, UserBook.right_id == AuthorBook.right_id).
+                where(and_(UserBook.left_id == user_id,
+                           UserBook.returned == returned,
+                           AuthorBook.left_id == Author.id)).
+                exists())
+        stmt = (select_schema(Author, AuthorDB).
+                where(read).
+                order_by(Author.name, Author.id))
+        stmt = paginate(stmt, Author, item_start, item_end, cursor)
         res = await self.session.execute(stmt)
-        authors = res.scalars().unique().all()
-        return list(authors)
+        return to_schemas(AuthorDB, res.all())
 
-    # Читатели задержавшие сдачу книг, уже сдавшие / до сих пор не сдавшие
+    # Читатели задержавшие сдачу книг, уже сдавшие / до сих пор не сдавшие.
+    # Отбор по флагу overdue через частичный индекс; несданные отмечает mark_overdue
     async def get_overdue(self, returned: bool,
-                          item_start: int, item_end: int
+                          item_start: int, item_end: int,
+                          cursor: Cursor | None = None
                           ) -> List[User]:
+        overdue = (select(UserBook.id).
+                   where(and_(UserBook.left_id == User.id,
+                              UserBook.overdue == True,
+                              UserBook.returned == returned)).
+                   exists())
         stmt = (select(User).
-                join(User.books).join(UserBook.book).
-                where(and_(
-                        UserBook.returned == returned,
-                        (UserBook.returned_at if returned else date.today()) > UserBook.must_return_at,
-                    )).
-                options(selectinload(User.books.and_(UserBook.returned == returned)).subqueryload(UserBook.book)).
-                order_by(User.name).
-                slice(item_start, item_end))
+                where(overdue).
+                options(selectinload(User.books.and_(UserBook.returned == returned)).
+                        selectinload(UserBook.book)).
+                order_by(User.name, User.id))
+        stmt = paginate(stmt, User, item_start, item_end, cursor)
         res = await self.session.execute(stmt)
-        users = res.scalars().unique().all()
+        users = res.scalars().all()
         return list(users)
 
-    # Получение книги (создать связь, уменьшить ко-во книг на складе на 1)
-    async def user_take_book(self, user: User, book: Book) -> UserBookDB:
-        book.amount -= 1
-        link = UserBook(book=book, user=user)
-        # .append(link)
-        self.session.add_all([book, link])
-        await self.session.commit()
-        return link.to_schema()
-
-    # Получение книги (для связи установить флаг сдана и дату сдачи, увеличить кол-во книг на складе на 1)
-    async def user_return_book(self, link: UserBook, book: Book) -> BookDB:
-        link.returned = True
-        link.returned_at = date.today()
-        book.amount += 1
-        self.session.add_all([link, book])
-        await self.session.commit()
-        return book.to_schema()
+    # Получение книги: строка читателя блокируется (FOR NO KEY UPDATE) до конца транзакции,
+    # поэтому выдачи одному читателю идут по очереди и проверки (та же книга, лимит, просрочка)
+    # видят предыдущие. Затем одним запросом проверки и уменьшение кол-ва на складе под
+    # условием amount > 0 с созданием связи; amount перепроверяется под блокировкой строки книги
+    async def user_take_book(self, user_id: int, book_id: int, max_amount: int) -> TakeBookResult:
+        await self.session.execute(select(User.id).where(User.id == user_id).
+                                   with_for_update(key_share=True))
+        active = (select(UserBook.right_id, UserBook.must_return_at).
+                  where(and_(UserBook.left_id == user_id,
+                             UserBook.returned == False)).
+                  cte('active'))
+        checks = (select(func.count().label('taken'),
+                         func.coalesce(func.bool_or(active.c.right_id == book_id), False).label('same'),
+                         func.coalesce(func.bool_or(active.c.must_return_at < date.today()), False).label('overdue')).
+                  select_from(active).
+                  cte('checks'))
+        allowed = (select(and_(checks.c.taken < max_amount,
+                               checks.c.same == False,
+                               checks.c.overdue == False)).
+                   scalar_subquery())
+        taken = (update(Book.__table__).
+                 where(and_(Book.id == book_id, Book.amount > 0, allowed)).
+                 values(amount=Book.amount - 1).
+                 returning(*BOOK_COLUMNS).
+                 cte('taken'))
+        link = (insert(UserBook.__table__).
+                from_select(['left_id', 'right_id', 'returned'],
+                            select(literal(user_id), taken.c.id, literal(False))).
+                returning(*USER_BOOK_COLUMNS).
+                cte('link'))
+        found = select(Book.id).where(Book.id == book_id).exists()
+        stmt = (select(checks.c.taken, checks.c.same, checks.c.overdue, found.label('found'),
+                       *[c.label(f'book_{c.key}') for c in taken.c],
+                       *[c.label(f'link_{c.key}') for c in link.c]).
+                select_from(checks.outerjoin(taken, true()).outerjoin(link, true())))
+        try:
+            res = await self.session.execute(stmt)
+        except IntegrityError as e:
+            # та же книга уже на руках (uq_user_book_active) - транзакция прервана
+            if getattr(e.orig.diag, 'constraint_name', None) != 'uq_user_book_active':
+                raise
+            if not self.session.info.get(DEFERRED_COMMIT):
+                await self.session.rollback()
+            return TakeBookResult(taken=0, same=True, overdue=False, found=True, book=None, link=None)
+        row = res.one()._mapping
+        if row['link_id']:
+            mark_changed(self.session, Book.__tablename__, UserBook.__tablename__)
+        await self.commit()
+        return TakeBookResult(
+            taken=row['taken'],
+            same=row['same'],
+            overdue=row['overdue'],
+            found=row['found'],
+            book=BookDB(**{c.key: row[f'book_{c.key}'] for c in taken.c}) if row['book_id'] else None,
+            link=UserBookDB(**{c.key: row[f'link_{c.key}'] for c in link.c}) if row['link_id'] else None,
+        )
+
+    # Возврат книги одним запросом: для несданной связи установить флаг сдана и дату сдачи,
+    # увеличить кол-во книг на складе на 1. None - книги на руках нет
+    async def user_return_book(self, user_id: int, book_id: int) -> BookDB | None:
+        link = (update(UserBook.__table__).
+                where(and_(UserBook.left_id == user_id,
+                           UserBook.right_id == book_id,
+                           UserBook.returned == False)).
+                values(returned=True, returned_at=date.today(),
+                       overdue=UserBook.overdue | (UserBook.must_return_at < date.today())).
+                returning(UserBook.right_id).
+                cte('returned_link'))
+        stmt = (update(Book.__table__).
+                where(Book.id.in_(select(link.c.right_id))).
+                values(amount=Book.amount + 1).
+                returning(*BOOK_COLUMNS))
+        res = await self.session.execute(stmt)
+        row = res.first()
+        if row:
+            mark_changed(self.session, Book.__tablename__, UserBook.__tablename__)
+        await self.commit()
+        return BookDB(**row._mapping) if row else None
+
+    # Отметка несданных книг, срок возврата которых истёк к today: не больше batch выдач
+    # за вызов, по частичному индексу ix_user_book_due (несданные и не отмеченные).
+    # Возвращает отмеченные выдачи с данными читателя и книги для напоминаний
+    async def mark_overdue(self, today: date, batch: int) -> List[OverdueLoan]:
+        due = (select(UserBook.id).
+               where(and_(UserBook.returned == False,
+                          UserBook.overdue == False,
+                          UserBook.must_return_at < today)).
+               limit(batch).
+               with_for_update(skip_locked=True).
+               scalar_subquery())
+        flagged = (update(UserBook.__table__).
+                   where(UserBook.id.in_(due)).
+                   values(overdue=True).
+                   returning(UserBook.left_id, UserBook.right_id, UserBook.must_return_at).
+                   cte('flagged'))
+        stmt = (select(User.id.label('user_id'), User.name.label('user_name'), User.email,
+                       Book.name.label('book_name'), flagged.c.must_return_at).
+                select_from(flagged).
+                join(User, User.id == flagged.c.left_id).
+                join(Book, Book.id == flagged.c.right_id).
+                order_by(User.id, flagged.c.must_return_at))
+        res = await self.session.execute(stmt)
+        loans = [OverdueLoan(**row._mapping) for row in res]
+        await self.commit()
+        return loans
 
 
 class BookRepository(RepositoryData):
     Model = Book
+    Schema = BookDB
+    Relations = {'authors': Book.author_list, 'genres': Book.genre_list}
 
     # Авторы книги
     async def get_authors(self, book_id: int,
-                          item_start: int, item_end: int
-                          ) -> List[Author]:
-        stmt = (select(Author).
-                join(Author.books).join(AuthorBook.book).
-                where(Book.id == book_id).
-                distinct().
-                slice(item_start, item_end))
+                          item_start: int, item_end: int,
+                          cursor: Cursor | None = None
+                          ) -> List[AuthorDB]:
+        linked = (select(AuthorBook.left_id).
+                  where(and_(AuthorBook.right_id == book_id,
+                             AuthorBook.left_id == Author.id)).
+                  exists())
+        stmt = (select_schema(Author, AuthorDB).
+                where(linked).
+                order_by(Author.name, Author.id))
+        stmt = paginate(stmt, Author, item_start, item_end, cursor)
         res = await self.session.execute(stmt)
-        authors = res.scalars().unique().all()
-        return list(authors)
+        return to_schemas(AuthorDB, res.all())
 
     # Жанры книги
     async def get_genres(self, book_id: int,
-                         item_start: int, item_end: int
-                         ) -> List[Genre]:
-        stmt = (select(Genre).
-                join(Genre.books).join(GenreBook.book).
-                where(Book.id == book_id).
-                distinct().
-                slice(item_start, item_end))
+                         item_start: int, item_end: int,
+                         cursor: Cursor | None = None
+                         ) -> List[GenreDB]:
+        linked = (select(GenreBook.left_id).
+                  where(and_(GenreBook.right_id == book_id,
+                             GenreBook.left_id == Genre.id)).
+                  exists())
+        stmt = (select_schema(Genre, GenreDB).
+                where(linked).
+                order_by(Genre.name, Genre.id))
+        stmt = paginate(stmt, Genre, item_start, item_end, cursor)
         res = await self.session.execute(stmt)
-        genres = res.scalars().unique().all()
-        return list(genres)
+        return to_schemas(GenreDB, res.all())
 
     # Читатели, читающие/прочитавшие книгу
     async def get_users(self, book_id: int, returned: bool,
-                        item_start: int, item_end: int
+                        item_start: int, item_end: int,
+                        cursor: Cursor | None = None
                         ) -> List[User]:
+        read = (select(UserBook.id).
+                where(and_(UserBook.left_id == User.id,
+                           UserBook.right_id == book_id,
+                           UserBook.returned == returned)).
+                exists())
         stmt = (select(User).
-                join(User.books).join(UserBook.book).
-                where(and_(
-                        UserBook.returned == returned,
-                        Book.id == book_id
-                    )
-                ).
+                where(read).
                 options(selectinload(User.books.and_(
                         UserBook.returned == returned,
-                        UserBook.right_id == book_id)
-                    )
-                ).
-                order_by(User.name).
-                slice(item_start, item_end))
+                        UserBook.right_id == book_id))).
+                order_by(User.name, User.id))
+        stmt = paginate(stmt, User, item_start, item_end, cursor)
         res = await self.session.execute(stmt)
-        users = res.scalars().unique().all()
+        users = res.scalars().all()
         return list(users)
 
 
+    # Все книги с именами авторов и жанров (формат строки импорта) потоком через
+    # серверный курсор: в памяти не больше batch строк
+    async def stream_with_names(self, batch: int) -> AsyncIterator[Sequence[RowMapping]]:
+        authors = (select(Author.name).
+                   join(AuthorBook, AuthorBook.left_id == Author.id).
+                   where(AuthorBook.right_id == Book.id).
+                   order_by(Author.name).
+                   scalar_subquery())
+        genres = (select(Genre.name).
+                  join(GenreBook, GenreBook.left_id == Genre.id).
+                  where(GenreBook.right_id == Book.id).
+                  order_by(Genre.name).
+                  scalar_subquery())
+        stmt = (select(Book.id, Book.name, Book.description, Book.publish_year, Book.amount,
+                       func.array(authors).label('authors'),
+                       func.array(genres).label('genres')).
+                order_by(Book.id).
+                execution_options(yield_per=batch))
+        res = await self.session.stream(stmt)
+        async for rows in res.mappings().partitions():
+            yield rows
+
+
 class AuthorBookRepository(RepositoryLink):
     Model = AuthorBook
 
@@ -279,13 +499,27 @@ class GenreBookRepository(RepositoryLink):
 class UserBookRepository(RepositoryLink):
     Model = UserBook
 
+    # История выдачи книг потоком через серверный курсор
+    async def stream_all(self, batch: int) -> AsyncIterator[Sequence[RowMapping]]:
+        stmt = (select(UserBook.id,
+                       UserBook.left_id.label('user_id'),
+                       UserBook.right_id.label('book_id'),
+                       UserBook.get_at, UserBook.must_return_at,
+                       UserBook.returned_at, UserBook.returned).
+                order_by(UserBook.id).
+                execution_options(yield_per=batch))
+        res = await self.session.stream(stmt)
+        async for rows in res.mappings().partitions():
+            yield rows
+
     async def delete_all_left_links_returned(self, left_id: int, returned: bool) -> int():
         stmt = (delete(UserBook).
                 where(and_(
                     UserBook.left_id == left_id),
                     UserBook.returned == returned))
         res = await self.session.execute(stmt)
-        await self.session.commit()
+        self.changed()
+        await self.commit()
         return res.rowcount
 
     async def delete_all_right_links_returned(self, right_id: int, returned: bool) -> int():
@@ -294,16 +528,105 @@ class UserBookRepository(RepositoryLink):
                     UserBook.right_id == right_id),
                     UserBook.returned == returned))
         res = await self.session.execute(stmt)
-        await self.session.commit()
+        self.changed()
+        await self.commit()
         return res.rowcount
 
 
+class SearchRepository(InstrumentedRepository):
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    # Полнотекстовый поиск одним запросом по книгам, авторам и жанрам, по убыванию релевантности
+    async def search(self, phrase: str,
+                     item_start: int, item_end: int
+                     ) -> List[Row]:
+        query = func.websearch_to_tsquery('russian', phrase)
+        parts = [
+            select(literal(kind).label('kind'), model.id, model.name,
+                   func.ts_rank(model.search_vector, query).label('rank')).
+            where(model.search_vector.op('@@')(query))
+            for kind, model in (('book', Book), ('author', Author), ('genre', Genre))
+        ]
+        hits = union_all(*parts).subquery()
+        stmt = (select(hits).
+                order_by(hits.c.rank.desc(), hits.c.kind, hits.c.id).
+                slice(item_start, item_end))
+        res = await self.session.execute(stmt)
+        return list(res.all())
+
+
+# Репозитории создаются при первом обращении; сессия берёт соединение из пула только
+# при первом запросе, так что запрос, отклонённый до обращения к БД, соединение не занимает
 class Repository:
     def __init__(self, session: AsyncSession):
-        self.author = AuthorRepository(session)
-        self.genre = GenreRepository(session)
-        self.user = UserRepository(session)
-        self.book = BookRepository(session)
-        self.author_book = AuthorBookRepository(session)
-        self.genre_book = GenreBookRepository(session)
-        self.user_book = UserBookRepository(session)
\ No newline at end of file
+        self.session = session
+
+    @cached_property
+    def author(self) -> AuthorRepository:
+        return AuthorRepository(self.session)
+
+    @cached_property
+    def genre(self) -> GenreRepository:
+        return GenreRepository(self.session)
+
+    @cached_property
+    def user(self) -> UserRepository:
+        return UserRepository(self.session)
+
+    @cached_property
+    def book(self) -> BookRepository:
+        return BookRepository(self.session)
+
+    @cached_property
+    def author_book(self) -> AuthorBookRepository:
+        return AuthorBookRepository(self.session)
+
+    @cached_property
+    def genre_book(self) -> GenreBookRepository:
+        return GenreBookRepository(self.session)
+
+    @cached_property
+    def user_book(self) -> UserBookRepository:
+        return UserBookRepository(self.session)
+
+    @cached_property
+    def search(self) -> SearchRepository:
+        return SearchRepository(self.session)
+
+    @cached_property
+    def bulk_import(self) -> ImportRepository:
+        return ImportRepository(self.session)
+
+    @cached_property
+    def stats(self) -> StatsRepository:
+        return StatsRepository(self.session)
+
+    @cached_property
+    def outbox(self) -> OutboxRepository:
+        return OutboxRepository(self.session)
+
+    # Единица работы: методы репозиториев внутри блока не фиксируют изменения,
+    # фиксация одна - при выходе из блока, при исключении - откат.
+    # Вложенный блок присоединяется к внешнему
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator["Repository"]:
+        if self.session.info.get(DEFERRED_COMMIT):
+            yield self
+            return
+        self.session.info[DEFERRED_COMMIT] = True
+        try:
+            yield self
+            await self.session.commit()
+            await invalidate_changed(self.session)
+        except BaseException:
+            self.session.info.pop(CHANGED_TABLES, None)
+            self.session.info.pop(CHANGED_USERS, None)
+            await self.session.rollback()
+            raise
+        finally:
+            self.session.info.pop(DEFERRED_COMMIT, None)
+
+    # Отправить изменения в БД без фиксации (например, чтобы получить id)
+    async def flush(self) -> None:
+        await self.session.flush()
@@ -0,0 +1,92 @@
+from datetime import date
+from typing import Sequence
+
+from sqlalchemy import select, text, table, column, Integer, Date, Boolean, Row
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models.all import Author, Book, Genre
+from app.db.repositories.base_repository import InstrumentedRepository, commit_or_flush
+
+
+# Материализованные представления статистики выдачи (миграция 9_reading_stats).
+# Обновляются целиком по расписанию, данные отстают не более чем на STATS_REFRESH_SECONDS
+stats_book_month = table('stats_book_month',
+                         column('book_id', Integer), column('month', Date),
+                         column('loans', Integer), column('readers', Integer))
+stats_genre_month = table('stats_genre_month',
+                          column('genre_id', Integer), column('month', Date),
+                          column('loans', Integer), column('readers', Integer))
+stats_user_genre = table('stats_user_genre',
+                         column('user_id', Integer), column('genre_id', Integer),
+                         column('returned', Boolean), column('loans', Integer))
+stats_user_author = table('stats_user_author',
+                          column('user_id', Integer), column('author_id', Integer),
+                          column('returned', Boolean), column('loans', Integer))
+
+STATS_VIEWS = (stats_book_month, stats_genre_month, stats_user_genre, stats_user_author)
+
+# ключ advisory-блокировки: обновление выполняет один процесс за раз
+REFRESH_LOCK = 7311001
+
+
+class StatsRepository(InstrumentedRepository):
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    # Самые читаемые книги месяца
+    async def top_books(self, month: date, limit: int) -> Sequence[Row]:
+        s = stats_book_month
+        stmt = (select(Book.id, Book.name, s.c.loans, s.c.readers).
+                join(s, s.c.book_id == Book.id).
+                where(s.c.month == month.replace(day=1)).
+                order_by(s.c.loans.desc(), Book.name, Book.id).
+                limit(limit))
+        res = await self.session.execute(stmt)
+        return res.all()
+
+    # Самые читаемые жанры месяца
+    async def top_genres(self, month: date, limit: int) -> Sequence[Row]:
+        s = stats_genre_month
+        stmt = (select(Genre.id, Genre.name, s.c.loans, s.c.readers).
+                join(s, s.c.genre_id == Genre.id).
+                where(s.c.month == month.replace(day=1)).
+                order_by(s.c.loans.desc(), Genre.name, Genre.id).
+                limit(limit))
+        res = await self.session.execute(stmt)
+        return res.all()
+
+    # Жанры книг читателя читаемые/прочитанные с кол-вом выдач
+    async def user_genres(self, user_id: int, returned: bool,
+                          item_start: int, item_end: int) -> Sequence[Row]:
+        s = stats_user_genre
+        stmt = (select(Genre.id, Genre.name, s.c.loans).
+                join(s, s.c.genre_id == Genre.id).
+                where(s.c.user_id == user_id, s.c.returned == returned).
+                order_by(s.c.loans.desc(), Genre.name, Genre.id).
+                slice(item_start, item_end))
+        res = await self.session.execute(stmt)
+        return res.all()
+
+    # Авторы книг читателя читаемые/прочитанные с кол-вом выдач
+    async def user_authors(self, user_id: int, returned: bool,
+                           item_start: int, item_end: int) -> Sequence[Row]:
+        s = stats_user_author
+        stmt = (select(Author.id, Author.name, s.c.loans).
+                join(s, s.c.author_id == Author.id).
+                where(s.c.user_id == user_id, s.c.returned == returned).
+                order_by(s.c.loans.desc(), Author.name, Author.id).
+                slice(item_start, item_end))
+        res = await self.session.execute(stmt)
+        return res.all()
+
+    # Пересчёт всех представлений без блокировки чтения (CONCURRENTLY).
+    # False - пересчёт уже выполняет другой процесс
+    async def refresh(self) -> bool:
+        res = await self.session.execute(text("SELECT pg_try_advisory_xact_lock(:key)"),
+                                         {'key': REFRESH_LOCK})
+        if not res.scalar_one():
+            return False
+        for view in STATS_VIEWS:
+            await self.session.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {view.name}"))
+        await commit_or_flush(self.session)
+        return True
@@ -0,0 +1,113 @@
+from bisect import bisect_left
+from typing import Callable, Sequence
+
+
+# Границы корзин по умолчанию, секунды
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+# Гистограмма в стиле Prometheus: наблюдения раскладываются по корзинам "<= граница"
+class Histogram:
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    # Накопительные значения корзин, последняя - "+Inf"
+    def cumulative(self) -> dict[str, int]:
+        res, total = {}, 0
+        for bound, n in zip([*map(str, self.buckets), '+Inf'], self.counts):
+            total += n
+            res[bound] = total
+        return res
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# Семейство метрик с одинаковым именем и набором меток
+class Family:
+    def __init__(self, name: str, documentation: str, kind: str,
+                 labelnames: Sequence[str], factory: Callable):
+        self.name = name
+        self.documentation = documentation
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self.factory = factory
+        self.children: dict[tuple, Histogram | Counter] = {}
+
+    def labels(self, *values: str) -> Histogram | Counter:
+        child = self.children.get(values)
+        if child is None:
+            child = self.children[values] = self.factory()
+        return child
+
+    def expose(self) -> list[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        for values, child in self.children.items():
+            if isinstance(child, Histogram):
+                for bound, n in child.cumulative().items():
+                    le = 'le="' + bound + '"'
+                    lines.append(f'{self.name}_bucket{_labels(self.labelnames, values, le)} {n}')
+                lines.append(f'{self.name}_sum{_labels(self.labelnames, values)} {child.sum}')
+                lines.append(f'{self.name}_count{_labels(self.labelnames, values)} {child.count}')
+            else:
+                lines.append(f'{self.name}{_labels(self.labelnames, values)} {child.value}')
+        return lines
+
+
+# Значение вычисляется в момент выдачи метрик
+class GaugeFunc:
+    def __init__(self, name: str, documentation: str, func: Callable[[], float]):
+        self.name = name
+        self.documentation = documentation
+        self.func = func
+
+    def expose(self) -> list[str]:
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} gauge',
+                f'{self.name} {self.func()}']
+
+
+registry: dict[str, Family | GaugeFunc] = {}
+
+
+def histogram(name: str, documentation: str, labelnames: Sequence[str] = (),
+              buckets: Sequence[float] = DEFAULT_BUCKETS) -> Family:
+    return registry.setdefault(name, Family(name, documentation, 'histogram', labelnames,
+                                            lambda: Histogram(buckets)))
+
+
+def counter(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Family:
+    return registry.setdefault(name, Family(name, documentation, 'counter', labelnames, Counter))
+
+
+def gauge(name: str, documentation: str, func: Callable[[], float]) -> GaugeFunc:
+    registry[name] = GaugeFunc(name, documentation, func)
+    return registry[name]
+
+
+# Текстовый формат выдачи Prometheus (text/plain; version=0.0.4)
+def expose() -> str:
+    return '\n'.join(line for metric in registry.values() for line in metric.expose()) + '\n'
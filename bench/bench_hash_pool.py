@@ -0,0 +1,40 @@
+"""Пропускная способность проверки паролей (bcrypt) через HashPool
+в зависимости от числа процессов пула.
+
+Запуск из корня проекта:
+    FastAPI_CONFIG_FILE=settings.yml python -m bench.bench_hash_pool
+"""
+import asyncio
+from os import cpu_count
+from time import perf_counter
+
+from app.api.utils.hash_pool import HashPool
+from app.api.utils.security import check_password, get_password_hash
+
+PASSWORD = 'password123'
+LOGINS_PER_WORKER = 8
+
+
+async def run(workers: int, hashed: str) -> float:
+    pool = HashPool(workers=workers, queue=workers * LOGINS_PER_WORKER)
+    # прогрев: запуск процессов пула
+    await asyncio.gather(*[pool.run(check_password, PASSWORD, hashed) for _ in range(workers)])
+    n = workers * LOGINS_PER_WORKER
+    start = perf_counter()
+    await asyncio.gather(*[pool.run(check_password, PASSWORD, hashed) for _ in range(n)])
+    elapsed = perf_counter() - start
+    pool.shutdown()
+    return n / elapsed
+
+
+async def main():
+    hashed = get_password_hash(PASSWORD)
+    workers = 1
+    print(f"{'workers':>8} {'logins/s':>10}")
+    while workers <= (cpu_count() or 1):
+        print(f"{workers:>8} {await run(workers, hashed):>10.1f}")
+        workers *= 2
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,62 @@
+"""Чтение страницы из 1000 книг: ORM-объекты + to_schema против выборки столбцов
+схемы (Row) с пакетной проверкой TypeAdapter. В обоих случаях результат
+сериализуется в JSON, как в ответе ендпоинта.
+
+Книги добавляются в транзакции, которая в конце откатывается.
+Запуск из корня проекта (БД из DB_ALCHEMY, миграции применены):
+    FastAPI_CONFIG_FILE=settings.yml python -m bench.bench_read_path
+"""
+import asyncio
+from time import perf_counter
+from typing import List
+
+from pydantic import TypeAdapter
+from sqlalchemy import select, text
+
+from app.api.schemas.all import BookDB
+from app.db.database import async_session_maker
+from app.db.models.all import Book
+from app.db.repositories.base_repository import select_schema, to_schemas
+
+PAGE = 1000
+ROUNDS = 50
+
+page_json = TypeAdapter(List[BookDB])
+
+
+async def orm_path(session) -> bytes:
+    res = await session.execute(select(Book).order_by(Book.name).limit(PAGE))
+    books = [b.to_schema() for b in res.scalars().all()]
+    # каждый запрос - новая сессия: identity map не переиспользуется
+    session.expunge_all()
+    return page_json.dump_json(books)
+
+
+async def rows_path(session) -> bytes:
+    res = await session.execute(select_schema(Book, BookDB).order_by(Book.name).limit(PAGE))
+    return page_json.dump_json(to_schemas(BookDB, res.all()))
+
+
+async def measure(session, path) -> float:
+    await path(session)
+    start = perf_counter()
+    for _ in range(ROUNDS):
+        await path(session)
+    return (perf_counter() - start) / ROUNDS
+
+
+async def main():
+    async with async_session_maker() as session:
+        await session.execute(text(
+            f"INSERT INTO books (name, description, publish_year, amount) "
+            f"SELECT 'bench ' || i, md5(i::text), 1900 + i % 120, 5 FROM generate_series(1, {PAGE}) i"))
+        assert await orm_path(session) == await rows_path(session)
+
+        print(f"{'path':>10} {'ms/page':>10}")
+        for name, path in (('orm', orm_path), ('rows', rows_path)):
+            print(f"{name:>10} {await measure(session, path) * 1000:>10.2f}")
+        await session.rollback()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,67 @@
+"""Сериализация вложенного ответа админки (/admin/get_users_overdue/,
+List[UserWithBooksBookDB]): путь FastAPI по умолчанию (повторная проверка по
+response_model + JSONResponse), тот же путь с ORJSONResponse и @prevalidated
+(pydantic-core сразу в байты).
+
+Запуск из корня проекта:
+    FastAPI_CONFIG_FILE=settings.yml python -m bench.bench_serialization
+"""
+import asyncio
+from datetime import date, timedelta
+from time import perf_counter
+from typing import List
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from app.api.schemas.all import BookDB, UserBookWithBookDB, UserWithBooksBookDB
+from app.api.utils.responses import dump_schemas
+
+USERS = (10, 100, 1000)
+LOANS_PER_USER = 5
+ROUNDS = 20
+
+field = create_model_field('Response_get_users_overdue', List[UserWithBooksBookDB], mode='serialization')
+
+
+def page(users: int) -> List[UserWithBooksBookDB]:
+    day = date(2026, 1, 1)
+    return [UserWithBooksBookDB(
+        id=u, name=f'reader {u}', email=f'reader{u}@test.ru', born=date(2000, 1, 1), role_id=0, verified=True,
+        books=[UserBookWithBookDB(
+            id=u * LOANS_PER_USER + i, left_id=u, right_id=i, get_at=day, must_return_at=day + timedelta(days=14),
+            returned_at=None, returned=False,
+            book=BookDB(id=i, name=f'book {i}', description='description ' * 10, publish_year=1900 + i, amount=3))
+            for i in range(LOANS_PER_USER)])
+        for u in range(users)]
+
+
+async def default_path(content) -> bytes:
+    return JSONResponse(await serialize_response(field=field, response_content=content)).body
+
+
+async def orjson_path(content) -> bytes:
+    return ORJSONResponse(await serialize_response(field=field, response_content=content)).body
+
+
+async def prevalidated_path(content) -> bytes:
+    return dump_schemas(content)
+
+
+async def main():
+    print(f"{'users':>6} {'path':>13} {'ms/resp':>9} {'MB/s':>8}")
+    for users in USERS:
+        content = page(users)
+        for name, path in (('default', default_path), ('orjson', orjson_path),
+                           ('prevalidated', prevalidated_path)):
+            size = len(await path(content))
+            start = perf_counter()
+            for _ in range(ROUNDS):
+                await path(content)
+            elapsed = (perf_counter() - start) / ROUNDS
+            print(f"{users:>6} {name:>13} {elapsed * 1000:>9.2f} {size / elapsed / 2 ** 20:>8.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
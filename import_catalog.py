@@ -0,0 +1,37 @@
+"""Массовый импорт каталога (авторы, жанры, книги, связи) из файла CSV/NDJSON.
+
+Кэш ответов сбрасывается в хранилище этого процесса: без общего хранилища
+(RESPONSE_CACHE_URL) работающий сервер отдаёт прежние страницы каталога из своего
+кэша до истечения RESPONSE_CACHE_SECONDS.
+
+Запуск из корня проекта:
+    FastAPI_CONFIG_FILE=settings.yml python import_catalog.py books catalog.ndjson
+    FastAPI_CONFIG_FILE=settings.yml python import_catalog.py authors authors.csv
+"""
+import argparse
+import asyncio
+from pathlib import Path
+
+from app.api.utils.bulk_import import read_chunks, run_import
+from app.db.database import async_session_maker
+from app.db.repositories.repository import Repository
+
+
+async def main(kind: str, path: Path, fmt: str) -> None:
+    async with async_session_maker() as session:
+        rep = Repository(session)
+        async with rep.transaction():
+            with open(path, 'rb') as file:
+                report = await run_import(rep, kind, fmt, read_chunks(file))
+    print(report.model_dump_json(indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('kind', choices=['authors', 'genres', 'books', 'links'])
+    parser.add_argument('path', type=Path)
+    parser.add_argument('--format', choices=['ndjson', 'csv'],
+                        help='по умолчанию - по расширению файла')
+    args = parser.parse_args()
+    fmt = args.format or ('csv' if args.path.suffix.lower() == '.csv' else 'ndjson')
+    asyncio.run(main(args.kind, args.path, fmt))
@@ -1,21 +1,50 @@
 import uvicorn
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Depends
 from app.api.routers.admin import admin_router
 from app.api.routers.auth import auth_router
 from app.api.routers.author import author_router
 from app.api.routers.book import book_router
+from app.api.routers.export import export_router
 from app.api.routers.genre import genre_router
+from app.api.routers.metrics import metrics_router
+from app.api.routers.search import search_router
+from app.api.routers.stats import stats_router
 from app.api.routers.user import user_router
+from app.api.utils.mailer import mail_queue
+from app.api.utils.responses import DefaultResponse
+from app.api.utils.security import hash_pool
+from app.api.utils.metrics import MetricsMiddleware
+from app.api.utils.query_guard import QueryGuardMiddleware
+from app.api.utils.response_cache import ResponseCacheMiddleware
+from app.db.jobs import start_jobs, stop_jobs
 from app.log.logger import logger
 
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    mail_queue.start()
+    jobs = start_jobs()
+    yield
+    await stop_jobs(jobs)
+    await mail_queue.stop()
+    hash_pool.shutdown()
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=DefaultResponse)
+app.add_middleware(ResponseCacheMiddleware)
+app.add_middleware(QueryGuardMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(admin_router)
 app.include_router(auth_router)
 app.include_router(author_router)
 app.include_router(book_router)
+app.include_router(export_router)
 app.include_router(genre_router)
+app.include_router(metrics_router)
+app.include_router(search_router)
+app.include_router(stats_router)
 app.include_router(user_router)
 
 
@@ -1,10 +1,14 @@
 import pytest_asyncio
+import socket
+from contextlib import contextmanager
 from pathlib import Path
 from alembic.command import upgrade, downgrade
 from alembic.config import Config as AlembicConfig
 
+from aiosmtpd.controller import Controller
 from fastapi.testclient import TestClient
 import pytest
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 
 import sys
@@ -14,17 +18,21 @@ root_dir = d(d(abspath(__file__)))
 sys.path.append(root_dir)
 
 from app.config import settings, AlembicTestData
-from app.db.database import get_rep
+from app.db import database
+from app.db.database import get_rep, get_read_rep, get_read_session_maker
+from app.db.query_metrics import instrument_engine
 from app.db.repositories.repository import Repository
+from app.db.cache import user_cache, response_cache, make_cache_backend
 from main import app
 
-from app.api.utils.security import create_token
+from app.api.utils.security import access_claims, create_token
 from datetime import timedelta
 
 
 @pytest_asyncio.fixture(scope="session")
 def engine():
     engine = create_async_engine(settings.DB_ALCHEMY_TEST.get_secret_value())
+    instrument_engine(engine.sync_engine)
     yield engine
     engine.sync_engine.dispose()
 
@@ -48,21 +56,48 @@ async def override_get_rep(get_db):
 
 
 @pytest_asyncio.fixture(scope="function")
-async def client(override_get_rep) -> TestClient:
+async def client(override_get_rep, async_session_maker) -> TestClient:
     app.dependency_overrides[get_rep] = override_get_rep
+    app.dependency_overrides[get_read_rep] = override_get_rep
+    app.dependency_overrides[get_read_session_maker] = lambda: async_session_maker
     return TestClient(app)
 
 
+# Чтение через "реплику": отдельная фабрика сессий тестовой БД вместо подмены
+# get_read_rep/get_read_session_maker основной БД. Возвращает сессии, открытые на реплике
+@pytest.fixture
+def replica(client, engine, async_session_maker, monkeypatch):
+    replica_maker = async_sessionmaker(engine, expire_on_commit=False)
+    opened = []
+
+    def maker() -> AsyncSession:
+        session = replica_maker()
+        opened.append(session)
+        return session
+
+    monkeypatch.setattr(database, 'async_session_maker', async_session_maker)
+    monkeypatch.setattr(database, 'replica_session_maker', maker)
+    monkeypatch.setattr(database, 'replica_engine', engine)
+    monkeypatch.delitem(app.dependency_overrides, get_read_rep)
+    monkeypatch.delitem(app.dependency_overrides, get_read_session_maker)
+    yield opened
+
+
+# Токены доступа как у /auth/login/: id, роль и версия токенов пользователя из начальных данных
 @pytest.fixture(scope="session")
 def get_tokens():
+    def token(user_id: int, role_id: int = 0) -> str:
+        return create_token(subject=access_claims(user_id, role_id, 0),
+                            expires_time=timedelta(minutes=settings.ACCESS_MINUTES))
+
     guest = None
-    user_id2 = create_token(subject={"sub": str(2)}, expires_time=timedelta(minutes=settings.ACCESS_MINUTES))
-    admin_id1 = create_token(subject={"sub": str(1)}, expires_time=timedelta(minutes=settings.ACCESS_MINUTES))
-    user_id3 = create_token(subject={"sub": str(3)}, expires_time=timedelta(minutes=settings.ACCESS_MINUTES))
-    user_id4 = create_token(subject={"sub": str(4)}, expires_time=timedelta(minutes=settings.ACCESS_MINUTES))
-    user_id5 = create_token(subject={"sub": str(5)}, expires_time=timedelta(minutes=settings.ACCESS_MINUTES))
-    user_id6 = create_token(subject={"sub": str(6)}, expires_time=timedelta(minutes=settings.ACCESS_MINUTES))
-    user_fake = create_token(subject={"sub": str(666)}, expires_time=timedelta(minutes=settings.ACCESS_MINUTES))
+    user_id2 = token(2)
+    admin_id1 = token(1, role_id=2)
+    user_id3 = token(3)
+    user_id4 = token(4)
+    user_id5 = token(5)
+    user_id6 = token(6)
+    user_fake = token(666)
     user_text = create_token(subject={"sub": 'text'}, expires_time=timedelta(minutes=settings.ACCESS_MINUTES))
     return {
         "guest": guest,
@@ -93,7 +128,64 @@ def alembic_config() -> AlembicConfig:
 @pytest_asyncio.fixture(scope="module")
 def create(engine, alembic_config: AlembicConfig):
     upgrade(alembic_config, "head")
+    user_cache.clear()
+    response_cache.backend = make_cache_backend()
     yield engine
     downgrade(alembic_config, "base")
 
 
+# Учёт запросов SQL на HTTP-запрос: число в заголовке X-DB-Statements ответа,
+# превышение порогов - исключение QueryBudgetExceeded
+@pytest.fixture
+def query_guard(monkeypatch):
+    monkeypatch.setattr(settings, 'DB_QUERY_GUARD', 'raise')
+    yield settings
+
+
+# Запись SQL, отправленного движком внутри блока with (без EXPLAIN): [(statement, parameters)]
+@pytest.fixture
+def captured_statements():
+    @contextmanager
+    def capture(engine):
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            if not statement.lstrip().upper().startswith('EXPLAIN'):
+                statements.append((statement, parameters))
+
+        event.listen(engine.sync_engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(engine.sync_engine, 'before_cursor_execute', before_cursor_execute)
+    return capture
+
+
+# SMTP-сервер для тестов (aiosmtpd): сохраняет письма и соединения (сессии),
+# на DATA отвечает заранее заданными кодами, затем 250
+class Recorder:
+    def __init__(self):
+        self.messages = []
+        self.sessions = set()
+        self.replies = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.sessions.add(session)
+        if self.replies:
+            return self.replies.pop(0)
+        self.messages.append(envelope)
+        return '250 OK'
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def smtp_server():
+    controller = Controller(Recorder(), hostname='127.0.0.1', port=free_port())
+    controller.start()
+    yield controller
+    controller.stop()
@@ -191,3 +191,70 @@ async def test_get_users_overdue(client, create, get_tokens, test_role, test_cod
     assert response.status_code == test_code
     if check_json:
         assert response.json() == good_json
+
+
+BOOKS_NDJSON = '\n'.join([
+    '{"name": "Золотой телёнок", "description": "Роман", "publish_year": 1931, "amount": 3,'
+    ' "authors": ["Илья Арнольдович Ильф", "Евгений Петрович Петров"], "genres": ["Роман"]}',
+    '{"name": "Без года", "description": "-", "amount": 1}',
+    'not json',
+    '{"name": "Отрочество", "description": "Повесть", "publish_year": 1854, "amount": 2,'
+    ' "authors": ["Лев Николаевич Толстой", "Неизвестный автор"]}',
+]).encode()
+
+AUTHORS_CSV = '''name,biography,born
+"Антон Павлович Чехов","Писатель, драматург
+врач",1860-01-29
+"Без даты","-",
+'''.encode()
+
+
+# @pytest.mark.skip
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "test_role, test_code",
+    [
+        ["guest", 401],
+        ["user_id2", 403],
+        ["admin_id1", 200],
+    ])
+async def test_import_books(client, create, get_tokens, test_role, test_code):
+    cookies = {'access_token': get_tokens[test_role]}
+    response = client.post("/admin/import/", cookies=cookies,
+                           params={"kind": "books", "format": "ndjson"}, content=BOOKS_NDJSON)
+    assert response.status_code == test_code
+    if test_code == 200:
+        report = response.json()
+        assert report['rows'] == 4
+        assert report['errors'] == 3
+        assert [e['row'] for e in report['error_rows']] == [2, 3, 4]
+        assert 'Неизвестный автор' in report['error_rows'][2]['error']
+        assert report['inserted'] == 2
+        assert report['links'] == 4
+
+        # повторный импорт идемпотентен: книги обновляются, связи не дублируются
+        response = client.post("/admin/import/", cookies=cookies,
+                               params={"kind": "books", "format": "ndjson"}, content=BOOKS_NDJSON)
+        report = response.json()
+        assert (report['inserted'], report['updated'], report['links']) == (0, 2, 0)
+
+        response = client.get("/book/get_with/", params={"include": "authors,genres", "item_end": 100})
+        book = next(b for b in response.json() if b['name'] == 'Золотой телёнок')
+        assert len(book['authors']) == 2
+        assert [g['name'] for g in book['genres']] == ['Роман']
+
+
+# @pytest.mark.skip
+@pytest.mark.asyncio
+async def test_import_authors_csv(client, create, get_tokens):
+    cookies = {'access_token': get_tokens['admin_id1']}
+    response = client.post("/admin/import/", cookies=cookies,
+                           params={"kind": "authors", "format": "csv"}, content=AUTHORS_CSV)
+    assert response.status_code == 200
+    report = response.json()
+    assert report['rows'] == 2
+    assert report['inserted'] == 1
+    assert [e['row'] for e in report['error_rows']] == [2]
+
+    response = client.get("/author/get_like/", params={"phrase": "Чехов"})
+    assert response.json()[0]['biography'] == 'Писатель, драматург\nврач'
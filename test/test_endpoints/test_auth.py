@@ -1,5 +1,10 @@
 import pytest
+from datetime import timedelta
 from app.config import settings
+from app.api.roles import Role
+from app.api.utils.security import access_claims, create_token
+from app.db.cache import response_cache, user_cache, user_version_key
+from app.db.repositories.repository import Repository, UserAccess
 from jose import jwt
 from main import app
 from fastapi.testclient import TestClient
@@ -54,6 +59,8 @@ async def test_login(client, create):
     assert header_access_token == cookie_access_token
     assert header_refresh_token == cookie_refresh_token
     assert id_from_access.get("sub") == str(user_id)
+    assert id_from_access.get("role") == 2
+    assert id_from_access.get("ver") == 0
     assert id_from_refresh.get("sub") == str(user_id)
 
 
@@ -69,5 +76,32 @@ async def test_logout(client, create):
     assert response.status_code == 200
 
 
+# @pytest.mark.skip
+@pytest.mark.asyncio
+async def test_demoted_admin_token(client, create, async_session_maker):
+    async with async_session_maker() as session:
+        rep = Repository(session)
+        admin = await rep.user.update(6, role_id=Role.ADMIN.value)
+        cookies = {
+            'access_token': create_token(subject=access_claims(6, admin.role_id, admin.token_version),
+                                         expires_time=timedelta(minutes=5)),
+            'refresh_token': create_token(subject={"sub": "6"}, expires_time=timedelta(minutes=5)),
+        }
+        response = client.post("/book/delete/", cookies=cookies, params={'book_id': 555})
+        assert response.status_code == 404
 
+        version, = await response_cache.versions([user_version_key(6)])
+        await rep.user.update(6, role_id=Role.USER.value)
+    # кэш процесса ещё хранит права администратора с прежней версией прав
+    user_cache.set(6, (version, UserAccess(admin.role_id, admin.token_version)))
+    response = client.post("/book/delete/", cookies=cookies, params={'book_id': 555})
+    assert response.status_code == 403
+    assert user_cache.get(6)[1] == UserAccess(Role.USER.value, admin.token_version + 1)
 
+    # перевыпущенный токен несёт новую роль и версию
+    response = client.get("/user/get_me/", cookies=cookies)
+    assert response.status_code == 200
+    claims = jwt.decode(response.cookies.get("access_token"),
+                        settings.JWT_SECRET_KEY.get_secret_value(),
+                        algorithms=[settings.JWT_ALGORITHM])
+    assert (claims["role"], claims["ver"]) == (Role.USER.value, admin.token_version + 1)
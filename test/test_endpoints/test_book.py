@@ -42,6 +42,24 @@ async def test_get(client, create, get_tokens, test_role, test_code, check_json)
         assert len(response.json()) == 3
 
 
+# @pytest.mark.skip
+@pytest.mark.asyncio
+async def test_get_cursor(client, create):
+    response = client.get("/book/get/", params={'cursor': '', 'item_end': 2})
+    assert response.status_code == 200
+    assert [b['name'] for b in response.json()] == ['Война и мир', 'Двенадцать стульев']
+    cursor = response.headers['X-Next-Cursor']
+
+    response = client.get("/book/get/", params={'cursor': cursor, 'item_end': 2})
+    assert response.status_code == 200
+    assert [b['name'] for b in response.json()] == ['Детство']
+    assert 'X-Next-Cursor' not in response.headers
+
+    response = client.get("/book/get/", params={'cursor': 'fake'})
+    assert response.status_code == 400
+    assert response.json()['detail'] == 'Invalid cursor'
+
+
 # @pytest.mark.skip
 @pytest.mark.asyncio
 @pytest.mark.parametrize(
@@ -59,6 +77,58 @@ async def test_get_like(client, create, get_tokens, test_role, test_code, check_
         assert len(response.json()) == 2
 
 
+# @pytest.mark.skip
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "test_code, phrase, first_name",
+    [
+        [200, 'детство', 'Детство'],
+        [200, 'ВОЙНА', 'Война и мир'],
+        [200, 'Двинадцать стульев', 'Двенадцать стульев'],
+        [404, 'xyz', None],
+    ])
+async def test_get_similar(client, create, test_code, phrase, first_name):
+    response = client.get("/book/get_similar/", params={'phrase': phrase})
+    assert response.status_code == test_code
+    if first_name:
+        assert response.json()[0]['name'] == first_name
+
+
+# @pytest.mark.skip
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "test_code, include, has_authors, has_genres",
+    [
+        [200, '', False, False],
+        [200, 'authors', True, False],
+        [200, 'authors,genres', True, True],
+        [400, 'users', False, False],
+    ])
+async def test_get_with(client, create, test_code, include, has_authors, has_genres):
+    response = client.get("/book/get_with/", params={'include': include})
+    assert response.status_code == test_code
+    if test_code == 200:
+        books = response.json()
+        assert len(books) == 3
+        assert all((b['authors'] is not None) == has_authors for b in books)
+        assert all((b['genres'] is not None) == has_genres for b in books)
+        if has_authors:
+            assert any(b['authors'] for b in books)
+
+
+# кол-во запросов не зависит от размера страницы: записи + по одному на связь
+# @pytest.mark.skip
+@pytest.mark.asyncio
+@pytest.mark.parametrize("item_end", [1, 2, 3])
+async def test_get_with_statements(client, create, engine, captured_statements, item_end):
+    with captured_statements(engine) as statements:
+        response = client.get("/book/get_with/",
+                              params={'include': 'authors,genres', 'item_end': item_end})
+    assert response.status_code == 200
+    assert len(response.json()) == item_end
+    assert len(statements) == 3
+
+
 # @pytest.mark.skip
 @pytest.mark.asyncio
 @pytest.mark.parametrize(
@@ -0,0 +1,48 @@
+import csv
+import io
+import json
+import pytest
+
+
+# @pytest.mark.skip
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "test_role, test_code",
+    [
+        ["guest", 401],
+        ["user_id2", 403],
+        ["admin_id1", 200],
+    ])
+async def test_export_books(client, create, get_tokens, test_role, test_code):
+    cookies = {'access_token': get_tokens[test_role]}
+    response = client.get("/export/books/", cookies=cookies)
+    assert response.status_code == test_code
+    if test_code == 200:
+        assert response.headers['content-type'] == 'application/x-ndjson'
+        books = [json.loads(line) for line in response.text.splitlines()]
+        assert len(books) == 3
+        assert [b['id'] for b in books] == sorted(b['id'] for b in books)
+        book = next(b for b in books if b['name'] == 'Двенадцать стульев')
+        assert book['authors'] == ['Евгений Петрович Петров', 'Илья Арнольдович Ильф']
+
+
+# @pytest.mark.skip
+@pytest.mark.asyncio
+async def test_export_books_csv(client, create, get_tokens):
+    cookies = {'access_token': get_tokens['admin_id1']}
+    response = client.get("/export/books/", cookies=cookies, params={'format': 'csv'})
+    assert response.status_code == 200
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert len(rows) == 3
+    assert set(rows[0]) == {'id', 'name', 'description', 'publish_year', 'amount', 'authors', 'genres'}
+
+
+# @pytest.mark.skip
+@pytest.mark.asyncio
+async def test_export_loans(client, create, get_tokens):
+    cookies = {'access_token': get_tokens['admin_id1']}
+    response = client.get("/export/loans/", cookies=cookies)
+    assert response.status_code == 200
+    loans = [json.loads(line) for line in response.text.splitlines()]
+    assert loans
+    assert set(loans[0]) == {'id', 'user_id', 'book_id', 'get_at', 'must_return_at', 'returned_at', 'returned'}
@@ -0,0 +1,50 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.db.database import request_session
+from app.db.pool import MeteredSession, request_sessions, session_connected
+from app.db.repositories.repository import Repository
+
+
+# @pytest.mark.skip
+@pytest.mark.asyncio
+async def test_get_pool(client):
+    response = client.get("/metrics/pool/")
+    assert response.status_code == 200
+    stats = response.json()
+    assert stats["checked_out"] >= 0
+    assert stats["wait_seconds"]["buckets"]["+Inf"] == stats["wait_seconds"]["count"]
+
+
+# @pytest.mark.skip
+@pytest.mark.asyncio
+async def test_get_metrics(client, create):
+    client.get("/book/get_one/", params={'book_id': 1})
+    response = client.get("/metrics/")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'http_requests_total{method="GET",route="/book/get_one/",status="200"}' in response.text
+    assert 'http_request_duration_seconds_count{method="GET",route="/book/get_one/"}' in response.text
+
+
+# @pytest.mark.skip
+@pytest.mark.asyncio
+async def test_request_session_lazy(create, engine):
+    maker = async_sessionmaker(engine, expire_on_commit=False, sync_session_class=MeteredSession)
+    unused = request_sessions.labels('test', 'unused')
+    used = request_sessions.labels('test', 'used')
+    connected = session_connected.labels('test')
+    unused_before, used_before, connected_before = unused.value, used.value, connected.count
+
+    # без запросов соединение из пула не берётся
+    checked_out = engine.pool.checkedout()
+    async with request_session(maker, 'test') as session:
+        Repository(session).user
+        assert engine.pool.checkedout() == checked_out
+    assert unused.value == unused_before + 1
+
+    async with request_session(maker, 'test') as session:
+        await session.execute(text('SELECT 1'))
+    assert used.value == used_before + 1
+    assert connected.count == connected_before + 1
@@ -0,0 +1,76 @@
+import pytest
+
+from app.db.cache import user_cache
+from app.db.query_metrics import QueryBudgetExceeded
+
+
+# Запросов SQL на ендпоинт; кэш пользователей сброшен, поэтому require_user
+# читает роль и версию токенов из БД (1 запрос), role_req берёт роль из токена
+# @pytest.mark.skip
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "test_role, path, data, test_code, statements",
+    [
+        # блокировка строки читателя + выдача одним запросом
+        ["user_id6", '/user/take_book/', {'book_id': 1}, 200, 3],
+        ["user_id6", '/user/take_book/', {'book_id': 1}, 409, 3],
+        # проверки связей останавливаются на первой найденной
+        ["admin_id1", '/book/delete/', {'book_id': 1}, 409, 2],
+        # 4 проверки связей + удаление
+        ["admin_id1", '/book/delete/', {'book_id': 555}, 404, 6],
+    ])
+async def test_statement_budget(client, create, get_tokens, query_guard, test_role, path, data: dict,
+                                test_code, statements):
+    user_cache.clear()
+    cookies = {'access_token': get_tokens[test_role]}
+    response = client.post(path, cookies=cookies, params=data)
+    assert response.status_code == test_code
+    assert int(response.headers['X-DB-Statements']) == statements
+    assert float(response.headers['X-DB-Time']) >= 0
+
+
+# @pytest.mark.skip
+@pytest.mark.asyncio
+async def test_warm_user_cache(client, create, get_tokens, query_guard):
+    cookies = {'access_token': get_tokens['admin_id1']}
+    user_cache.clear()
+    response = client.post('/book/delete/', cookies=cookies, params={'book_id': 555})
+    assert int(response.headers['X-DB-Statements']) == 6
+    # установившийся режим: версия токена сверяется с кэшем, роль - из токена,
+    # запросов к users нет - только 4 проверки связей и удаление
+    for _ in range(2):
+        response = client.post('/book/delete/', cookies=cookies, params={'book_id': 555})
+        assert response.status_code == 404
+        assert int(response.headers['X-DB-Statements']) == 5
+
+# @pytest.mark.skip
+@pytest.mark.asyncio
+async def test_budget_exceeded(client, create, get_tokens, query_guard, monkeypatch):
+    cookies = {'access_token': get_tokens['admin_id1']}
+    monkeypatch.setattr(query_guard, 'DB_QUERY_BUDGET', 5)
+    user_cache.clear()
+    with pytest.raises(QueryBudgetExceeded):
+        client.post('/book/delete/', cookies=cookies, params={'book_id': 555})
+
+    # log - только предупреждение, ответ не меняется
+    monkeypatch.setattr(query_guard, 'DB_QUERY_GUARD', 'log')
+    user_cache.clear()
+    response = client.post('/book/delete/', cookies=cookies, params={'book_id': 555})
+    assert response.status_code == 404
+    assert int(response.headers['X-DB-Statements']) == 6
+
+
+# @pytest.mark.skip
+@pytest.mark.asyncio
+async def test_slow_query(client, create, get_tokens, query_guard, monkeypatch):
+    monkeypatch.setattr(query_guard, 'DB_SLOW_QUERY_MS', 1e-6)
+    with pytest.raises(QueryBudgetExceeded):
+        client.post('/user/take_book/', cookies={'access_token': get_tokens['user_id5']}, params={'book_id': 2})
+
+
+# @pytest.mark.skip
+@pytest.mark.asyncio
+async def test_guard_off(client, create, get_tokens):
+    response = client.get('/book/get_authors/', params={'book_id': 3})
+    assert response.status_code == 200
+    assert 'X-DB-Statements' not in response.headers
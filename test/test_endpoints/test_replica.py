@@ -0,0 +1,39 @@
+import pytest
+from starlette.requests import Request
+
+from app.config import settings
+from app.db import database
+from app.db.database import get_read_session_maker, READ_PRIMARY_COOKIE
+
+
+def make_request(cookie: str = '') -> Request:
+    headers = [(b'cookie', cookie.encode())] if cookie else []
+    return Request({'type': 'http', 'method': 'GET', 'path': '/', 'headers': headers})
+
+
+# @pytest.mark.skip
+@pytest.mark.asyncio
+async def test_read_session_maker(replica):
+    assert await get_read_session_maker(make_request()) is database.replica_session_maker
+    request = make_request(f'{READ_PRIMARY_COOKIE}=1')
+    assert await get_read_session_maker(request) is database.async_session_maker
+
+
+# @pytest.mark.skip
+@pytest.mark.asyncio
+async def test_read_your_writes(client, create, get_tokens, replica):
+    cookies = {'access_token': get_tokens['admin_id1']}
+    response = client.get("/export/books/", cookies=cookies)
+    assert response.status_code == 200
+    assert len(replica) == 1
+
+    # изменение через get_uow: кука на DB_READ_PRIMARY_SECONDS
+    response = client.post("/genre/create/", cookies=cookies, json={"name": 'запись', "description": 'запись'})
+    assert response.status_code == 200
+    assert response.cookies.get(READ_PRIMARY_COOKIE) == '1'
+    assert f'Max-Age={settings.DB_READ_PRIMARY_SECONDS}' in response.headers['set-cookie']
+
+    client.cookies.clear()
+    response = client.get("/export/books/", cookies=cookies | {READ_PRIMARY_COOKIE: '1'})
+    assert response.status_code == 200
+    assert len(replica) == 1
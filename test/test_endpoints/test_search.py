@@ -0,0 +1,21 @@
+import pytest
+
+
+# @pytest.mark.skip
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "test_code, phrase, kinds, first",
+    [
+        [200, 'бриллианты', {'book'}, {'kind': 'book', 'id': 1}],
+        [200, 'писатель', {'author'}, None],
+        [200, 'роман', {'book', 'genre'}, None],
+        [404, 'xyz', None, None],
+    ])
+async def test_search(client, create, test_code, phrase, kinds, first):
+    response = client.get("/search/", params={'phrase': phrase})
+    assert response.status_code == test_code
+    if kinds:
+        assert {h['kind'] for h in response.json()} >= kinds
+    if first:
+        hit = response.json()[0]
+        assert {'kind': hit['kind'], 'id': hit['id']} == first
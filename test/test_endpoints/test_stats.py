@@ -0,0 +1,52 @@
+import pytest
+from datetime import date, timedelta
+
+
+# @pytest.mark.skip
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "test_role, test_code",
+    [
+        ["guest", 401],
+        ["user_id2", 403],
+        ["admin_id1", 200],
+    ])
+async def test_refresh(client, create, get_tokens, test_role, test_code):
+    cookies = {'access_token': get_tokens[test_role]}
+    response = client.post("/stats/refresh/", cookies=cookies)
+    assert response.status_code == test_code
+
+
+# @pytest.mark.skip
+@pytest.mark.asyncio
+async def test_top_books(client, create, get_tokens):
+    cookies = {'access_token': get_tokens['admin_id1']}
+    # месяцы выдач тестовых данных
+    months = {(date.today() - timedelta(days=d)).replace(day=1) for d in (10, 16, 19)}
+    loans = 0
+    for month in months:
+        response = client.get("/stats/top_books/", cookies=cookies, params={'month': str(month)})
+        if response.status_code == 404:
+            continue
+        books = response.json()
+        assert [b['loans'] for b in books] == sorted((b['loans'] for b in books), reverse=True)
+        loans += sum(b['loans'] for b in books)
+    assert loans == 8
+
+
+# @pytest.mark.skip
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "get_id, returned, test_code, good_json",
+    [
+        [2, True, 200, [{"id": 1, "name": "Роман", "loans": 2, "readers": None},
+                        {"id": 2, "name": "Эпопея", "loans": 1, "readers": None}]],
+        [6, True, 404, None],
+    ])
+async def test_user_genres(client, create, get_tokens, get_id, returned, test_code, good_json):
+    cookies = {'access_token': get_tokens['admin_id1']}
+    response = client.get("/stats/user_genres/", cookies=cookies,
+                          params={'get_id': get_id, 'returned': returned})
+    assert response.status_code == test_code
+    if good_json:
+        assert response.json() == good_json
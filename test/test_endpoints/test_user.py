@@ -130,7 +130,7 @@ async def test_get_my_books(client, create, get_tokens, test_role, test_code, ch
         ["user_id2", 200, True, True],
         ["user_id2", 422, False, None],
     ])
-async def get_my_genres(client, create, get_tokens, test_role, test_code, check_json, returned):
+async def test_get_my_genres(client, create, get_tokens, test_role, test_code, check_json, returned):
     cookies = {'access_token': get_tokens[test_role]}
     response = client.get("/user/get_my_genres/", cookies=cookies, params={"returned": returned})
     good_json = [
@@ -138,6 +138,11 @@ async def get_my_genres(client, create, get_tokens, test_role, test_code, check_
             "name": "Роман",
             "description": "Литературный жанр, чаще прозаический, зародившийся в Средние века у романских народов, как рассказ на народном языке и ныне превратившийся в самый распространённый вид эпической литературы, изображающий жизнь персонажа с её волнующими страстями, борьбой, социальными противоречиями и стремлениями к идеалу. Будучи развёрнутым повествованием о жизни и развитии личности главного героя (героев) в кризисный, нестандартный период его жизни, отличается от повести объёмом, сложностью содержания и более широким захватом описываемых явлений",
             "id": 1
+        },
+        {
+            "name": "Эпопея",
+            "description": "Обширное эпическое повествование в стихах или прозе о выдающихся национально-исторических событиях. В переносном смысле: сложная, продолжительная история чего-либо, включающая ряд крупных событий.",
+            "id": 2
         }
     ]
     assert response.status_code == test_code
@@ -0,0 +1,84 @@
+import aiosmtplib
+import pytest
+from datetime import timedelta
+
+from app.api.utils.mailer import Mail, MailQueue
+from app.db import jobs
+from app.db.repositories.repository import Repository
+
+
+LEASE = timedelta(minutes=10)
+
+
+@pytest.fixture
+def outbox_worker(smtp_server, async_session_maker, monkeypatch):
+    queue = MailQueue(
+        lambda: aiosmtplib.SMTP(hostname=smtp_server.hostname, port=smtp_server.port,
+                                use_tls=False, start_tls=False),
+        workers=2, retries=0, retry_seconds=0)
+    monkeypatch.setattr(jobs, 'mail_queue', queue)
+    monkeypatch.setattr(jobs, 'async_session_maker', async_session_maker)
+    yield queue
+
+
+# @pytest.mark.skip
+@pytest.mark.asyncio
+async def test_outbox_enqueued_with_transaction(create, async_session_maker, smtp_server, outbox_worker):
+    async with async_session_maker() as session:
+        rep = Repository(session)
+        with pytest.raises(ValueError):
+            async with rep.transaction():
+                await rep.outbox.add([Mail(['lost@test.ru'], 'Lost', '<p>lost</p>')])
+                raise ValueError
+        async with rep.transaction():
+            await rep.outbox.add([Mail(['user1@test.ru'], 'Hello', '<p>hello</p>'),
+                                  Mail(['user2@test.ru'], 'Hello', '<p>hello</p>')])
+
+    await jobs.deliver_outbox()
+    await outbox_worker.stop()
+
+    assert sorted(m.rcpt_tos[0] for m in smtp_server.handler.messages) == ['user1@test.ru', 'user2@test.ru']
+    async with async_session_maker() as session:
+        # отправленные удалены из очереди
+        assert await Repository(session).outbox.claim(100, LEASE) == []
+
+
+# @pytest.mark.skip
+@pytest.mark.asyncio
+async def test_outbox_transient_error_rescheduled(create, async_session_maker, smtp_server, outbox_worker):
+    smtp_server.handler.replies = ['451 Try again later']
+    async with async_session_maker() as session:
+        await Repository(session).outbox.add([Mail(['user3@test.ru'], 'Later', '<p>later</p>')])
+
+    await jobs.deliver_outbox()
+    await outbox_worker.stop()
+
+    assert smtp_server.handler.messages == []
+    async with async_session_maker() as session:
+        rep = Repository(session)
+        # повтор отложен на EMAIL_OUTBOX_RETRY_SECONDS, письмо не в отложенных навсегда
+        assert await rep.outbox.claim(100, LEASE) == []
+        assert await rep.outbox.get_dead(0, 100) == []
+
+
+# @pytest.mark.skip
+@pytest.mark.asyncio
+async def test_outbox_dead_letter(create, async_session_maker, smtp_server, outbox_worker):
+    smtp_server.handler.replies = ['550 Mailbox unavailable']
+    async with async_session_maker() as session:
+        await Repository(session).outbox.add([Mail(['user4@test.ru'], 'Never', '<p>never</p>')])
+
+    await jobs.deliver_outbox()
+    async with async_session_maker() as session:
+        rep = Repository(session)
+        dead = await rep.outbox.get_dead(0, 100)
+        assert [(m.recipients, m.attempts) for m in dead] == [(['user4@test.ru'], 1)]
+        assert '550' in dead[0].last_error
+        assert await rep.outbox.retry_dead([dead[0].id]) == 1
+
+    await jobs.deliver_outbox()
+    await outbox_worker.stop()
+
+    assert [m.rcpt_tos for m in smtp_server.handler.messages] == [['user4@test.ru']]
+    async with async_session_maker() as session:
+        assert await Repository(session).outbox.get_dead(0, 100) == []
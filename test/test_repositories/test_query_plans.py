@@ -0,0 +1,125 @@
+import pytest
+import pytest_asyncio
+from datetime import date
+from sqlalchemy import text
+
+from app.config import settings
+from app.db.repositories.base_repository import DEFERRED_COMMIT
+from app.db.repositories.pagination import Cursor
+from app.db.repositories.repository import Repository
+
+
+# Таблицы, заполняемые объёмом, на котором последовательное чтение недопустимо
+LARGE_TABLES = {'books', 'authors', 'users', 'author_book', 'genre_book', 'user_book'}
+
+BIG_SEED = [
+    """INSERT INTO authors (name, biography, born)
+       SELECT 'author ' || i, md5(i::text), date '1900-01-01' + i
+       FROM generate_series(1, 2000) i""",
+    """INSERT INTO books (name, description, publish_year, amount)
+       SELECT md5(i::text), md5((-i)::text), 1900 + i % 120, 5
+       FROM generate_series(1, 20000) i""",
+    """INSERT INTO genres (name, description)
+       SELECT 'genre ' || i, md5(i::text)
+       FROM generate_series(1, 200) i""",
+    """INSERT INTO users (name, hashed_password, email, role_id, born, verified)
+       SELECT 'reader ' || i, '-', 'reader' || i || '@test.ru', 0, date '2000-01-01', false
+       FROM generate_series(1, 5000) i""",
+    """INSERT INTO author_book (left_id, right_id)
+       SELECT a.id, b.id FROM books b
+       JOIN authors a ON a.id = b.id % (SELECT max(id) FROM authors) + 1
+       ON CONFLICT DO NOTHING""",
+    """INSERT INTO genre_book (left_id, right_id)
+       SELECT g.id, b.id FROM books b
+       JOIN genres g ON g.id = b.id % (SELECT max(id) FROM genres) + 1
+       ON CONFLICT DO NOTHING""",
+    # 95% сданы (каждая десятая - с опозданием), 5% на руках и просрочены
+    """INSERT INTO user_book (left_id, right_id, get_at, must_return_at, returned_at, returned)
+       SELECT u.id, b.id, current_date - 30, current_date - 16,
+              CASE WHEN i % 20 = 0 THEN NULL
+                   WHEN i % 10 = 1 THEN current_date - 10
+                   ELSE current_date - 20 END,
+              i % 20 != 0
+       FROM generate_series(1, 50000) i
+       JOIN users u ON u.id = i % (SELECT max(id) FROM users) + 1
+       JOIN books b ON b.id = (i * 7) % (SELECT max(id) FROM books) + 1
+       ON CONFLICT DO NOTHING""",
+]
+
+# (метод репозитория, аргументы)
+CASES = [
+    ('book.get', (0, 10)),
+    ('book.get', (0, 10, Cursor('8', 100))),
+    ('book.get_names_like', ('abcd', 0, 10)),
+    ('book.get_names_similar', ('abcdef', 0, 10)),
+    ('book.get_one', (1,)),
+    ('book.get_by_name', ('Детство',)),
+    ('book.get_authors', (1, 0, 10)),
+    ('book.get_genres', (1, 0, 10)),
+    ('book.get_users', (1, False, 0, 10)),
+    ('author.get_books', (1, 0, 10)),
+    ('author.get_genres', (1, 0, 10)),
+    ('author.get_users', (3, True, 0, 10)),
+    ('genre.get_books', (1, 0, 10)),
+    ('genre.get_authors', (1, 0, 10)),
+    ('genre.get_users', (1, True, 0, 10)),
+    ('user.get_access', (2,)),
+    ('user.get_book', (3, 1, 0, 2)),
+    ('user.get_books', (2, True, 0, 10)),
+    ('user.get_genres', (2, True, 0, 10)),
+    ('user.get_authors', (2, True, 0, 10)),
+    ('user.get_overdue', (False, 0, 10)),
+    ('user.get_overdue', (True, 0, 10)),
+    ('user.user_take_book', (6, 1, settings.MAX_AMOUNT)),
+    ('user.user_return_book', (3, 1)),
+    ('user.mark_overdue', (date.today(), 100)),
+    ('author_book.count_links_left', (1,)),
+    ('author_book.count_links_right', (1,)),
+    ('genre_book.count_links_left', (1,)),
+    ('genre_book.count_links_right', (1,)),
+    ('user_book.count_links_left', (2,)),
+    ('user_book.count_links_right', (1,)),
+    ('user_book.get_link', (3, 1, False)),
+    ('user_book.delete_all_left_links_returned', (2, True)),
+    ('user_book.delete_all_right_links_returned', (1, True)),
+]
+
+
+@pytest_asyncio.fixture(scope="module")
+async def big_data(create, engine):
+    async with engine.begin() as conn:
+        for stmt in BIG_SEED:
+            await conn.execute(text(stmt))
+    async with engine.connect() as conn:
+        await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text("VACUUM ANALYZE"))
+    yield engine
+
+
+def seq_scans(plan: dict):
+    if plan.get('Node Type') == 'Seq Scan':
+        yield plan['Relation Name']
+    for child in plan.get('Plans', []):
+        yield from seq_scans(child)
+
+
+# @pytest.mark.skip
+@pytest.mark.asyncio
+@pytest.mark.parametrize("method, args", CASES)
+async def test_no_seq_scan_on_large_tables(big_data, async_session_maker, captured_statements, method, args):
+    async with async_session_maker() as session:
+        # изменения не фиксируются: commit() репозиториев выполняет только flush
+        session.info[DEFERRED_COMMIT] = True
+        rep = Repository(session)
+        attr, name = method.split('.')
+        with captured_statements(big_data) as statements:
+            await getattr(getattr(rep, attr), name)(*args)
+        assert statements
+
+        for statement, parameters in statements:
+            res = await session.connection()
+            explain = await res.exec_driver_sql(f'EXPLAIN (FORMAT JSON) {statement}', parameters)
+            plan = explain.scalar()[0]['Plan']
+            scanned = set(seq_scans(plan)) & LARGE_TABLES
+            assert not scanned, f'{method}: Seq Scan on {scanned}\n{statement}'
+        await session.rollback()
@@ -0,0 +1,34 @@
+import pytest
+from sqlalchemy import select
+
+from app.api.schemas.all import AuthorDB, BookDB
+from app.db.models.all import AuthorBook, Book
+from app.db.repositories.repository import Repository
+
+
+# @pytest.mark.skip
+@pytest.mark.asyncio
+async def test_get_returns_schemas_without_orm_objects(create, async_session_maker):
+    async with async_session_maker() as session:
+        rep = Repository(session)
+        books = await rep.book.get(0, 10)
+        authors = await rep.author.get_names_like('о', 0, 10)
+        assert books and all(type(b) is BookDB for b in books)
+        assert authors and all(type(a) is AuthorDB for a in authors)
+        # строки не попадают в identity map сессии
+        assert len(session.identity_map) == 0
+
+        res = await session.execute(select(Book).order_by(Book.name).slice(0, 10))
+        assert books == [b.to_schema() for b in res.scalars()]
+
+
+# @pytest.mark.skip
+@pytest.mark.asyncio
+async def test_relation_returns_schemas(create, async_session_maker):
+    async with async_session_maker() as session:
+        books = await Repository(session).author.get_books(1, 0, 10)
+        assert len(session.identity_map) == 0
+
+        res = await session.execute(select(Book).join(AuthorBook, AuthorBook.right_id == Book.id).
+                                    where(AuthorBook.left_id == 1).order_by(Book.id))
+        assert books and sorted(books, key=lambda b: b.id) == [b.to_schema() for b in res.scalars()]
@@ -0,0 +1,56 @@
+import pytest
+
+from app.db.repositories.repository import Repository
+
+
+# (метод репозитория, аргументы, число запросов при непустом результате):
+# основной запрос + по одному на каждую selectinload-связь
+CASES = [
+    ('author.get_books', (1, 0, 10), 1),
+    ('author.get_genres', (1, 0, 10), 1),
+    ('author.get_users', (1, True, 0, 10), 1),
+    ('genre.get_books', (1, 0, 10), 1),
+    ('genre.get_authors', (1, 0, 10), 1),
+    ('genre.get_users', (1, True, 0, 10), 3),
+    ('book.get_authors', (1, 0, 10), 1),
+    ('book.get_genres', (2, 0, 10), 1),
+    ('book.get_users', (1, True, 0, 10), 2),
+    ('user.get_books', (2, True, 0, 10), 1),
+    ('user.get_genres', (2, True, 0, 10), 1),
+    ('user.get_authors', (2, True, 0, 10), 1),
+    ('user.get_overdue', (True, 0, 10), 3),
+    ('user.get_overdue', (False, 0, 10), 3),
+]
+
+
+# @pytest.mark.skip
+@pytest.mark.asyncio
+@pytest.mark.parametrize("method, args, expected", CASES)
+async def test_statement_count(create, engine, async_session_maker, captured_statements, method, args, expected):
+    async with async_session_maker() as session:
+        rep = Repository(session)
+        attr, name = method.split('.')
+        with captured_statements(engine) as statements:
+            res = await getattr(getattr(rep, attr), name)(*args)
+
+    # число запросов не зависит от числа строк и связей (нет N+1)
+    assert len(statements) == (expected if res else 1), [s for s, _ in statements]
+    # без дублей и в одном порядке (name, id), на котором держится пагинация
+    ids = [r.id for r in res]
+    assert len(ids) == len(set(ids))
+    assert [(r.name, r.id) for r in res] == sorted((r.name, r.id) for r in res)
+
+
+# @pytest.mark.skip
+@pytest.mark.asyncio
+async def test_semi_join_no_duplicates(create, async_session_maker):
+    async with async_session_maker() as session:
+        rep = Repository(session)
+        # читатель 2 сдал обе книги жанра 1 - в выдаче он один раз
+        users = await rep.genre.get_users(1, True, 0, 10)
+        assert sorted(u.id for u in users) == [2, 4, 5]
+        assert all(ub.returned and ub.book is not None for u in users for ub in u.books)
+
+        first = await rep.genre.get_users(1, True, 0, 2)
+        rest = await rep.genre.get_users(1, True, 2, 10)
+        assert [u.id for u in first + rest] == [u.id for u in users]
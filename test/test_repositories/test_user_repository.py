@@ -0,0 +1,137 @@
+import asyncio
+import pytest
+from datetime import date, timedelta
+
+from app.config import settings
+from app.db.cache import user_cache
+from app.db.repositories.repository import Repository
+
+
+# @pytest.mark.skip
+@pytest.mark.asyncio
+async def test_take_book_concurrent_no_overselling(create, async_session_maker):
+    readers, copies = 20, 3
+    async with async_session_maker() as session:
+        rep = Repository(session)
+        book = await rep.book.create({
+            'name': 'stress', 'description': 'stress', 'publish_year': 2000, 'amount': copies})
+        users = [await rep.user.create({
+            'name': f'stress{i}', 'hashed_password': '-', 'email': f'stress{i}@test.ru',
+            'born': date(2000, 1, 1)}) for i in range(readers)]
+
+    async def take(user_id: int):
+        async with async_session_maker() as session:
+            return await Repository(session).user.user_take_book(user_id, book.id, settings.MAX_AMOUNT)
+
+    results = await asyncio.gather(*[take(u.id) for u in users])
+    assert sum(r.link is not None for r in results) == copies
+    assert all(r.found for r in results)
+
+    async with async_session_maker() as session:
+        rep = Repository(session)
+        assert (await rep.book.get_one(book.id)).amount == 0
+        assert await rep.user_book.count_links_right(book.id) == copies
+
+
+# @pytest.mark.skip
+@pytest.mark.asyncio
+async def test_take_book_concurrent_same_reader(create, async_session_maker):
+    async with async_session_maker() as session:
+        rep = Repository(session)
+        books = [await rep.book.create({
+            'name': f'limit{i}', 'description': 'limit', 'publish_year': 2000, 'amount': 5})
+            for i in range(settings.MAX_AMOUNT + 2)]
+        user = await rep.user.create({
+            'name': 'limit', 'hashed_password': '-', 'email': 'limit@test.ru', 'born': date(2000, 1, 1)})
+
+    async def take(book_id: int):
+        async with async_session_maker() as session:
+            return await Repository(session).user.user_take_book(user.id, book_id, settings.MAX_AMOUNT)
+
+    # разные книги: лимит не превышается
+    results = await asyncio.gather(*[take(b.id) for b in books])
+    assert sum(r.link is not None for r in results) == settings.MAX_AMOUNT
+    async with async_session_maker() as session:
+        assert await Repository(session).user_book.count_links_left(user.id) == settings.MAX_AMOUNT
+
+    # одна и та же книга: одна выдача, остальные - "та же книга" (409), без ошибки БД
+    book_id = next(r.book.id for r in results if r.link is not None)
+    async with async_session_maker() as session:
+        assert await Repository(session).user.user_return_book(user.id, book_id)
+    results = await asyncio.gather(*[take(book_id) for _ in range(5)])
+    assert sum(r.link is not None for r in results) == 1
+    assert all(r.same for r in results if r.link is None)
+    async with async_session_maker() as session:
+        assert (await Repository(session).book.get_one(book_id)).amount == 4
+
+# @pytest.mark.skip
+@pytest.mark.asyncio
+async def test_return_book_concurrent_single_increment(create, async_session_maker):
+    # у читателя id=3 на руках книга id=1
+    async with async_session_maker() as session:
+        amount = (await Repository(session).book.get_one(1)).amount
+
+    async def give_back():
+        async with async_session_maker() as session:
+            return await Repository(session).user.user_return_book(3, 1)
+
+    results = await asyncio.gather(*[give_back() for _ in range(10)])
+    assert sum(r is not None for r in results) == 1
+
+    async with async_session_maker() as session:
+        assert (await Repository(session).book.get_one(1)).amount == amount + 1
+
+
+# @pytest.mark.skip
+@pytest.mark.asyncio
+async def test_mark_overdue(create, async_session_maker):
+    # у читателя id=4 книга id=2 не сдана, срок возврата через 4 дня
+    async with async_session_maker() as session:
+        rep = Repository(session)
+        assert not [u for u in await rep.user.get_overdue(False, 0, 100) if u.id == 4]
+        loans = await rep.user.mark_overdue(date.today() + timedelta(days=5), batch=100)
+        assert [(loan.user_id, loan.book_name) for loan in loans if loan.user_id == 4] == [(4, 'Война и мир')]
+        assert [u for u in await rep.user.get_overdue(False, 0, 100) if u.id == 4]
+        # отмеченные повторно не выбираются
+        assert await rep.user.mark_overdue(date.today() + timedelta(days=5), batch=100) == []
+
+
+# @pytest.mark.skip
+@pytest.mark.asyncio
+async def test_user_cache_evicted_after_commit(create, async_session_maker):
+    async with async_session_maker() as session:
+        rep = Repository(session)
+        async with rep.transaction():
+            access = await rep.user.get_access(6)
+            await rep.user.update(6, role_id=access.role_id)
+            # параллельный запрос до фиксации читает из БД и кэширует прежние права
+            async with async_session_maker() as other:
+                assert await Repository(other).user.get_access(6, cached=False) == access
+            assert user_cache.get(6)[1] == access
+        # версия прав увеличена после фиксации - прежняя запись не используется
+        assert (await rep.user.get_access(6)).token_version == access.token_version + 1
+
+
+# @pytest.mark.skip
+@pytest.mark.asyncio
+async def test_user_cache_warm(create, engine, async_session_maker, captured_statements):
+    user_cache.clear()
+    async with async_session_maker() as session:
+        rep = Repository(session)
+        with captured_statements(engine) as statements:
+            access = await rep.user.get_access(2)
+            # тёплый кэш - без обращения к БД
+            assert await rep.user.get_access(2) == access
+        assert len(statements) == 1
+
+        user = await rep.user.get_one(2)
+        await rep.user.update(2, name=user.name)
+        with captured_statements(engine) as statements:
+            await rep.user.get_access(2)
+        assert len(statements) == 1
+
+        # изменение другого пользователя запись не сбрасывает
+        await rep.user.delete_data(666)
+        with captured_statements(engine) as statements:
+            assert await rep.user.get_access(2) == access
+        assert statements == []
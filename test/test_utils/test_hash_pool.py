@@ -0,0 +1,28 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.utils.hash_pool import HashPool
+
+
+# @pytest.mark.skip
+@pytest.mark.asyncio
+async def test_busy_pool_rejected():
+    pool = HashPool(workers=1, queue=0, kind='thread')
+    release = threading.Event()
+    blocked = asyncio.create_task(pool.run(release.wait))
+    await asyncio.sleep(0)
+    assert pool.pending == 1
+
+    with pytest.raises(HTTPException) as e:
+        await pool.run(sum, [1, 2])
+    assert e.value.status_code == 429
+    assert pool.pending == 1
+
+    release.set()
+    assert await blocked is True
+    assert pool.pending == 0
+    assert await pool.run(sum, [1, 2]) == 3
+    pool.shutdown()
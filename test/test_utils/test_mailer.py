@@ -0,0 +1,90 @@
+import asyncio
+from datetime import date
+
+import aiosmtplib
+import pytest
+from aiosmtpd.controller import Controller
+
+from app.api.utils.email import overdue_reminders
+from app.api.utils.mailer import Mail, MailQueue, templates
+from app.db.repositories.repository import OverdueLoan
+
+
+def make_queue(server: Controller, workers: int = 2) -> MailQueue:
+    return MailQueue(
+        lambda: aiosmtplib.SMTP(hostname=server.hostname, port=server.port, use_tls=False, start_tls=False),
+        workers=workers, retries=2, retry_seconds=0)
+
+
+def mail(n: int) -> Mail:
+    return Mail([f'reader{n}@test.ru'], f'Letter {n}', f'<p>{n}</p>')
+
+
+# @pytest.mark.skip
+@pytest.mark.asyncio
+async def test_connections_reused(smtp_server):
+    queue = make_queue(smtp_server)
+    await asyncio.gather(*[queue.send(mail(n)) for n in range(20)])
+    await queue.stop()
+
+    handler = smtp_server.handler
+    assert sorted(m.rcpt_tos[0] for m in handler.messages) == sorted(f'reader{n}@test.ru' for n in range(20))
+    # письма идут через соединения обработчиков, а не по одному на письмо
+    assert len(handler.sessions) <= 2
+
+
+# @pytest.mark.skip
+@pytest.mark.asyncio
+async def test_transient_error_retried(smtp_server):
+    smtp_server.handler.replies = ['451 Try again later']
+    queue = make_queue(smtp_server, workers=1)
+    await queue.send(mail(1))
+    await queue.stop()
+
+    assert [m.rcpt_tos for m in smtp_server.handler.messages] == [['reader1@test.ru']]
+
+
+# @pytest.mark.skip
+@pytest.mark.asyncio
+async def test_permanent_error_not_retried(smtp_server):
+    smtp_server.handler.replies = ['550 Mailbox unavailable']
+    queue = make_queue(smtp_server, workers=1)
+    with pytest.raises(aiosmtplib.SMTPResponseException) as error:
+        await queue.send(mail(1))
+    assert error.value.code == 550
+    # обработчик продолжает работу со следующим письмом
+    await queue.send(mail(2))
+    await queue.stop()
+
+    assert [m.rcpt_tos for m in smtp_server.handler.messages] == [['reader2@test.ru']]
+
+
+# @pytest.mark.skip
+@pytest.mark.asyncio
+async def test_retries_exhausted(smtp_server):
+    smtp_server.handler.replies = ['451 Try again later'] * 3
+    queue = make_queue(smtp_server, workers=1)
+    with pytest.raises(aiosmtplib.SMTPResponseException):
+        await queue.send(mail(1))
+    await queue.stop()
+
+    assert smtp_server.handler.replies == []
+    assert smtp_server.handler.messages == []
+
+
+# @pytest.mark.skip
+def test_overdue_reminders():
+    loans = [
+        OverdueLoan(2, 'user1', 'user1@test.ru', 'Детство', date(2026, 1, 1)),
+        OverdueLoan(2, 'user1', 'user1@test.ru', 'Война и мир', date(2026, 1, 2)),
+        OverdueLoan(3, 'user2', 'user2@test.ru', 'Детство', date(2026, 1, 3)),
+    ]
+    mails = overdue_reminders(loans)
+    assert [m.recipients for m in mails] == [['user1@test.ru'], ['user2@test.ru']]
+    assert 'Война и мир' in mails[0].html and 'Детство' in mails[0].html
+    assert 'Война и мир' not in mails[1].html
+
+
+# @pytest.mark.skip
+def test_templates_compiled_once():
+    assert templates.get('overdue') is templates.get('overdue')
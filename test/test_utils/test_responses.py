@@ -0,0 +1,40 @@
+import json
+import pytest
+from fastapi import Response
+from typing import List
+
+from app.api.schemas.all import BookDB
+from app.api.utils.responses import dump_schemas, prevalidated
+
+
+BOOKS = [BookDB(id=1, name='Детство', description='-', publish_year=1852, amount=2),
+         BookDB(id=2, name='Отрочество', description='-', publish_year=1854, amount=0)]
+
+
+# @pytest.mark.skip
+def test_dump_schemas():
+    assert json.loads(dump_schemas(BOOKS)) == [b.model_dump() for b in BOOKS]
+    assert json.loads(dump_schemas(BOOKS[0])) == BOOKS[0].model_dump()
+    assert dump_schemas([]) == b'[]'
+
+
+# @pytest.mark.skip
+@pytest.mark.asyncio
+async def test_prevalidated_keeps_sub_response_headers():
+    @prevalidated
+    async def endpoint(response: Response) -> List[BookDB]:
+        response.headers['X-Next-Cursor'] = 'abc'
+        response.set_cookie('access_token', 'a')
+        response.set_cookie('refresh_token', 'r')
+        return BOOKS
+
+    sub_response = Response()
+    del sub_response.headers['content-length']
+    sub_response.status_code = None
+    res = await endpoint(response=sub_response)
+
+    assert res.media_type == 'application/json'
+    assert json.loads(res.body) == [b.model_dump() for b in BOOKS]
+    assert res.headers['x-next-cursor'] == 'abc'
+    assert len(res.headers.getlist('set-cookie')) == 2
+    assert res.status_code == 200